@@ -2,11 +2,14 @@
 """Operate with dataframes based on 'processed' data."""
 
 from pathlib import Path
+import sys
 import pandas as pd
 
 # we are in <root>/analysis/vintages
 levels_up = 2
 processed = Path(__file__).parents[levels_up] / 'data' / 'processed'
+sys.path.append(str(Path(__file__).parents[levels_up] / 'src' / 'access_data'))
+from access_data import load_csv
 
 
 def filled_dates_local(root=processed):
@@ -23,18 +26,10 @@ def get_processed_folder(year, month, root=processed):
     return root / str(year) / month_dir
 
 
-def from_csv(filename):
-    df = pd.read_csv(filename, index_col=0)
-    df.index = pd.to_datetime(df.index)
-    return df
-
-
 def get_dataframes(year, month):
     folder = get_processed_folder(year, month)
-    dfa = pd.read_csv(folder / "dfa.csv", index_col=0)
-    dfq = from_csv(folder / "dfq.csv")
-    dfm = from_csv(folder / "dfm.csv")
-    return dfa, dfq, dfm
+    return tuple(load_csv(folder / "df{}.csv".format(freq))
+                 for freq in "aqm")
 
 
 def get_vintages(label):
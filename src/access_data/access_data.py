@@ -1,37 +1,307 @@
 # -*- coding: utf-8 -*-
-"""Common code to read pandas dataframes from stable URL or local CSV files."""
+"""Common code to read pandas dataframes from stable URL or local CSV files.
+
+Files from stable URL are kept in a disk cache (*data/cache/web*) and
+revalidated with conditional GET requests, see :class:`WebCache`.
+
+Files for several vintages and frequencies are downloaded concurrently:
+
+    frames = get_vintages_from_web(['latest', '2017-04'], freqs='qm')
+    frames[('2017-04', 'q')]
+
+All readers of processed CSV files use :func:`read_csv` (or cached
+:func:`load_csv` for local files), so dates and dtypes are parsed the
+same way everywhere:
+
+    dfm = load_csv(csv_path('m'), columns=['CPI_rog'], start='2015')
+
+To read only some series and dates, prefer :func:`load`, it uses
+Parquet or Feather files when present:
+
+    df = load('q', ['GDP_yoy', 'CPI_rog'], start='2015', vintage='2017-04')
+
+Column-oriented JSON, one file per frequency and, optionally, per series:
+
+    save_json(compress=True, by_label=True)
+    benchmark_json('m')       # compare to to_json(orient="records") files
+"""
+
+import asyncio
+import concurrent.futures
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
 
 import pandas as pd
 
+DATE_FORMAT = '%Y-%m-%d'
+INT_COLUMNS = ['year', 'qtr', 'month']
+
+
+def read_csv(source, columns=None, start=None, end=None, dtype='float64'):
+    """Canonical wrapper for pd.read_csv.
+
+       Returns dataframe with 'time_index' column parsed to dates as index.
+       *columns* limits labels read from file, *start* and *end* limit
+       dates as in pandas partial string indexing ('2015' includes all
+       of 2015), *dtype* is used for value columns, 'float32' halves memory.
+    """
+    usecols = None
+    if columns is not None:
+        wanted = set(['time_index'] + list(columns))
+        usecols = wanted.__contains__
+    dtypes = defaultdict(lambda: dtype, time_index=str)
+    dtypes.update({name: 'int64' for name in INT_COLUMNS})
+    df = pd.read_csv(source, index_col='time_index', usecols=usecols,
+                     dtype=dtypes)
+    # one vectorised call instead of a to_datetime() call per cell
+    df.index = pd.to_datetime(df.index, format=DATE_FORMAT)
+    if start is not None or end is not None:
+        df = df.loc[start:end]
+    return normalise(df)
 
-def read_csv(source):
-    """Canonical wrapper for pd.read_csv"""
-    return pd.read_csv(source, converters={'time_index': pd.to_datetime},
-                       index_col='time_index')
 
+def normalise(df):
+    """Return *df* with int64 date columns and datetime64[ns] index,
+       so that dataframes from CSV, Parquet and Feather files are equal.
+       Resolution of parsed dates and width of integers stored in
+       columnar files vary with pandas and pyarrow versions."""
+    ints = {c: 'int64' for c in INT_COLUMNS if c in df.columns}
+    if ints:
+        df = df.astype(ints)
+    df.index = df.index.astype('datetime64[ns]')
+    df.index.name = 'time_index'
+    return df
 
-def get_url(freq):
+
+# parsed local files, invalidated when file changes
+_LOADED = OrderedDict()
+LOADED_MAX = 16
+
+
+def load_csv(path, columns=None, start=None, end=None, dtype='float64'):
+    """Same as :func:`read_csv` for local file *path*, keeps result in
+       memory until file size or modification time changes."""
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), columns and tuple(columns), start, end, dtype)
+    version = (stat.st_size, stat.st_mtime_ns)
+    cached = _LOADED.get(key)
+    if cached is None or cached[0] != version:
+        # open file here, works on long directory names
+        with path.open() as buf:
+            df = read_csv(buf, columns, start, end, dtype)
+        cached = _LOADED[key] = (version, df)
+        while len(_LOADED) > LOADED_MAX:
+            _LOADED.popitem(last=False)
+    _LOADED.move_to_end(key)
+    # caller may change dataframe, cached one stays intact
+    return cached[1].copy()
+
+
+URL_ROOT = "https://raw.githubusercontent.com/epogrebnyak/mini-kep/master/data/processed/{}"
+URL_BASE = URL_ROOT.format("latest/{}")
+
+
+def get_url(freq, url_base=URL_BASE):
     """Make URL for CSV files"""
-    url_base = "https://raw.githubusercontent.com/epogrebnyak/mini-kep/master/data/processed/latest/{}"
     filename = "df{}.csv".format(freq)
     return url_base.format(filename)
 
 
-def get_dfs_from_web():
-    """Get three dataframes from local csv files"""
-    dfa = read_csv(get_url('a'))
-    dfq = read_csv(get_url('q'))
-    dfm = read_csv(get_url('m'))
-    return dfa, dfq, dfm
+def get_vintage_url(freq, vintage='latest', url_root=URL_ROOT):
+    """Make URL for CSV file of *vintage*, 'latest' or 'YYYY-MM'.
+
+    >>> get_vintage_url('q', '2017-04', 'http://x/{}')
+    'http://x/2017/04/dfq.csv'
+    """
+    if vintage != 'latest':
+        year, month = vintage.split('-')
+        vintage = "{}/{}".format(int(year), month.zfill(2))
+    return url_root.format("{}/df{}.csv".format(vintage, freq))
+
+
+# atomic writes
+# this module runs as a standalone script and is copied to notebooks
+# without kep package, so it has own helpers instead of kep.atomic
+
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+UMASK = _umask()
+
+
+@contextmanager
+def atomic_path(path):
+    """Yield unique temporary path next to *path*, move it to *path*
+       on exit. Readers see old or new file, never a partial one.
+       Temporary file is removed if writing fails."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix='.' + path.name + '.', suffix='.tmp',
+                               dir=str(path.parent))
+    os.close(fd)
+    tmp = Path(tmp)
+    try:
+        yield tmp
+        # mkstemp creates file readable by owner only
+        os.chmod(str(tmp), 0o666 & ~UMASK)
+        os.replace(str(tmp), str(path))
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def atomic_write_bytes(path, data):
+    with atomic_path(path) as tmp:
+        tmp.write_bytes(data)
+
+
+# disk cache for files at stable URL
+
+CACHE_FOLDER = Path(__file__).parents[2] / "data" / "cache" / "web"
+
+
+class WebCache:
+    """Local copies of files at URLs.
+
+       A copy younger than *ttl* seconds is used without a request.
+       Otherwise the file is requested with *If-None-Match* and
+       *If-Modified-Since* headers and is downloaded only if it changed
+       on server. If server cannot be reached, local copy is used.
+    """
+
+    def __init__(self, folder=CACHE_FOLDER, ttl=0, timeout=10):
+        self.folder = Path(folder)
+        self.ttl = ttl
+        self.timeout = timeout
+
+    def paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:20]
+        return self.folder / key, self.folder / (key + '.json')
+
+    def read_meta(self, url):
+        _, meta_path = self.paths(url)
+        try:
+            return json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def write_meta(self, url, meta):
+        _, meta_path = self.paths(url)
+        atomic_write_bytes(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def fetch(self, url):
+        """Return path to local copy of *url*."""
+        body_path, _ = self.paths(url)
+        meta = self.read_meta(url) if body_path.exists() else {}
+        if meta and time.time() - meta.get('checked', 0) < self.ttl:
+            return body_path
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as r:
+                data = r.read()
+                meta = dict(url=url, etag=r.headers.get('ETag'),
+                            last_modified=r.headers.get('Last-Modified'))
+            self.folder.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(body_path, data)
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or not meta:
+                raise
+        except (urllib.error.URLError, OSError):
+            if not meta:
+                raise
+            print("Cannot reach {}, using local copy".format(url))
+            return body_path
+        meta['checked'] = time.time()
+        self.write_meta(url, meta)
+        return body_path
+
+
+# concurrent download
+
+# simultaneous requests to one server
+MAX_CONNECTIONS = 6
+
+
+async def fetch_frames_async(urls, limit=MAX_CONNECTIONS, cache=None):
+    """Download and parse *urls*, at most *limit* at a time. Each file
+       is parsed as soon as it is downloaded. Returns {url: dataframe}."""
+    cache = cache or WebCache()
+    loop = asyncio.get_running_loop()
+    # blocking download and parsing run in a bounded thread pool
+    with concurrent.futures.ThreadPoolExecutor(limit) as pool:
+        async def fetch(url):
+            path = await loop.run_in_executor(pool, cache.fetch, url)
+            df = await loop.run_in_executor(pool, load_csv, path)
+            return url, df
+        results = await asyncio.gather(*[fetch(url) for url in urls])
+    return dict(results)
+
+
+def fetch_frames(urls, limit=MAX_CONNECTIONS, cache=None):
+    """Blocking version of :func:`fetch_frames_async`."""
+    coro = fetch_frames_async(urls, limit, cache)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # called from a running event loop, e.g. in a notebook
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def get_vintages_from_web(vintages=('latest',), freqs='aqm',
+                          url_root=URL_ROOT, limit=MAX_CONNECTIONS,
+                          cache=None):
+    """Return {(vintage, freq): dataframe} for all *vintages* and *freqs*,
+       files are downloaded concurrently."""
+    keys = [(v, freq) for v in vintages for freq in freqs]
+    urls = {key: get_vintage_url(key[1], key[0], url_root) for key in keys}
+    frames = fetch_frames(list(urls.values()), limit, cache)
+    return {key: frames[url] for key, url in urls.items()}
+
+
+def get_series_from_web(label, freq, url_base=URL_BASE, cache=None):
+    """Get one series from its file in *latest/series* at stable URL,
+       without downloading whole dataframe."""
+    cache = cache or WebCache()
+    filename = "series/{}.{}.json.gz".format(label, freq)
+    path = cache.fetch(url_base.format(filename))
+    doc = json.loads(gzip.decompress(path.read_bytes()).decode('utf-8'))
+    index = pd.to_datetime(doc['index'], format=DATE_FORMAT)
+    return pd.Series(doc['data'], index=index, name=label, dtype=float)
 
-# TODO: save to local cache, update cache
+
+def get_dfs_from_web(url_base=URL_BASE, cache=None):
+    """Get three dataframes from stable URL, files are downloaded
+       concurrently and only if changed since previous call."""
+    urls = [get_url(freq, url_base) for freq in 'aqm']
+    frames = fetch_frames(urls, cache=cache)
+    return tuple(frames[url] for url in urls)
 
 
 # json's
-from pathlib import Path
 
 # if in package, can import this from src.kep.cfg.py
-FOLDER_LATEST_CSV = Path(__file__).parents[2] / "data" / "processed" / "latest"
+FOLDER_PROCESSED = Path(__file__).parents[2] / "data" / "processed"
+FOLDER_LATEST_CSV = FOLDER_PROCESSED / "latest"
 FOLDER_LATEST_JSON = Path(__file__).parents[2] / "data" / "processed" / "json"
 
 
@@ -47,15 +317,157 @@ def csv_path(freq, folder=FOLDER_LATEST_CSV):
 def read_csv_safe_long_name(source):
     """Works safely on long directory names"""
     assert isinstance(source, Path)
-    with source.open() as buf:
-        return read_csv(buf)
+    return load_csv(source)
+
+
+def read_parquet(path):
+    return normalise(pd.read_parquet(path))
+
+
+def read_feather(path):
+    return normalise(pd.read_feather(path).set_index('time_index'))
+
+
+# columnar files are typed and load much faster than CSV, prefer them
+COLUMNAR_READERS = [('parquet', read_parquet), ('feather', read_feather)]
+
+
+def columnar_path(freq, ext, folder):
+    """Return path of Parquet or Feather file by *ext* in *folder*,
+       None if there is no such file or CSV file is newer."""
+    path = folder / "df{}.{}".format(freq, ext)
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    try:
+        if csv_path(freq, folder).stat().st_mtime > mtime:
+            return None
+    except FileNotFoundError:
+        pass
+    return path
+
+
+def read_local(freq, folder=FOLDER_LATEST_CSV):
+    """Read dataframe for *freq* from *folder*, use Parquet or Feather
+       file if present and not older than CSV file, fallback to CSV file.
+    """
+    for ext, reader in COLUMNAR_READERS:
+        path = columnar_path(freq, ext, folder)
+        if path:
+            try:
+                return reader(path)
+            # pyarrow not installed
+            except ImportError:
+                pass
+    return read_csv_safe_long_name(csv_path(freq, folder))
+
+
+# selective loading
+
+
+def vintage_folder(vintage='latest', root=FOLDER_PROCESSED):
+    """
+    >>> vintage_folder('2017-4', Path('processed')).as_posix()
+    'processed/2017/04'
+    """
+    if vintage == 'latest':
+        return root / 'latest'
+    year, month = vintage.split('-')
+    return root / str(int(year)) / month.zfill(2)
+
+
+def get_labels(freq, vintage='latest', folder=None):
+    """Return labels of series in dataframe for *freq* without reading
+       data. Date columns 'year', 'qtr' and 'month' are not included."""
+    folder = folder or vintage_folder(vintage)
+    path = columnar_path(freq, 'parquet', folder)
+    names = None
+    if path:
+        try:
+            import pyarrow.parquet
+            names = pyarrow.parquet.read_schema(str(path)).names
+        except ImportError:
+            pass
+    if names is None:
+        with csv_path(freq, folder).open() as f:
+            names = f.readline().strip().split(',')
+    return [name for name in names
+            if name != 'time_index' and name not in INT_COLUMNS]
+
+
+def date_bounds(start=None, end=None):
+    """Return first and last timestamp for partial dates *start*, *end*.
+
+    >>> [str(ts.date()) for ts in date_bounds('2015', '2016-03')]
+    ['2015-01-01', '2016-03-31']
+    """
+    first = pd.Period(start).start_time if start is not None else None
+    last = pd.Period(end).end_time if end is not None else None
+    return first, last
+
+
+def _read_parquet_selected(path, labels, first, last):
+    filters = []
+    if first is not None:
+        filters.append(('time_index', '>=', first))
+    if last is not None:
+        filters.append(('time_index', '<=', last))
+    df = pd.read_parquet(path, columns=labels, filters=filters or None)
+    return normalise(df)
+
+
+def _read_feather_selected(path, labels, first, last):
+    columns = None if labels is None else ['time_index'] + labels
+    df = pd.read_feather(path, columns=columns).set_index('time_index')
+    return normalise(df.loc[first:last])
+
+
+SELECTIVE_READERS = [('parquet', _read_parquet_selected),
+                     ('feather', _read_feather_selected)]
+
+
+def load(freq, labels=None, start=None, end=None, vintage='latest',
+         dtype='float64', folder=None, cache=True):
+    """Return dataframe for *freq* with *labels* columns (default - all)
+       and rows from *start* to *end* dates, inclusive.
+
+       Only requested columns are read from Parquet or Feather file,
+       CSV file is used if there is none or if CSV file is newer. *vintage* is 'latest' or
+       'YYYY-MM'. Raises KeyError for unknown labels. With *cache* False
+       result read from CSV file is not kept in memory.
+    """
+    folder = folder or vintage_folder(vintage)
+    if labels is not None:
+        labels = list(labels)
+        available = get_labels(freq, folder=folder) + INT_COLUMNS
+        missing = set(labels) - set(available)
+        if missing:
+            raise KeyError("Labels not found for freq {}: {}".format(
+                freq, ', '.join(sorted(missing))))
+    first, last = date_bounds(start, end)
+    for ext, reader in SELECTIVE_READERS:
+        path = columnar_path(freq, ext, folder)
+        if path:
+            try:
+                df = reader(path, labels, first, last)
+            # pyarrow not installed
+            except ImportError:
+                continue
+            values = [c for c in df.columns if c not in INT_COLUMNS]
+            return df.astype({c: dtype for c in values})
+    path = csv_path(freq, folder)
+    if cache:
+        return load_csv(path, labels, start, end, dtype)
+    with path.open() as buf:
+        return read_csv(buf, labels, start, end, dtype)
 
 
 def get_dfs():
-    """Get three dataframes from local csv files"""
-    dfa = read_csv_safe_long_name(csv_path('a'))
-    dfq = read_csv_safe_long_name(csv_path('q'))
-    dfm = read_csv_safe_long_name(csv_path('m'))
+    """Get three dataframes from local files"""
+    dfa = read_local('a')
+    dfq = read_local('q')
+    dfm = read_local('m')
     return dfa, dfq, dfm
 
 
@@ -63,13 +475,143 @@ def get_dfs():
 #       see oil and CBR repositories for that
 
 
-def save_json(folder_path):
-    param = dict(orient="records")
-    dfa, dfq, dfm = get_dfs()
-    dfa.to_json(json_path('a'), **param)
-    dfq.to_json(json_path('q'), **param)
-    dfm.to_json(json_path('m'), **param)
+def _json_values(values):
+    # NaN is not valid JSON
+    return json.dumps([None if v != v else v for v in values])
+
+
+# series read from file at a time, CSV file is parsed once for each
+# group, so memory use is bounded by this number of series
+LABELS_PER_READ = 16
+
+
+def iter_columns(freq, folder=FOLDER_LATEST_CSV, size=None):
+    """Yield (dates, label, values) for each series of *freq* in *folder*,
+       reading *size* (default LABELS_PER_READ) series at a time."""
+    size = size or LABELS_PER_READ
+    labels = get_labels(freq, folder=folder)
+    for i in range(0, len(labels), size):
+        df = load(freq, labels[i:i + size], folder=folder, cache=False)
+        dates = df.index.strftime(DATE_FORMAT).tolist()
+        for label in df.columns:
+            yield dates, label, df[label].tolist()
+
+
+def iter_json(freq, folder=FOLDER_LATEST_CSV):
+    """Yield text of column-oriented JSON for *freq* in pieces:
+
+           {"freq": "q", "index": ["1999-03-31", ...],
+            "data": {"GDP_yoy": [98.1, ...], ...}}
+
+       Dates are listed once, values are in same order as dates, missing
+       value is null. Series are read in groups, see :func:`iter_columns`.
+    """
+    header = '{{"freq": "{}", "index": {}, "data": {{'
+    first = True
+    for dates, label, values in iter_columns(freq, folder):
+        if first:
+            yield header.format(freq, json.dumps(dates))
+        yield '{}{}: {}'.format('' if first else ', ', json.dumps(label),
+                                _json_values(values))
+        first = False
+    if first:
+        # no series in file
+        yield header.format(freq, '[]')
+    yield '}}\n'
+
+
+def label_json(label, freq, dates, values):
+    """Return text of JSON for one series:
+
+           {"label": "GDP_yoy", "freq": "q", "index": ["1999-03-31", ...],
+            "data": [98.1, ...]}
+    """
+    return '{{"label": {}, "freq": "{}", "index": {}, "data": {}}}\n'.format(
+        json.dumps(label), freq, json.dumps(dates), _json_values(values))
+
+
+def _write_pieces(path, pieces, compress):
+    path = Path(path)
+    with atomic_path(path) as tmp, tmp.open('wb') as raw:
+        if compress:
+            # no file name and time in header, same input gives same bytes
+            f = gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0)
+        else:
+            f = raw
+        with f:
+            for piece in pieces:
+                f.write(piece.encode('utf-8'))
+    return path
+
+
+def write_json(freq, path, folder=FOLDER_LATEST_CSV, compress=False):
+    """Write JSON for *freq* from *folder* to *path*, gzip-compressed
+       if *compress* is True."""
+    return _write_pieces(path, iter_json(freq, folder), compress)
+
+
+def write_label_json(freq, target, folder=FOLDER_LATEST_CSV, compress=False):
+    """Write one JSON file per series of *freq* from *folder* to *target*
+       folder, named like *GDP_yoy.q.json*. Returns list of paths."""
+    ext = 'json.gz' if compress else 'json'
+    return [_write_pieces(Path(target) / "{}.{}.{}".format(label, freq, ext),
+                          [label_json(label, freq, dates, values)], compress)
+            for dates, label, values in iter_columns(freq, folder)]
+
+
+def save_json(folder_path=FOLDER_LATEST_JSON, source=FOLDER_LATEST_CSV,
+              compress=False, by_label=False):
+    """Write df{a,q,m}.json (or .json.gz) to *folder_path*. With
+       *by_label* True also write a file per series to *series*
+       subfolder of *folder_path*."""
+    folder_path = Path(folder_path)
+    folder_path.mkdir(parents=True, exist_ok=True)
+    ext = 'json.gz' if compress else 'json'
+    paths = [write_json(freq, folder_path / "df{}.{}".format(freq, ext),
+                        source, compress)
+             for freq in "aqm"]
+    if by_label:
+        series_folder = folder_path / 'series'
+        series_folder.mkdir(exist_ok=True)
+        for freq in "aqm":
+            paths.extend(write_label_json(freq, series_folder, source,
+                                          compress))
     print("Saved dataframes as json to", folder_path)
+    return paths
+
+
+def benchmark_json(freq='m', source=FOLDER_LATEST_CSV, repeat=3):
+    """Compare files made by :func:`write_json` to records-oriented JSON
+       of ``to_json(orient="records")``, used by earlier versions.
+
+       Returns list of (name, size in bytes, seconds to write) for
+       'records', 'columns' and 'columns.gz'.
+    """
+    def timed(write):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            path = write()
+            sec = time.perf_counter() - start
+            best = sec if best is None else min(best, sec)
+        return path.stat().st_size, best
+
+    def records(path):
+        df = load(freq, folder=source, cache=False)
+        df.to_json(str(path), orient="records")
+        return path
+
+    result = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        writers = [('records', lambda: records(tmp / 'records.json')),
+                   ('columns', lambda: write_json(freq, tmp / 'c.json',
+                                                  source)),
+                   ('columns.gz', lambda: write_json(freq, tmp / 'c.json.gz',
+                                                     source, compress=True))]
+        for name, write in writers:
+            result.append((name,) + timed(write))
+    return result
 
 
 if __name__ == "__main__":
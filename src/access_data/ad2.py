@@ -4,15 +4,13 @@
 # values
 
 # FIXME: "aqmwd" for other datasets
-FREQUENCIES = "aqm"
-
+try:
+    from access_data.access_data import read_csv
+except ImportError:
+    # run from this folder
+    from access_data import read_csv
 
-def read_csv(source):
-    """Canonical wrapper for pd.read_csv.
-       Converts 'time_index' column to date format.
-    """
-    return pd.read_csv(source, converters={'time_index': pd.to_datetime},
-                       index_col='time_index')
+FREQUENCIES = "aqm"
 
 
 # test code
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+import os
+import stat
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from access_data import access_data
+from access_data.access_data import UMASK, WebCache
+
+CSV = b"time_index,year,GDP_bln_rub\n1999-12-31,1999,4823.0\n"
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Serves CSV with ETag, counts full downloads."""
+    body = CSV
+    downloads = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        etag = '"{}"'.format(len(self.body))
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        type(self).downloads += 1
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+
+@pytest.fixture
+def url_base():
+    StandIn.body, StandIn.downloads = CSV, 0
+    server = HTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, args=(0.05,),
+                     daemon=True).start()
+    yield "http://127.0.0.1:{}/{{}}".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+class Test_WebCache():
+
+    def test_unchanged_file_is_not_downloaded_again(self, url_base, tmp_path):
+        cache = WebCache(tmp_path)
+        url = url_base.format("dfa.csv")
+        assert cache.fetch(url).read_bytes() == CSV
+        assert cache.fetch(url).read_bytes() == CSV
+        assert StandIn.downloads == 1
+
+    @pytest.mark.skipif(os.name != 'posix', reason='POSIX permissions')
+    def test_files_have_default_permissions(self, url_base, tmp_path):
+        cache = WebCache(tmp_path)
+        cache.fetch(url_base.format("dfa.csv"))
+        assert sorted(stat.S_IMODE(p.stat().st_mode)
+                      for p in tmp_path.iterdir()) == 2 * [0o666 & ~UMASK]
+
+    def test_changed_file_is_downloaded(self, url_base, tmp_path):
+        cache = WebCache(tmp_path)
+        url = url_base.format("dfa.csv")
+        cache.fetch(url)
+        StandIn.body = CSV + b"2000-12-31,2000,7306.0\n"
+        assert cache.fetch(url).read_bytes() == StandIn.body
+
+    def test_ttl_skips_request(self, url_base, tmp_path):
+        cache = WebCache(tmp_path, ttl=60)
+        url = url_base.format("dfa.csv")
+        cache.fetch(url)
+        StandIn.body = b"changed"
+        assert cache.fetch(url).read_bytes() == CSV
+
+    def test_server_down_uses_local_copy(self, tmp_path):
+        StandIn.body = CSV
+        server = HTTPServer(("127.0.0.1", 0), StandIn)
+        threading.Thread(target=server.serve_forever, args=(0.05,),
+                     daemon=True).start()
+        url = "http://127.0.0.1:{}/dfa.csv".format(server.server_address[1])
+        WebCache(tmp_path).fetch(url)
+        server.shutdown()
+        server.server_close()
+        assert WebCache(tmp_path, timeout=1).fetch(url).read_bytes() == CSV
+
+
+def test_get_dfs_from_web(url_base, tmp_path):
+    dfa, dfq, dfm = access_data.get_dfs_from_web(url_base, WebCache(tmp_path))
+    assert dfa.GDP_bln_rub["1999-12-31"] == 4823.0
+
+
+class SlowStandIn(StandIn):
+    delay = 0.3
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        super().do_GET()
+
+
+@pytest.fixture
+def slow_url_root():
+    StandIn.body, StandIn.downloads = CSV, 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, args=(0.05,),
+                     daemon=True).start()
+    yield "http://127.0.0.1:{}/{{}}".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+class Test_get_vintages_from_web():
+
+    def test_files_are_fetched_concurrently(self, slow_url_root, tmp_path):
+        start = time.time()
+        frames = access_data.get_vintages_from_web(
+            ["latest", "2017-04"], url_root=slow_url_root,
+            cache=WebCache(tmp_path))
+        elapsed = time.time() - start
+        assert sorted(frames) == [("2017-04", "a"), ("2017-04", "m"),
+                                  ("2017-04", "q"), ("latest", "a"),
+                                  ("latest", "m"), ("latest", "q")]
+        assert frames[("2017-04", "q")].GDP_bln_rub.iloc[0] == 4823.0
+        # six files, each takes 0.3 sec.
+        assert elapsed < 3 * SlowStandIn.delay
+
+    def test_connections_are_bounded(self, slow_url_root, tmp_path):
+        start = time.time()
+        access_data.get_vintages_from_web(
+            ["latest", "2017-04"], freqs="aq", url_root=slow_url_root,
+            limit=2, cache=WebCache(tmp_path))
+        assert time.time() - start >= 2 * SlowStandIn.delay
+
+
+CSV_M = ("time_index,year,month,CPI_rog,IND_PROD_yoy\n"
+         "2015-01-31,2015,1,103.9,99.1\n"
+         "2015-02-28,2015,2,102.2,\n"
+         "2015-03-31,2015,3,101.2,99.4\n")
+
+
+class Test_read_csv():
+
+    def test_dates_and_dtypes(self, tmp_path):
+        path = tmp_path / "dfm.csv"
+        path.write_text(CSV_M)
+        df = access_data.read_csv(path)
+        assert str(df.index.dtype).startswith("datetime64")
+        assert df.index[1] == pd.Timestamp("2015-02-28")
+        assert df.month.dtype == "int64"
+        assert df.CPI_rog.dtype == "float64"
+        assert df.IND_PROD_yoy.isnull().sum() == 1
+
+    def test_columns_dates_and_float32(self, tmp_path):
+        path = tmp_path / "dfm.csv"
+        path.write_text(CSV_M)
+        df = access_data.read_csv(path, columns=["CPI_rog"], start="2015-02",
+                                  end="2015-03", dtype="float32")
+        assert list(df.columns) == ["CPI_rog"]
+        assert list(df.index.month) == [2, 3]
+        assert df.CPI_rog.dtype == "float32"
+
+
+class Test_load_csv():
+
+    def test_reloaded_when_file_changes(self, tmp_path):
+        path = tmp_path / "dfm.csv"
+        path.write_text(CSV_M)
+        df = access_data.load_csv(path)
+        df["CPI_rog"] = 0
+        assert access_data.load_csv(path).CPI_rog.iloc[0] == 103.9
+        path.write_text(CSV_M.replace("103.9", "104.0"))
+        assert access_data.load_csv(path).CPI_rog.iloc[0] == 104.0
+
+
+@pytest.fixture
+def vintage_folder(tmp_path):
+    (tmp_path / "dfm.csv").write_text(CSV_M)
+    return tmp_path
+
+
+class Test_load():
+
+    def test_csv_columns_and_dates(self, vintage_folder):
+        df = access_data.load("m", ["IND_PROD_yoy"], start="2015-03",
+                              folder=vintage_folder)
+        assert list(df.columns) == ["IND_PROD_yoy"]
+        assert df.IND_PROD_yoy.tolist() == [99.4]
+
+    def test_parquet_is_preferred(self, vintage_folder):
+        pytest.importorskip("pyarrow")
+        df = access_data.read_csv(vintage_folder / "dfm.csv")
+        df["CPI_rog"] = 0.0
+        df.to_parquet(vintage_folder / "dfm.parquet")
+        result = access_data.load("m", ["CPI_rog"], end="2015-02",
+                                  dtype="float32", folder=vintage_folder)
+        assert list(result.columns) == ["CPI_rog"]
+        assert result.CPI_rog.tolist() == [0.0, 0.0]
+        assert result.CPI_rog.dtype == "float32"
+        assert result.index[-1] == pd.Timestamp("2015-02-28")
+
+    def test_older_parquet_is_ignored(self, vintage_folder):
+        pytest.importorskip("pyarrow")
+        df = access_data.read_csv(vintage_folder / "dfm.csv")
+        df["CPI_rog"] = 0.0
+        df.to_parquet(vintage_folder / "dfm.parquet")
+        # CSV file saved after Parquet file
+        mtime = (vintage_folder / "dfm.parquet").stat().st_mtime + 10
+        os.utime(str(vintage_folder / "dfm.csv"), (mtime, mtime))
+        result = access_data.load("m", ["CPI_rog"], end="2015-02",
+                                  folder=vintage_folder, cache=False)
+        assert result.CPI_rog.tolist() == [103.9, 102.2]
+        assert access_data.read_local("m", vintage_folder).CPI_rog.iloc[0] \
+            == 103.9
+
+    def test_same_dataframe_from_all_formats(self, vintage_folder):
+        pytest.importorskip("pyarrow")
+        csv = vintage_folder / "dfm.csv"
+        expected = access_data.read_local("m", vintage_folder)
+        # same types as written by kep: int32 date columns, dates in seconds
+        df = expected.astype({"year": "int32", "month": "int32"})
+        df.index = df.index.astype("datetime64[s]")
+        df.to_parquet(vintage_folder / "dfm.parquet")
+        df.reset_index().to_feather(vintage_folder / "dfm.feather")
+        os.utime(str(csv), (0, 0))
+        assert access_data.read_local("m", vintage_folder).equals(expected)
+        assert access_data.load("m", folder=vintage_folder).equals(expected)
+        (vintage_folder / "dfm.parquet").unlink()
+        assert access_data.read_local("m", vintage_folder).equals(expected)
+        assert access_data.load("m", folder=vintage_folder).equals(expected)
+        assert expected.index.dtype == "datetime64[ns]"
+        assert expected.year.dtype == "int64"
+
+    def test_unknown_label_raises(self, vintage_folder):
+        with pytest.raises(KeyError):
+            access_data.load("m", ["GDP_yoy"], folder=vintage_folder)
+
+    def test_get_labels(self, vintage_folder):
+        assert access_data.get_labels("m", folder=vintage_folder) == \
+            ["CPI_rog", "IND_PROD_yoy"]
+        pytest.importorskip("pyarrow")
+        df = access_data.read_csv(vintage_folder / "dfm.csv")
+        df.to_parquet(vintage_folder / "dfm.parquet")
+        os.utime(str(vintage_folder / "dfm.csv"), (0, 0))
+        assert access_data.get_labels("m", folder=vintage_folder) == \
+            ["CPI_rog", "IND_PROD_yoy"]
+
+
+class Test_save_json():
+
+    def test_column_oriented_json(self, vintage_folder, tmp_path):
+        path = access_data.write_json("m", tmp_path / "dfm.json",
+                                      folder=vintage_folder)
+        result = json.loads(path.read_text())
+        assert result["index"] == ["2015-01-31", "2015-02-28", "2015-03-31"]
+        assert result["data"] == {"CPI_rog": [103.9, 102.2, 101.2],
+                                  "IND_PROD_yoy": [99.1, None, 99.4]}
+
+    def test_compressed(self, vintage_folder, tmp_path):
+        path = access_data.write_json("m", tmp_path / "dfm.json.gz",
+                                      folder=vintage_folder, compress=True)
+        plain = access_data.write_json("m", tmp_path / "dfm.json",
+                                       folder=vintage_folder)
+        assert gzip.decompress(path.read_bytes()) == plain.read_bytes()
+
+    def test_csv_file_read_once_per_group_of_labels(self, vintage_folder,
+                                                     tmp_path, monkeypatch):
+        calls = []
+        read_csv = access_data.read_csv
+
+        def counting(source, columns=None, *args, **kwargs):
+            calls.append(columns)
+            return read_csv(source, columns, *args, **kwargs)
+        monkeypatch.setattr(access_data, "read_csv", counting)
+        access_data.write_json("m", tmp_path / "dfm.json",
+                               folder=vintage_folder)
+        assert calls == [["CPI_rog", "IND_PROD_yoy"]]
+        calls.clear()
+        monkeypatch.setattr(access_data, "LABELS_PER_READ", 1)
+        path = access_data.write_json("m", tmp_path / "dfm.json",
+                                      folder=vintage_folder)
+        assert calls == [["CPI_rog"], ["IND_PROD_yoy"]]
+        assert list(json.loads(path.read_text())["data"]) == \
+            ["CPI_rog", "IND_PROD_yoy"]
+
+    def test_file_per_label(self, vintage_folder, tmp_path):
+        paths = access_data.write_label_json("m", tmp_path,
+                                             folder=vintage_folder)
+        assert [p.name for p in paths] == ["CPI_rog.m.json",
+                                           "IND_PROD_yoy.m.json"]
+        result = json.loads(paths[1].read_text())
+        assert result == {"label": "IND_PROD_yoy", "freq": "m",
+                          "index": ["2015-01-31", "2015-02-28", "2015-03-31"],
+                          "data": [99.1, None, 99.4]}
+
+    def test_benchmark_against_records(self, vintage_folder):
+        result = access_data.benchmark_json("m", vintage_folder, repeat=1)
+        sizes = {name: size for name, size, _ in result}
+        assert list(sizes) == ["records", "columns", "columns.gz"]
+        # column names are not repeated in every row
+        assert sizes["columns"] < sizes["records"]
+
+    def test_no_temporary_file_left_on_error(self, tmp_path):
+        with pytest.raises(OSError):
+            access_data.write_json("m", tmp_path / "dfm.json",
+                                   folder=tmp_path / "missing")
+        assert list(tmp_path.iterdir()) == []
+
+
+def test_get_series_from_web(url_base, tmp_path):
+    doc = dict(label="GDP_yoy", freq="a", index=["1999-12-31", "2000-12-31"],
+               data=[106.4, 110.0])
+    StandIn.body = gzip.compress(json.dumps(doc).encode("utf-8"))
+    ts = access_data.get_series_from_web("GDP_yoy", "a", url_base,
+                                         cache=WebCache(tmp_path))
+    assert ts.name == "GDP_yoy"
+    assert ts["2000"].iloc[0] == 110.0
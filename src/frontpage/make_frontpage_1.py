@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 from pathlib import Path
 import sys
-import matplotlib.pyplot as plt
 import os
 
 
@@ -103,6 +102,8 @@ class Sparkline():
 
     def plot(self):
         """Draw sparkline graph. Return Axes()."""
+        # matplotlib is slow to import, load it only to draw
+        import matplotlib.pyplot as plt
         fig = plt.figure(figsize=(2, 0.5))
         ax = fig.add_subplot(111)
         ax.plot(self.ts, 'r-')
@@ -113,6 +114,7 @@ class Sparkline():
         return ax
 
     def save(self):
+        import matplotlib.pyplot as plt
         spark(self.ts)
         plt.subplots_adjust(bottom=0.15)
         plt.savefig(self.path())
@@ -48,9 +48,8 @@ def bold(s):
     return"**{}**".format(s)
 
 
-dfa, dfq, dfm = access_data.get_dfs()
-
-LABELS = list(set(chain.from_iterable(df.columns for df in [dfa, dfq, dfm])))
+FREQ_LABELS = {freq: access_data.get_labels(freq) for freq in "aqm"}
+LABELS = list(set(chain.from_iterable(FREQ_LABELS.values())))
 VARNAMES = {lab: extract_varname(lab) for lab in LABELS}
 GROUPS = {}
 for vn in set(VARNAMES.values()):
@@ -60,6 +59,13 @@ for vn in set(VARNAMES.values()):
             common.append(lab)
     GROUPS[vn] = common
 
+# read only series shown on frontpage
+SHOWN = set(chain.from_iterable(GROUPS[vn] for vn in
+                                chain.from_iterable(cfg.SECTIONS.values())))
+SHOWN.update(chain.from_iterable(cfg.M_SECTIONS.values()))
+dfa, dfq, dfm = [access_data.load(freq, sorted(SHOWN & set(FREQ_LABELS[freq])))
+                 for freq in "aqm"]
+
 
 def get_unit_name(label, units=cfg.UNIT_NAMES):
     for key in units.keys():
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 from pathlib import Path
 import sys
-import matplotlib.pyplot as plt
 
 
 # see 'Notebooks are for exploration and communication' in
@@ -96,6 +95,8 @@ class Sparkline():
 
     def plot(self):
         """Draw sparkline graph. Return Axes()."""
+        # matplotlib is slow to import, load it only to draw
+        import matplotlib.pyplot as plt
         fig = plt.figure(figsize=(2, 0.5))
         ax = fig.add_subplot(111)
         ax.plot(self.ts, 'r-')
@@ -106,6 +107,7 @@ class Sparkline():
         return ax
 
     def save(self):
+        import matplotlib.pyplot as plt
         self.plot()
         plt.subplots_adjust(bottom=0.15)
         plt.savefig(self.path())
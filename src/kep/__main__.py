@@ -0,0 +1,35 @@
+"""Command line interface.
+
+    python -m kep watch       parse new interim releases as they land
+    python -m kep compress    compress interim CSV files
+    python -m kep serve       start job server with warm workers
+    python -m kep job         run job on server, e.g. 'job parse 2017 5'
+    python -m kep http        serve processed series over HTTP
+
+Use *python -m kep <command> --help* for command options.
+"""
+
+import importlib
+import sys
+
+# command: (module, function)
+COMMANDS = dict(watch=('kep.watch', 'main'),
+                compress=('kep.compress', 'main'),
+                serve=('kep.server', 'main_serve'),
+                job=('kep.server', 'main'),
+                http=('kep.service', 'main'))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__)
+        return 2
+    # import only modules needed for a command
+    module_name, func_name = COMMANDS[argv[0]]
+    module = importlib.import_module(module_name)
+    return getattr(module, func_name)(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
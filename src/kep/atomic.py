@@ -0,0 +1,159 @@
+"""Atomic file writes and lock files.
+
+Writers in :mod:`kep` never write to final file location directly.
+Content goes to a temporary file in the same folder, which is flushed
+to disk and renamed to final name with :func:`os.replace`. A reader
+sees either old or new complete file, never a truncated one.
+
+Main calls:
+
+    with atomic_path(path) as tmp:
+        df.to_csv(tmp)
+
+    atomic_write_text(path, text)
+
+    with file_lock(folder / '.lock'):
+        # only one process writes to *folder*
+        ...
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+import os
+import stat
+import tempfile
+import threading
+import time
+
+
+def fsync_file(path):
+    with open(str(path), 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+UMASK = _umask()
+
+
+def target_mode(path):
+    """Return permissions of existing *path*, for a new file -
+       permissions of a file created with :func:`open`."""
+    try:
+        return stat.S_IMODE(os.stat(str(path)).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
+
+
+@contextmanager
+def atomic_path(path):
+    """Yield temporary path next to *path*, move it to *path* on exit."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix='.' + path.name + '.',
+                               suffix='.tmp', dir=str(path.parent))
+    os.close(fd)
+    tmp = Path(tmp)
+    try:
+        yield tmp
+        # mkstemp creates file readable by owner only
+        os.chmod(str(tmp), target_mode(path))
+        fsync_file(tmp)
+        os.replace(str(tmp), str(path))
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def atomic_write_text(path, text, encoding='utf-8'):
+    with atomic_path(path) as tmp:
+        tmp.write_text(text, encoding=encoding)
+    return path
+
+
+def atomic_write_bytes(path, data):
+    with atomic_path(path) as tmp:
+        tmp.write_bytes(data)
+    return path
+
+
+# lock files
+
+try:
+    import fcntl
+except ImportError:
+    # not on Windows
+    fcntl = None
+
+# per thread {lock path: depth} for reentrant locks
+_local = threading.local()
+
+
+def _held():
+    if not hasattr(_local, 'held'):
+        _local.held = {}
+    return _local.held
+
+
+def _try_lock(lock_path):
+    """Return open file descriptor of *lock_path* if lock was taken,
+       None if lock is held by other process or thread."""
+    if fcntl is None:
+        try:
+            return os.open(str(lock_path),
+                           os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+    fd = os.open(str(lock_path), os.O_CREAT | os.O_RDWR, 0o666)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # previous holder may have removed the file after we opened it
+        if os.fstat(fd).st_ino == os.stat(str(lock_path)).st_ino:
+            os.ftruncate(fd, 0)
+            return fd
+    except (BlockingIOError, FileNotFoundError):
+        pass
+    os.close(fd)
+    return None
+
+
+@contextmanager
+def file_lock(lock_path, timeout=60, poll=0.1):
+    """Hold *lock_path* lock file while in context. Waits for lock held
+       by another process or thread up to *timeout* seconds, raises
+       TimeoutError. Lock is reentrant within a thread.
+
+       On POSIX the lock is :func:`fcntl.flock` on the lock file, it is
+       released by the system if holder process dies. Elsewhere lock
+       file is created exclusively and a lock file left by a dead
+       process must be removed by hand."""
+    lock_path = Path(lock_path)
+    key = str(lock_path.resolve())
+    held = _held()
+    if key in held:
+        held[key] += 1
+        try:
+            yield lock_path
+        finally:
+            held[key] -= 1
+        return
+    deadline = time.time() + timeout
+    while True:
+        fd = _try_lock(lock_path)
+        if fd is not None:
+            break
+        if time.time() > deadline:
+            raise TimeoutError("Lock is held: {}".format(lock_path))
+        time.sleep(poll)
+    os.write(fd, str(os.getpid()).encode())
+    held[key] = 1
+    try:
+        yield lock_path
+    finally:
+        del held[key]
+        # remove file before releasing lock, see inode check in _try_lock
+        lock_path.unlink()
+        os.close(fd)
@@ -0,0 +1,228 @@
+"""Content-addressed store of interim CSV file blocks.
+
+Consecutive releases repeat most of historical tables verbatim. Interim
+CSV file is cut into blocks and each distinct block is stored once under
+its hash. A release is kept as a list of block hashes (a recipe) and is
+reconstructed by concatenating blocks.
+
+Blocks end at table boundaries (same as in :func:`kep.tables.split_to_tables`)
+and after data lines selected by line content, so that a revised or
+appended data row changes one block and not the whole table.
+
+Main calls:
+
+    store_interim()                 # replace all tab.csv with tab.csv.blocks
+    store_file(path)                # replace one file
+    stats()                         # raw vs stored size
+
+Recipe *tab.csv.blocks* replaces *tab.csv* in interim folder. It is
+found by :func:`kep.files.locate_csv` and read by
+:func:`kep.rows.from_csv` like a compressed file. Blocks are kept in
+*data/interim/blocks*:
+
+    packs/<hash>.gz                 # new blocks of one file, compressed
+    index.json                      # block hash -> pack, offset, length
+
+Command line:
+
+    python -m kep.blocks
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import zlib
+from pathlib import Path
+
+import kep.files as files
+import kep.rows as rows
+from kep.atomic import atomic_write_bytes, atomic_write_text, file_lock
+
+# about one in CHUNK_MODULUS data lines ends a block
+CHUNK_MODULUS = 4
+RECIPE_SUFFIX = '.blocks'
+# subfolder of interim folder
+STORE_FOLDER = 'blocks'
+
+
+def block_hash(text):
+    """
+    >>> block_hash('')
+    'da39a3ee5e6b4b0d3255bfef95601890afd80709'
+    """
+    return hashlib.sha1(text.encode(rows.ENC)).hexdigest()
+
+
+def _is_dataline(line):
+    return rows.is_year(line.split('\t', 1)[0])
+
+
+def _is_cutpoint(line):
+    return zlib.crc32(line.encode(rows.ENC)) % CHUNK_MODULUS == 0
+
+
+def split_blocks(lines):
+    """Yield blocks of *lines*. New block starts with first non-data
+       line after data lines or after a cut point data line.
+
+    >>> list(split_blocks(['a\\n', '1999\\t1\\n', 'b\\n', '2000\\t2\\n']))
+    ['a\\n1999\\t1\\n', 'b\\n2000\\t2\\n']
+    """
+    block = []
+    in_data = False
+    for line in lines:
+        is_data = _is_dataline(line)
+        if in_data and not is_data:
+            yield ''.join(block)
+            block = []
+        block.append(line)
+        in_data = is_data
+        if is_data and _is_cutpoint(line):
+            yield ''.join(block)
+            block = []
+            in_data = False
+    if block:
+        yield ''.join(block)
+
+
+class BlockStore:
+    """Deduplicated blocks of interim CSV files."""
+
+    def __init__(self, root=None):
+        self.root = root or files.Folder.interim / STORE_FOLDER
+        self._index = None
+        self._packs = {}
+
+    @property
+    def index_path(self):
+        return self.root / 'index.json'
+
+    def _pack_path(self, name):
+        return self.root / 'packs' / "{}.gz".format(name)
+
+    @property
+    def index(self):
+        """Dictionary of block hash: (pack name, offset, length)."""
+        if self._index is None:
+            if self.index_path.exists():
+                self._index = json.loads(self.index_path.read_text())
+            else:
+                self._index = {}
+        return self._index
+
+    def _pack(self, name):
+        if name not in self._packs:
+            self._packs[name] = gzip.decompress(
+                self._pack_path(name).read_bytes())
+        return self._packs[name]
+
+    def get(self, h):
+        """Return block text by hash *h*."""
+        name, offset, length = self.index[h]
+        return self._pack(name)[offset:offset + length].decode(rows.ENC)
+
+    def _write_pack(self, blocks):
+        # blocks is a dict of hash: text, not yet in index
+        chunks = []
+        entries = {}
+        offset = 0
+        for h, text in blocks.items():
+            chunk = text.encode(rows.ENC)
+            entries[h] = [offset, len(chunk)]
+            chunks.append(chunk)
+            offset += len(chunk)
+        data = b''.join(chunks)
+        name = hashlib.sha1(data).hexdigest()
+        path = self._pack_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(path, gzip.compress(data, mtime=0))
+        return {h: [name] + pos for h, pos in entries.items()}
+
+    def add(self, path):
+        """Store blocks of CSV file *path*, return recipe."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.root / '.lock'):
+            # other process may have added blocks
+            self._index = None
+            new = {}
+            recipe = []
+            with rows.open_csv(Path(path)) as f:
+                for block in split_blocks(f):
+                    h = block_hash(block)
+                    if h not in self.index and h not in new:
+                        new[h] = block
+                    recipe.append(h)
+            if new:
+                self.index.update(self._write_pack(new))
+                atomic_write_text(self.index_path, json.dumps(self.index))
+        return recipe
+
+    def read(self, recipe):
+        """Return text made of blocks in *recipe*."""
+        return ''.join(self.get(h) for h in recipe)
+
+
+def read_recipe(path):
+    return json.loads(Path(path).read_text())
+
+
+def store_of(recipe_path):
+    """Return store of recipe in *interim/YYYY/MM* folder."""
+    return BlockStore(Path(recipe_path).parent.parent.parent / STORE_FOLDER)
+
+
+def open_blocks(path):
+    """Open recipe *path* for reading as text of CSV file."""
+    return io.StringIO(store_of(path).read(read_recipe(path)))
+
+
+def store_file(path, remove=True):
+    """Write recipe of interim CSV file *path* next to it, remove *path*
+       after checking recipe reads back same content."""
+    path = Path(path)
+    target = path.with_name(path.name + RECIPE_SUFFIX)
+    store = store_of(target)
+    recipe = store.add(path)
+    with rows.open_csv(path) as f:
+        if store.read(recipe) != f.read():
+            raise ValueError("Blocks differ from {}".format(path))
+    atomic_write_text(target, json.dumps(recipe, indent=0))
+    if remove:
+        path.unlink()
+    return target
+
+
+def store_interim(dates=None, remove=True):
+    """Replace plain interim CSV files for *dates* (default - all)
+       with recipes."""
+    done = []
+    for year, month in dates or files.filled_dates():
+        path = files.Folder(year, month).get_interim_folder() / 'tab.csv'
+        if path.exists():
+            done.append(store_file(path, remove))
+    files.get_catalog(refresh=True)
+    return done
+
+
+def stats(root=None):
+    """Return dict with number of blocks and sizes in bytes."""
+    root = root or files.Folder.interim
+    store = BlockStore(root / STORE_FOLDER)
+    refs = raw_size = 0
+    for recipe_path in root.glob('*/*/*' + RECIPE_SUFFIX):
+        recipe = read_recipe(recipe_path)
+        refs += len(recipe)
+        raw_size += sum(store.index[h][2] for h in recipe)
+    stored_size = sum(p.stat().st_size
+                      for p in store.root.glob('packs/*.gz'))
+    return dict(blocks=refs, unique_blocks=len(store.index),
+                raw_bytes=raw_size, stored_bytes=stored_size)
+
+
+if __name__ == "__main__":
+    import time
+    start = time.time()
+    store_interim()
+    print("Stored all releases in", round(time.time() - start, 2), "sec.")
+    print(stats())
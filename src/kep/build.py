@@ -0,0 +1,166 @@
+"""Incremental build of *data/processed* folders.
+
+Each processed folder gets a *build.json* manifest with inputs used to
+create dataframes:
+
+    - hash of interim CSV text, same for plain, compressed and block
+      recipe files (:func:`kep.compress.text_hash`)
+    - fingerprint of parsing specification
+    - package version
+
+and hashes of output files. A vintage is rebuilt only if any of these
+changed or an output file is missing or was modified. Hashes of existing
+files are taken from :class:`kep.catalog.Catalog`, interim CSV text is
+decoded only if its file changed since previous build, so that a run
+with nothing to rebuild does not read any data files.
+
+Output files listed in previous manifest and not made by current build,
+e.g. Parquet files after ``build(formats=('csv',))``, are removed. Other
+files in processed folders are left as is. Rebuilt vintages are
+also added to the panel store, see :mod:`kep.panel`.
+
+Main call:
+
+    report = build()         # rebuild outdated vintages only
+    report = build(force=True)
+
+*report* is a list of (year, month, reasons) for rebuilt vintages.
+"""
+
+import json
+
+import kep
+import kep.cache as cache
+import kep.compress as compress
+import kep.files as files
+from kep.atomic import atomic_write_text
+from kep.catalog import file_hash
+from kep.vintage import Vintage
+
+MANIFEST_NAME = 'build.json'
+
+
+def output_names(formats=('csv',)):
+    """
+    >>> output_names()
+    ['dfa.csv', 'dfq.csv', 'dfm.csv']
+    """
+    return ["df{}.{}".format(freq, fmt) for fmt in formats for freq in "aqm"]
+
+
+def manifest_path(year, month):
+    return files.get_processed_folder(year, month) / MANIFEST_NAME
+
+
+def read_manifest(year, month):
+    path = manifest_path(year, month)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except ValueError:
+        return {}
+
+
+def write_manifest(year, month, inputs, formats=('csv',)):
+    folder = files.get_processed_folder(year, month)
+    outputs = {fn: file_hash(folder / fn) for fn in output_names(formats)}
+    content = dict(inputs=inputs, outputs=outputs)
+    path = manifest_path(year, month)
+    return atomic_write_text(path, json.dumps(content, indent=1,
+                                              sort_keys=True))
+
+
+def current_inputs(year, month, manifest=None):
+    """Return dict of input hashes for *year* and *month*. Text hash of
+       interim CSV file is taken from build *manifest* if file did not
+       change since."""
+    if manifest is None:
+        manifest = read_manifest(year, month)
+    previous = manifest.get('inputs', {})
+    csv_path = files.locate_csv(year, month)
+    record = files.get_catalog().get('interim', year, month)
+    file_sha1 = record.get(csv_path.name, {}).get('sha1') or \
+        file_hash(csv_path)
+    if previous.get('interim_file') == file_sha1 and previous.get('interim'):
+        text_sha1 = previous['interim']
+    else:
+        text_sha1 = compress.text_hash(csv_path)
+    return dict(interim=text_sha1,
+                interim_file=file_sha1,
+                spec=cache.spec_fingerprint(),
+                version=kep.__version__)
+
+
+INPUT_REASONS = dict(interim='interim CSV changed',
+                     spec='specification changed',
+                     version='package version changed')
+
+
+def reasons_to_build(year, month, inputs=None, formats=('csv',)):
+    """Return list of reasons to rebuild vintage, empty if up-to-date."""
+    inputs = inputs or current_inputs(year, month)
+    manifest = read_manifest(year, month)
+    if not manifest:
+        return ['no build manifest']
+    reasons = [msg for key, msg in INPUT_REASONS.items()
+               if manifest['inputs'].get(key) != inputs[key]]
+    # output hashes are already known to catalog
+    records = files.get_catalog().get('processed', year, month)
+    for fn in output_names(formats):
+        if fn not in records:
+            reasons.append('{} missing'.format(fn))
+        elif manifest['outputs'].get(fn) != records[fn]['sha1']:
+            reasons.append('{} modified'.format(fn))
+    if set(manifest['outputs']) - set(output_names(formats)):
+        reasons.append('formats changed')
+    return reasons
+
+
+def remove_outputs(year, month, names):
+    """Remove files *names* from processed folder, if present."""
+    folder = files.get_processed_folder(year, month)
+    for name in names:
+        path = folder / name
+        if path.exists():
+            path.unlink()
+            print("Removed", path)
+
+
+def build(dates=None, force=False, formats=('csv',)):
+    """Save dataframes for outdated vintages in *dates* (default - all).
+
+       Returns:
+           list of (year, month, reasons) for rebuilt vintages
+    """
+    files.get_catalog(refresh=True)
+    report = []
+    dates = dates or files.filled_dates()
+    for year, month in dates:
+        inputs = current_inputs(year, month)
+        reasons = ['forced'] if force else \
+            reasons_to_build(year, month, inputs, formats)
+        if not reasons:
+            continue
+        folder = files.get_processed_folder(year, month)
+        folder.mkdir(parents=True, exist_ok=True)
+        with files.lock_folder(folder):
+            previous = read_manifest(year, month).get('outputs', {})
+            vintage = Vintage(year, month, use_cache=True)
+            vintage.save(formats, update_panel=True)
+            remove_outputs(year, month,
+                           sorted(set(previous) - set(output_names(formats))))
+            write_manifest(year, month, inputs, formats)
+        print("Rebuilt {}-{}: {}".format(year, str(month).zfill(2),
+                                         ", ".join(reasons)))
+        report.append((year, month, reasons))
+    if report:
+        # outputs were written, update their records
+        files.get_catalog(refresh=True)
+    print("Up-to-date: {} of {} vintages".format(len(dates) - len(report),
+                                                 len(dates)))
+    return report
+
+
+if __name__ == "__main__":
+    build()
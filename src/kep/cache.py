@@ -0,0 +1,105 @@
+"""Persistent cache of parsed dataframes.
+
+Parsing a CSV file into dataframes takes about a second per release.
+When neither interim CSV file nor parsing specification changed,
+dataframes can be restored from a binary copy instead.
+
+Cache entry is valid when all of the following match:
+
+    - hash of interim CSV file content (:func:`kep.cache.file_hash`)
+    - fingerprint of **SPEC** and **UNITS** (:func:`kep.cache.spec_fingerprint`)
+    - package version (*kep.__version__*)
+
+Main call:
+
+    cache = FrameCache()
+    key = make_key(csv_path)
+    dfs = cache.load(year, month, key) # None if not cached
+    cache.save(year, month, key, dfs)
+
+Cache files are stored in *data/cache/frames* and can be safely deleted.
+"""
+
+import hashlib
+import pickle
+
+import kep
+from kep.atomic import atomic_path
+from kep.catalog import file_hash
+from kep.files import Folder
+from kep.tables import get_default_spec
+
+
+def spec_fingerprint(spec=None, units=None):
+    """Return hex digest of parsing specification *spec* and *units*
+       (default - **SPEC** and **UNITS**).
+
+       Any change in header strings, required labels, readers or segment
+       boundaries results in a different fingerprint."""
+    if spec is None or units is None:
+        default_spec, default_units = get_default_spec()
+        spec = default_spec if spec is None else spec
+        units = default_units if units is None else units
+    h = hashlib.sha1()
+    h.update(repr(list(units.items())).encode('utf-8'))
+    for pdef in spec.all_definitions():
+        markers = pdef.scope.get_markers() if pdef.scope else None
+        items = [list(pdef.get_varname_mapper().items()),
+                 pdef.get_required_labels(),
+                 pdef.get_reader(),
+                 markers]
+        h.update(repr(items).encode('utf-8'))
+    return h.hexdigest()
+
+
+def make_key(csv_path, spec=None, units=None, version=kep.__version__):
+    """Return cache key for interim CSV file *csv_path*."""
+    parts = [file_hash(csv_path), spec_fingerprint(spec, units), version]
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+
+
+class FrameCache:
+    """Binary copies of dfa, dfq and dfm dataframes by year and month."""
+
+    def __init__(self, root=None):
+        self.root = root or Folder.cache / 'frames'
+
+    def _folder(self, year, month):
+        return self.root / str(year) / str(month).zfill(2)
+
+    def path(self, year, month, key):
+        return self._folder(year, month) / "{}.pickle".format(key)
+
+    def load(self, year, month, key):
+        """Return (dfa, dfq, dfm) tuple or None if no valid entry found."""
+        path = self.path(year, month, key)
+        if not path.exists():
+            return None
+        try:
+            with path.open('rb') as f:
+                return pickle.load(f)
+        # corrupt or incompatible file is same as no file
+        except Exception:
+            return None
+
+    def save(self, year, month, key, dfs):
+        """Save (dfa, dfq, dfm) tuple *dfs*, remove stale entries."""
+        folder = self._folder(year, month)
+        folder.mkdir(parents=True, exist_ok=True)
+        for stale in folder.glob("*.pickle"):
+            stale.unlink()
+        path = self.path(year, month, key)
+        with atomic_path(path) as tmp:
+            with tmp.open('wb') as f:
+                pickle.dump(tuple(dfs), f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    def clear(self):
+        for path in self.root.glob("*/*/*.pickle"):
+            path.unlink()
+
+
+if __name__ == "__main__":
+    from kep.files import locate_csv
+    print("Spec fingerprint:", spec_fingerprint())
+    print("Key for latest CSV:", make_key(locate_csv()))
@@ -0,0 +1,176 @@
+"""Catalog of available vintages in *data/interim* and *data/processed*.
+
+Folders are discovered with one :func:`os.scandir` sweep, for each file
+catalog records size, modification time and content hash. Catalog is
+persisted as JSON manifest and refreshed incrementally: hashes are
+recomputed only for files with changed size or modification time.
+
+Main calls:
+
+    cat = Catalog(interim_root, processed_root, manifest_path)
+    cat.refresh()
+    cat.dates()                      # [(2009, 4), ..., (2017, 5)]
+    cat.latest_date()                # (2017, 5)
+    cat.has_date(2013, 11)           # False
+    cat.get('processed', 2017, 5)    # {'dfa.csv': {...}, ...}
+
+In :mod:`kep.files` catalog is created once per process by
+:func:`kep.files.get_catalog`. Lookups do not touch the file system,
+code which writes data files calls ``get_catalog(refresh=True)``.
+"""
+
+import hashlib
+import json
+import os
+
+from kep.atomic import atomic_write_text
+
+TREES = ('interim', 'processed')
+# files which make a vintage available, plain CSV file preferred,
+# tab.csv.blocks is a recipe of deduplicated blocks, see kep.blocks
+INTERIM_NAMES = ('tab.csv', 'tab.csv.gz', 'tab.csv.xz', 'tab.csv.zst',
+                 'tab.csv.blocks')
+CHUNK_SIZE = 2 ** 16
+
+
+def file_hash(path):
+    """Return hex digest of *path* file content."""
+    h = hashlib.sha1()
+    with open(str(path), 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def date_key(year, month):
+    """
+    >>> date_key(2017, 5)
+    '2017-05'
+    """
+    return "{}-{}".format(year, str(month).zfill(2))
+
+
+def parse_date_key(key):
+    """
+    >>> parse_date_key('2017-05')
+    (2017, 5)
+    """
+    year, month = key.split('-')
+    return int(year), int(month)
+
+
+def scan_tree(root, previous=None):
+    """Return {date_key: {filename: record}} for *root* folder
+       with *root/YYYY/MM/filename* structure. Reuse hashes from
+       *previous* scan result for unchanged files."""
+    previous = previous or {}
+    result = {}
+    if not os.path.isdir(str(root)):
+        return result
+    with os.scandir(str(root)) as years:
+        year_dirs = [e for e in years if e.is_dir() and e.name.isdigit()]
+    for year_dir in year_dirs:
+        with os.scandir(year_dir.path) as months:
+            month_dirs = [e for e in months
+                          if e.is_dir() and e.name.isdigit()]
+        for month_dir in month_dirs:
+            key = date_key(int(year_dir.name), int(month_dir.name))
+            old = previous.get(key, {})
+            records = {}
+            with os.scandir(month_dir.path) as entries:
+                for entry in entries:
+                    # skip lock and temporary files
+                    if not entry.is_file() or entry.name.startswith('.'):
+                        continue
+                    stat = entry.stat()
+                    rec = dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                    prev = old.get(entry.name, {})
+                    if (prev.get('size'), prev.get('mtime_ns')) == \
+                            (rec['size'], rec['mtime_ns']):
+                        rec['sha1'] = prev['sha1']
+                    else:
+                        rec['sha1'] = file_hash(entry.path)
+                    records[entry.name] = rec
+            result[key] = records
+    return result
+
+
+class Catalog:
+    """Inventory of interim and processed folders by year and month."""
+
+    def __init__(self, interim, processed, manifest_path=None):
+        self.roots = dict(interim=interim, processed=processed)
+        self.manifest_path = manifest_path
+        self.trees = {tree: {} for tree in TREES}
+        self._dates = []
+        self._date_set = set()
+
+    def load(self):
+        """Read manifest file, if exists."""
+        if self.manifest_path and self.manifest_path.exists():
+            try:
+                content = json.loads(self.manifest_path.read_text())
+                self.trees = {tree: content.get(tree, {}) for tree in TREES}
+            except ValueError:
+                # broken manifest is same as no manifest
+                pass
+        self._index()
+        return self
+
+    def refresh(self):
+        """Rescan folders, update manifest file if anything changed."""
+        if not any(self.trees.values()):
+            self.load()
+        trees = {tree: scan_tree(self.roots[tree], self.trees[tree])
+                 for tree in TREES}
+        changed = trees != self.trees
+        self.trees = trees
+        self._index()
+        if changed:
+            self.save()
+        return self
+
+    def save(self):
+        if self.manifest_path:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(self.manifest_path,
+                              json.dumps(self.trees, indent=1, sort_keys=True))
+        return self.manifest_path
+
+    def _index(self):
+        dates = []
+        for key, records in self.trees['interim'].items():
+            if any(records.get(fn, {}).get('size') for fn in INTERIM_NAMES):
+                dates.append(parse_date_key(key))
+        self._dates = sorted(dates)
+        self._date_set = set(dates)
+
+    def dates(self):
+        """Return sorted list of (year, month) with interim CSV file."""
+        return list(self._dates)
+
+    def latest_date(self):
+        if not self._dates:
+            raise FileNotFoundError("No interim CSV files found in {}"
+                                    .format(self.roots['interim']))
+        return self._dates[-1]
+
+    def has_date(self, year, month):
+        return (year, month) in self._date_set
+
+    def get(self, tree, year, month):
+        """Return {filename: record} for *tree* folder by year and month."""
+        return self.trees[tree].get(date_key(year, month), {})
+
+    def __repr__(self):
+        return "Catalog({} interim, {} processed folders)".format(
+            len(self.trees['interim']), len(self.trees['processed']))
+
+
+if __name__ == "__main__":
+    import time
+    from kep.files import get_catalog
+    start = time.time()
+    cat = get_catalog()
+    print(cat, "refreshed in", round(time.time() - start, 3), "sec.")
+    print("Latest date:", cat.latest_date())
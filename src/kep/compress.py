@@ -0,0 +1,144 @@
+"""Compress interim CSV files in *data/interim*.
+
+Interim CSV files of different releases are very similar and compress
+well. Compressed file *tab.csv.gz* (or *.xz*, *.zst*) is found by
+:func:`kep.files.locate_csv` and read by :func:`kep.rows.from_csv`
+without unpacking to disk.
+
+Main calls:
+
+    compress_interim('gz')     # replace all tab.csv with tab.csv.gz
+    benchmark(2017, 5)         # compare read speed for compressed files
+
+Command line:
+
+    python -m kep compress --format xz
+    python -m kep compress --benchmark
+"""
+
+import argparse
+import gzip
+import hashlib
+import lzma
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import kep.files as files
+import kep.rows as rows
+from kep.atomic import atomic_path
+
+FORMATS = ('gz', 'xz', 'zst')
+
+
+def _gzip_writer(fileobj):
+    # no file name and time in header, same input gives same bytes
+    return gzip.GzipFile(filename='', mode='wb', fileobj=fileobj,
+                         compresslevel=9, mtime=0)
+
+
+def _xz_writer(fileobj):
+    return lzma.LZMAFile(fileobj, mode='wb', preset=9)
+
+
+def _zstd_writer(fileobj):
+    # optional dependency
+    import zstandard
+    return zstandard.ZstdCompressor(level=19).stream_writer(fileobj)
+
+
+WRITERS = dict(gz=_gzip_writer, xz=_xz_writer, zst=_zstd_writer)
+
+
+def text_hash(path):
+    """Return hex digest of decompressed content of *path*."""
+    h = hashlib.sha1()
+    with rows.open_csv(Path(path)) as f:
+        for line in f:
+            h.update(line.encode(rows.ENC))
+    return h.hexdigest()
+
+
+def compress_file(path, fmt='gz', remove=True):
+    """Write *path* compressed with *fmt* next to it, remove *path*
+       after checking compressed file reads back same content."""
+    if fmt not in FORMATS:
+        raise ValueError(fmt)
+    path = Path(path)
+    target = path.with_name(path.name + '.' + fmt)
+    with atomic_path(target) as tmp:
+        with path.open('rb') as src, tmp.open('wb') as raw:
+            with WRITERS[fmt](raw) as dst:
+                shutil.copyfileobj(src, dst)
+    if text_hash(target) != text_hash(path):
+        target.unlink()
+        raise ValueError("Compressed file differs from {}".format(path))
+    if remove:
+        path.unlink()
+    return target
+
+
+def compress_interim(fmt='gz', dates=None, remove=True):
+    """Compress plain interim CSV files for *dates* (default - all)."""
+    done = []
+    for year, month in dates or files.filled_dates():
+        path = files.Folder(year, month).get_interim_folder() / 'tab.csv'
+        if path.exists():
+            size = path.stat().st_size
+            target = compress_file(path, fmt, remove)
+            print("{} {:>8} -> {:>7} bytes".format(
+                target, size, target.stat().st_size))
+            done.append(target)
+    files.get_catalog(refresh=True)
+    return done
+
+
+def _read_time(path, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _ in rows.from_csv(path):
+            pass
+    return (time.perf_counter() - start) / repeat
+
+
+def benchmark(year=None, month=None, formats=('gz', 'xz'), repeat=5):
+    """Return list of (format, size, seconds to read) for interim CSV
+       file by *year* and *month* compressed with *formats*."""
+    src = files.locate_csv(year, month)
+    result = []
+    with tempfile.TemporaryDirectory() as folder:
+        plain = Path(folder) / 'tab.csv'
+        with rows.open_csv(src) as f:
+            plain.write_text(f.read(), encoding=rows.ENC)
+        result.append(('csv', plain.stat().st_size, _read_time(plain, repeat)))
+        for fmt in formats:
+            path = compress_file(plain, fmt, remove=False)
+            result.append((fmt, path.stat().st_size,
+                           _read_time(path, repeat)))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m kep compress',
+        description='Compress interim CSV files in data/interim')
+    parser.add_argument('--format', choices=FORMATS, default='gz')
+    parser.add_argument('--keep', action='store_true',
+                        help='keep plain CSV files')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='compare read speed, do not change files')
+    args = parser.parse_args(argv)
+    if args.benchmark:
+        result = benchmark()
+        # throughput is measured in uncompressed bytes
+        plain_size = result[0][1]
+        for fmt, size, sec in result:
+            print("{:<4} {:>8} bytes {:>8.1f} ms {:>6.1f} MB/s".format(
+                fmt, size, sec * 1000, plain_size / sec / 2**20))
+    else:
+        compress_interim(args.format, remove=not args.keep)
+
+
+if __name__ == "__main__":
+    main()
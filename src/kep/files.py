@@ -4,6 +4,8 @@ Functions based on :class:`kep.files.Folder` class methods:
 
     - :func:`kep.files.get_latest_date` returns latest available
       year and month
+    - :func:`kep.files.filled_dates` returns all available years and
+      months, as found by :class:`kep.catalog.Catalog`
     - :func:`kep.files.locate_csv` retrieves interim CSV file for parsing
       from *data/interim* folder by year and month
     - based on year and month :func:`kep.files.get_processed_folder` provides
@@ -13,8 +15,9 @@ Functions based on :class:`kep.files.Folder` class methods:
 For housekeeping :mod:`kep.files` provides:
 
  - :func:`kep.files.init_dirs` - make directory structure on startup
- - :func:`kep.files.copy_latest` - copy CSVs to *latest* folder which
-   has stable URL
+ - :func:`kep.files.copy_latest` - publish CSVs to *latest* folder which
+   has stable URL, readers never see partially updated folder, with
+   per-series JSON files in *latest/series*
 
 
 For reference - data directory structure::
@@ -30,10 +33,17 @@ For reference - data directory structure::
           \\2017
           \\2016
           \\...
+      \\cache (not tracked, safe to delete)
 """
 
 from pathlib import Path
+import json
+import os
 import shutil
+import tempfile
+
+from kep.atomic import file_lock
+from kep.catalog import Catalog, INTERIM_NAMES
 
 # csv file parameters
 ENC = 'utf8'
@@ -43,35 +53,12 @@ CSV_FORMAT = dict(delimiter='\t', lineterminator='\n')
 levels_up = 2
 data_folder = Path(__file__).parents[levels_up] / 'data'
 
-# FIXME: hardcoded constant will not update to new months
-DATES = [(2009, 4), (2009, 5), (2009, 6),
-         (2009, 7), (2009, 8), (2009, 9), (2009, 10), (2009, 11), (2009, 12),
-
-         (2010, 1), (2010, 2), (2010, 3), (2010, 4), (2010, 5), (2010, 6),
-         (2010, 7), (2010, 8), (2010, 9), (2010, 10), (2010, 11), (2010, 12),
-
-         (2011, 1), (2011, 2), (2011, 3), (2011, 4), (2011, 5), (2011, 6),
-         (2011, 7), (2011, 8), (2011, 9), (2011, 10), (2011, 11), (2011, 12),
-
-         (2012, 1), (2012, 2), (2012, 3), (2012, 4), (2012, 5), (2012, 6),
-         (2012, 7), (2012, 8), (2012, 9), (2012, 10), (2012, 11), (2012, 12),
-
-         (2013, 1), (2013, 2), (2013, 3), (2013, 4), (2013, 5), (2013, 6),
-         (2013, 7), (2013, 8), (2013, 9), (2013, 10),  # missing (2013, 11)
-         (2013, 12),
-
-         (2014, 1), (2014, 2), (2014, 3), (2014, 4), (2014, 5), (2014, 6),
-         (2014, 7), (2014, 8), (2014, 9), (2014, 10), (2014, 11), (2014, 12),
-
-         (2015, 1), (2015, 2), (2015, 3), (2015, 4), (2015, 5), (2015, 6),
-         (2015, 7), (2015, 8), (2015, 9), (2015, 10), (2015, 11), (2015, 12),
-
-         (2016, 1), (2016, 2), (2016, 3), (2016, 4), (2016, 5), (2016, 6),
-         (2016, 7), (2016, 8), (2016, 9), (2016, 10), (2016, 11), (2016, 12),
+# end user functions
 
-         (2017, 1), (2017, 2), (2017, 3), (2017, 4), (2017, 5)]
 
-# end user functions
+def filled_dates():
+    """Return sorted list of (year, month) with interim CSV file."""
+    return get_catalog().dates()
 
 
 def get_latest_date():
@@ -86,17 +73,18 @@ def get_latest_date():
 
 def locate_csv(year: int=None, month: int=None):
     """Return interim CSV file based on *year* and *month*.
+       File may be compressed, see :func:`kep.rows.open_csv`.
 
     Returns:
         pathlib.Path() instance
     """
     folder = Folder(year, month).get_interim_folder()
-    csv_path = folder / "tab.csv"
-    if csv_path.exists() and csv_path.stat().st_size > 0:
-        return csv_path
-    else:
-        raise FileNotFoundError(
-            "Not found or has zero length: {}".format(csv_path))
+    for name in INTERIM_NAMES:
+        csv_path = folder / name
+        if csv_path.exists() and csv_path.stat().st_size > 0:
+            return csv_path
+    raise FileNotFoundError(
+        "Not found or has zero length: {}".format(folder / INTERIM_NAMES[0]))
 
 
 def get_processed_folder(year, month):
@@ -117,19 +105,11 @@ class Folder:
     interim = data_folder / 'interim'
     processed = data_folder / 'processed'
     latest = processed / 'latest'
-    supported_dates = DATES
+    cache = data_folder / 'cache'
 
     @classmethod
     def get_latest_date(cls):
-        root = cls.interim
-
-        def max_subfolder(folder):
-            _lst = [f.name for f in folder.iterdir() if f.is_dir()]
-            return int(max(_lst))
-        year = max_subfolder(root)
-        _subfolder = root / str(year)
-        month = max_subfolder(_subfolder)
-        return year, month
+        return get_catalog().latest_date()
 
     @classmethod
     def filter_date(cls, year, month):
@@ -137,7 +117,7 @@ class Folder:
         if not year or not month:
             year, month = cls.get_latest_date()
         # check if date is available
-        if (year, month) in cls.supported_dates:
+        if get_catalog().has_date(year, month):
             return year, month
         else:
             msg = "Year and month not found: {} {}".format(year, month)
@@ -159,7 +139,28 @@ class Folder:
         return "Folder({}, {})".format(self.year, self.month)
 
 
-# create local data dirs for DATES
+# catalog of available dates, created once per process
+
+_catalog = None
+
+
+def get_catalog(refresh=False):
+    """Return :class:`kep.catalog.Catalog` for data folder.
+       Folders are scanned on first call in a process and if *refresh*
+       is True, files with changed size or modification time are hashed
+       again. Call with *refresh* True after adding or changing files."""
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog(interim=Folder.interim,
+                           processed=Folder.processed,
+                           manifest_path=Folder.cache / 'manifest.json')
+        refresh = True
+    if refresh:
+        _catalog.refresh()
+    return _catalog
+
+
+# create local data dirs for available dates
 
 
 def md(folder):
@@ -175,32 +176,133 @@ def md(folder):
 def init_dirs(supported_dates=None):
     """Create required directory structure in *data* folder."""
     if not supported_dates:
-        supported_dates = DATES
+        supported_dates = filled_dates()
     for (year, month) in supported_dates:
         f = Folder(year, month)
         md(f.get_interim_folder())
         md(f.get_processed_folder())
 
 
-# housekeeping  - copy contents to 'processed/latest' folder
+LOCK_NAME = '.lock'
+
+
+def lock_folder(folder, timeout=60):
+    """Lock *folder* for writing by one process at a time."""
+    return file_lock(folder / LOCK_NAME, timeout)
 
 
-def copy_latest():
-    """Copy all files from folder like *processed/2017/04* to
+# housekeeping  - publish contents to 'processed/latest' folder
+
+PUBLISH_MANIFEST = 'publish.json'
+# build manifest describes its own folder, not published
+NOT_PUBLISHED = ['build.json']
+
+
+def link_or_copy(src, dst):
+    """Hard link *src* to *dst*, copy if hard links are not supported."""
+    try:
+        os.link(str(src), str(dst))
+    except OSError:
+        shutil.copyfile(str(src), str(dst))
+
+
+def read_publish_manifest(folder):
+    try:
+        return json.loads((folder / PUBLISH_MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _swap_directory(staging, target):
+    # two renames - *target* is absent for a moment, but never half-updated
+    old = None
+    if target.exists() or target.is_symlink():
+        old = Path(tempfile.mkdtemp(prefix='.latest-old-',
+                                    dir=str(target.parent)))
+        os.replace(str(target), str(old / target.name))
+    os.replace(str(staging), str(target))
+    if old:
+        shutil.rmtree(str(old))
+
+
+def _swap_symlink(staging, target):
+    # single rename of symlink - readers see either old or new snapshot
+    previous = None
+    if target.is_symlink():
+        previous = target.resolve()
+    elif target.exists():
+        # first switch from folder to symlink
+        previous = staging.with_name(staging.name + '-old')
+        os.replace(str(target), str(previous))
+    link = staging.with_name(staging.name + '-link')
+    os.symlink(staging.name, str(link))
+    os.replace(str(link), str(target))
+    if previous and previous.exists():
+        shutil.rmtree(str(previous))
+
+
+def file_stat(path):
+    """Return [size, mtime in ns, inode] of *path*. An atomic replace
+       changes inode, a rewrite in place changes mtime."""
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+def copy_latest(mode='symlink', series=True):
+    """Publish all files from folder like *processed/2017/04* to
        *processed/latest* folder.
 
+       Files are hard linked to a staging folder, which replaces
+       *processed/latest* in one step, so that readers never see a mix
+       of old and new files. Publication is skipped if source files did
+       not change since previous call, compared by :func:`file_stat`
+       without reading them.
+
+       *mode* is 'symlink' (default, *processed/latest* is a symbolic
+       link to a hidden snapshot folder, swapped with one rename) or
+       'rename' (replace folder, *processed/latest* is missing for a
+       moment between two renames).
+
+       With *series* True, also writes per-series JSON files to
+       *processed/latest/series*, see :mod:`kep.series`.
+
        Returns:
-           list of files copied
+           list of source files published, empty if nothing changed
     """
     year, month = get_latest_date()
     src_folder = get_processed_folder(year, month)
-    copied = []
-    for src in [f for f in src_folder.iterdir() if f.is_file()]:
-        dst = Folder.latest / src.name
-        shutil.copyfile(src, dst)
-        copied.append(dst)
-    print("Updated folder", Folder.latest)
-    return copied
+    # skip lock and temporary files
+    sources = sorted(f for f in src_folder.iterdir()
+                     if f.is_file() and f.name not in NOT_PUBLISHED and
+                     not f.name.startswith('.'))
+    target = Folder.latest
+    if mode not in ('rename', 'symlink'):
+        raise ValueError(mode)
+    with file_lock(target.parent / '.latest.lock'):
+        # stat before linking: a file replaced meanwhile is published
+        # again on next call
+        stats = {src.name: file_stat(src) for src in sources}
+        manifest = dict(source="{}/{}".format(year, str(month).zfill(2)),
+                        files=stats)
+        if read_publish_manifest(target) == manifest:
+            print("Folder is up to date:", target)
+            return []
+        staging = Path(tempfile.mkdtemp(prefix='.latest-',
+                                        dir=str(target.parent)))
+        for src in sources:
+            link_or_copy(src, staging / src.name)
+        if series:
+            # imports pandas
+            from kep.series import write_series
+            write_series(src_folder, staging)
+        (staging / PUBLISH_MANIFEST).write_text(
+            json.dumps(manifest, indent=1, sort_keys=True))
+        if mode == 'rename':
+            _swap_directory(staging, target)
+        else:
+            _swap_symlink(staging, target)
+    print("Updated folder", target)
+    return [target / src.name for src in sources]
 
 
 if __name__ == "__main__":
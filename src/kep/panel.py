@@ -0,0 +1,172 @@
+"""Consolidated store of all vintages in long format.
+
+Processed data is saved by vintage as wide dataframes in
+*data/processed/YYYY/MM/df*.csv* files. Questions across vintages,
+like "all releases of GDP_yoy", require reading every folder.
+
+:class:`kep.panel.PanelStore` keeps all vintages as one Parquet dataset
+with following columns:
+
+    - vintage (str, like '2017-05')
+    - label (str, like 'GDP_yoy')
+    - freq ('a', 'q' or 'm')
+    - period (datetime, end of year, quarter or month)
+    - value (float)
+
+Each vintage is a partition in its own file, so that adding a vintage
+does not rewrite the others:
+
+    data/processed/panel/vintage=2017-05/part.parquet
+
+*label* and *freq* are dictionary-encoded, rows are sorted by label,
+so that reading one label touches a small part of each file.
+
+Main calls:
+
+    store = PanelStore()
+    store.update(year, month, dfs)       # add or replace a vintage
+    df = store.read(label='GDP_yoy')     # all vintages of one label
+
+Requires pyarrow package.
+"""
+
+import pandas as pd
+
+from kep.atomic import atomic_path
+from kep.files import Folder, filled_dates
+from kep.vintage import DATE_COLUMNS, read_dataframe
+
+COLUMNS = ['vintage', 'label', 'freq', 'period', 'value']
+CATEGORIES = ['vintage', 'label', 'freq']
+PART_NAME = 'part.parquet'
+ROW_GROUP_SIZE = 50000
+
+
+def available():
+    """Return True if Parquet engine is installed."""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def vintage_name(year, month):
+    """
+    >>> vintage_name(2017, 5)
+    '2017-05'
+    """
+    return "{}-{}".format(year, str(month).zfill(2))
+
+
+def to_long(dfs, vintage):
+    """Convert wide dataframes *dfs* (dfa, dfq, dfm) to long format."""
+    parts = []
+    for freq, df in zip("aqm", dfs):
+        df = df.drop([c for c in DATE_COLUMNS if c in df.columns], axis=1)
+        df = df.rename_axis('period').rename_axis('label', axis=1)
+        long = df.stack().dropna().rename('value').reset_index()
+        long['freq'] = freq
+        parts.append(long)
+    df = pd.concat(parts, ignore_index=True)
+    df['vintage'] = vintage
+    df['period'] = pd.to_datetime(df['period'])
+    df['value'] = df['value'].astype('float64')
+    return df[COLUMNS]
+
+
+def _encode(df):
+    df = df.sort_values(['label', 'freq', 'period'])
+    df = df.reset_index(drop=True)
+    for col in ['label', 'freq']:
+        df[col] = df[col].astype(str).astype('category')
+    return df
+
+
+def _partitioning():
+    # vintage is a string, do not guess type from folder names
+    import pyarrow
+    import pyarrow.dataset
+    return pyarrow.dataset.partitioning(
+        pyarrow.schema([('vintage', pyarrow.string())]), flavor='hive')
+
+
+class PanelStore:
+    """Long-format table of all vintages, one Parquet file per vintage."""
+
+    def __init__(self, root=None):
+        self.root = root or Folder.processed / 'panel'
+
+    def part_path(self, vintage):
+        return self.root / 'vintage={}'.format(vintage) / PART_NAME
+
+    def exists(self):
+        return bool(self.vintages())
+
+    def read(self, label=None, freq=None, vintage=None):
+        """Return rows for *label*, *freq* and *vintage*, each can be
+           a string, a list of strings or None (no filter)."""
+        if not self.exists():
+            return pd.DataFrame(columns=COLUMNS)
+        filters = []
+        for col, x in [('label', label), ('freq', freq),
+                       ('vintage', vintage)]:
+            if x is not None:
+                values = [x] if isinstance(x, str) else list(x)
+                filters.append((col, 'in', values))
+        df = pd.read_parquet(self.root, filters=filters or None,
+                             partitioning=_partitioning())
+        df['vintage'] = df['vintage'].astype('category')
+        return df[COLUMNS]
+
+    def vintages(self):
+        if not self.root.exists():
+            return []
+        return sorted(p.parent.name.split('=', 1)[1]
+                      for p in self.root.glob('vintage=*/' + PART_NAME))
+
+    def write(self, df):
+        """Write partition for each vintage in *df*."""
+        for vintage, part in df.groupby('vintage', observed=True):
+            path = self.part_path(vintage)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # temporary file name starts with dot, readers skip it
+            with atomic_path(path) as tmp:
+                _encode(part.drop('vintage', axis=1)).to_parquet(
+                    tmp, index=False, compression='zstd',
+                    row_group_size=ROW_GROUP_SIZE)
+        return self.root
+
+    def update(self, year, month, dfs):
+        """Add or replace vintage for *year* and *month* in store."""
+        return self.write(to_long(dfs, vintage_name(year, month)))
+
+    def rebuild(self, dates=None):
+        """Create store from CSV files in *data/processed*."""
+        return self.write(read_processed(dates))
+
+
+def read_processed(dates=None):
+    """Return long-format dataframe for all vintages saved as CSV files
+       in *data/processed*."""
+    parts = []
+    for year, month in dates or filled_dates():
+        folder = Folder(year, month).get_processed_folder()
+        if not (folder / 'dfm.csv').exists():
+            continue
+        dfs = [read_dataframe(folder / "df{}.csv".format(freq))
+               for freq in "aqm"]
+        parts.append(to_long(dfs, vintage_name(year, month)))
+    return pd.concat(parts, ignore_index=True)
+
+
+if __name__ == "__main__":
+    import time
+    store = PanelStore()
+    start = time.time()
+    store.rebuild()
+    print("Built", store.root, "in", round(time.time() - start, 2), "sec.")
+    start = time.time()
+    df = store.read(label='GDP_yoy', freq='q')
+    print(len(df), "rows for GDP_yoy read in",
+          round(time.time() - start, 3), "sec.")
@@ -0,0 +1,223 @@
+"""Real-time (as-of) queries over vintage history.
+
+Answers questions like "what was the value of CPI_rog for 2016-03 as
+known in release 2016-06" without loading Vintage objects one by one.
+
+:class:`kep.realtime.AsOfIndex` holds, for every (label, freq, period)
+key, a sorted array of vintages and values observed in these vintages.
+
+Main calls:
+
+    ix = AsOfIndex.from_processed()
+    ix.as_of('CPI_rog', '2016-03', vintage='2016-06')
+    ix.triangle('GDP_yoy', freq='q')    # periods x vintages dataframe
+    ix.save(path)
+    ix = AsOfIndex.load(path)
+
+Vintage is given as '2016-06' string or (2016, 6) tuple. Period is a
+string like '2016' (annual), '2016Q1' (quarterly) or '2016-03' (monthly),
+frequency is inferred from period string unless *freq* is given.
+"""
+
+import numpy as np
+import pandas as pd
+
+import kep.panel as panel
+from kep.atomic import atomic_path
+
+FREQ_CODES = "aqm"
+PERIOD_FREQ = {'Y': 'a', 'A': 'a', 'Q': 'q', 'M': 'm'}
+
+
+def vintage_code(vintage):
+    """Return integer month number for *vintage*.
+
+    >>> vintage_code('2016-06') == vintage_code((2016, 6))
+    True
+    """
+    if isinstance(vintage, str):
+        year, month = map(int, vintage.split("-"))
+    else:
+        year, month = vintage
+    return year * 12 + month - 1
+
+
+def vintage_name(code):
+    """
+    >>> vintage_name(vintage_code('2016-06'))
+    '2016-06'
+    """
+    year, month = divmod(int(code), 12)
+    return panel.vintage_name(year, month + 1)
+
+
+def period_end(period, freq=None):
+    """Return (freq, end date) for *period* string like '2016-03'.
+
+    >>> freq, dt = period_end('2016Q1')
+    >>> freq, str(dt)
+    ('q', '2016-03-31')
+    """
+    if freq:
+        alias = {'a': 'Y', 'q': 'Q', 'm': 'M'}[freq]
+        p = pd.Period(period, freq=alias)
+    else:
+        p = pd.Period(period)
+        freq = PERIOD_FREQ[p.freqstr[0]]
+    return freq, np.datetime64(p.end_time.date(), 'D')
+
+
+def _map_unique(series, func):
+    # apply *func* to few unique values only, not to every row
+    codes, uniques = pd.factorize(series.astype(str))
+    return np.array([func(x) for x in uniques])[codes]
+
+
+class AsOfIndex:
+    """Sorted arrays of (vintage, value) by (label, freq, period) key.
+
+       Keys are sorted by label, freq and period, so that all periods
+       of one label and frequency are a contiguous slice.
+
+       Attributes:
+           labels (array of str)
+           key_label, key_freq (arrays of int) - codes for each key
+           key_period (array of datetime64[D])
+           offsets (array of int) - observations for key *i* are in
+                                    [offsets[i], offsets[i+1])
+           vintages (array of int) - see :func:`vintage_code`
+           values (array of float)
+    """
+
+    ARRAYS = ['labels', 'key_label', 'key_freq', 'key_period', 'offsets',
+              'vintages', 'values']
+
+    def __init__(self, labels, key_label, key_freq, key_period, offsets,
+                 vintages, values):
+        self.labels = np.asarray(labels, dtype=str)
+        self.key_label = np.asarray(key_label, dtype=np.int32)
+        self.key_freq = np.asarray(key_freq, dtype=np.int8)
+        self.key_period = np.asarray(key_period, dtype='datetime64[D]')
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.vintages = np.asarray(vintages, dtype=np.int32)
+        self.values = np.asarray(values, dtype=np.float64)
+        self._label_codes = {lab: i for i, lab in enumerate(self.labels)}
+        self._keys = {(k_lab, k_freq, k_per): i for i, (k_lab, k_freq, k_per)
+                      in enumerate(zip(self.key_label.tolist(),
+                                       self.key_freq.tolist(),
+                                       self.key_period.tolist()))}
+
+    @classmethod
+    def from_long(cls, df):
+        """Build index from long-format dataframe with *vintage*, *label*,
+           *freq*, *period* and *value* columns (see :mod:`kep.panel`)."""
+        labels = np.array(sorted(df.label.astype(str).unique()))
+        lab = np.searchsorted(labels, df.label.astype(str).values)
+        freq = _map_unique(df.freq, FREQ_CODES.index)
+        period = df.period.values.astype('datetime64[D]')
+        vint = _map_unique(df.vintage, vintage_code)
+        order = np.lexsort((vint, period, freq, lab))
+        lab, freq, period, vint = lab[order], freq[order], \
+            period[order], vint[order]
+        values = df.value.values.astype(np.float64)[order]
+        # new key starts where any of label, freq or period changes
+        is_new = np.ones(len(order), dtype=bool)
+        is_new[1:] = ((lab[1:] != lab[:-1]) | (freq[1:] != freq[:-1]) |
+                      (period[1:] != period[:-1]))
+        starts = np.flatnonzero(is_new)
+        offsets = np.append(starts, len(order))
+        return cls(labels, lab[starts], freq[starts], period[starts],
+                   offsets, vint, values)
+
+    @classmethod
+    def from_panel(cls, store=None):
+        store = store or panel.PanelStore()
+        return cls.from_long(store.read())
+
+    @classmethod
+    def from_processed(cls, dates=None):
+        return cls.from_long(panel.read_processed(dates))
+
+    def save(self, path):
+        """Save arrays to *path* (.npz file)."""
+        with atomic_path(path) as tmp:
+            with tmp.open('wb') as f:
+                np.savez_compressed(f, **{k: getattr(self, k)
+                                          for k in self.ARRAYS})
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(str(path), allow_pickle=False) as arrays:
+            return cls(**{k: arrays[k] for k in cls.ARRAYS})
+
+    def all_vintages(self):
+        return [vintage_name(v) for v in np.unique(self.vintages)]
+
+    def _key(self, label, freq, period):
+        lab = self._label_codes[label]
+        return self._keys[(lab, FREQ_CODES.index(freq), period.item())]
+
+    def as_of(self, label, period, vintage, freq=None):
+        """Return value of *label* for *period* as known in *vintage*.
+           Returns NaN if value was not yet released in *vintage*."""
+        freq, dt = period_end(period, freq)
+        try:
+            i = self._key(label, freq, dt)
+        except KeyError:
+            return np.nan
+        start, end = self.offsets[i], self.offsets[i + 1]
+        # last observation with vintage <= requested vintage
+        pos = np.searchsorted(self.vintages[start:end],
+                              vintage_code(vintage), side='right') - 1
+        if pos < 0:
+            return np.nan
+        return self.values[start + pos]
+
+    def _slice(self, label, freq):
+        """Return [first, last) key positions for *label* and *freq*."""
+        lab = self._label_codes[label]
+        keys = np.flatnonzero((self.key_label == lab) &
+                              (self.key_freq == FREQ_CODES.index(freq)))
+        if not len(keys):
+            raise KeyError((label, freq))
+        return keys[0], keys[-1] + 1
+
+    def triangle(self, label, freq='m', vintages=None):
+        """Return real-time triangle for *label* at *freq* as dataframe,
+           periods in rows, vintages in columns. Cell holds value
+           for period as known in vintage."""
+        k0, k1 = self._slice(label, freq)
+        start, end = self.offsets[k0], self.offsets[k1]
+        if vintages is None:
+            cols = np.unique(self.vintages)
+        else:
+            cols = np.array(sorted(vintage_code(v) for v in vintages))
+        counts = np.diff(self.offsets[k0:k1 + 1])
+        rows = np.repeat(np.arange(k1 - k0), counts)
+        obs_vint = self.vintages[start:end]
+        # place each observation in first requested vintage at or after it
+        col = np.searchsorted(cols, obs_vint, side='left')
+        mask = col < len(cols)
+        matrix = np.full((k1 - k0, len(cols)), np.nan)
+        matrix[rows[mask], col[mask]] = self.values[start:end][mask]
+        # carry last known value forward to later vintages
+        ix = np.where(np.isnan(matrix), 0, np.arange(len(cols)))
+        ix = np.maximum.accumulate(ix, axis=1)
+        matrix = matrix[np.arange(k1 - k0)[:, None], ix]
+        return pd.DataFrame(matrix,
+                            index=pd.DatetimeIndex(self.key_period[k0:k1]),
+                            columns=[vintage_name(v) for v in cols])
+
+    def __repr__(self):
+        return "AsOfIndex({} labels, {} keys, {} observations)".format(
+            len(self.labels), len(self.key_label), len(self.values))
+
+
+if __name__ == "__main__":
+    import time
+    start = time.time()
+    ix = AsOfIndex.from_processed()
+    print(ix, "built in", round(time.time() - start, 2), "sec.")
+    print(ix.as_of('CPI_rog', '2016-03', vintage='2016-06'))
+    print(ix.triangle('GDP_yoy', freq='q').iloc[-5:, -5:])
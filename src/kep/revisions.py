@@ -0,0 +1,217 @@
+"""Revisions of datapoints between vintages.
+
+Two vintages are compared cell by cell after aligning their wide
+dataframes on dates and labels. A datapoint is:
+
+    - 'revised' if present in both vintages with different values
+    - 'added' if present only in newer vintage
+    - 'removed' if present only in older vintage
+
+Main calls:
+
+    d = diff(Vintage(2017, 4), Vintage(2017, 5))
+    d.table             # one row per changed datapoint
+    d.labels_added      # labels which appeared in newer vintage
+    d.summary()         # revision statistics by label
+
+    table = sweep()     # same table for all consecutive vintages
+    summary(table)
+    label_changes()     # labels appeared or disappeared by vintage
+
+All comparisons are done on NumPy arrays with boolean masks,
+:func:`kep.revisions.sweep` processes the whole history in one pass over
+long-format data (see :mod:`kep.panel`).
+"""
+
+import numpy as np
+import pandas as pd
+
+import kep.panel as panel
+
+TABLE_COLUMNS = ['vintage', 'label', 'freq', 'period', 'kind',
+                 'old', 'new', 'change']
+
+
+def _wide(df):
+    return df.drop([c for c in panel.DATE_COLUMNS if c in df.columns],
+                   axis=1)
+
+
+def _dfs(vintage):
+    # accept Vintage instance or (dfa, dfq, dfm) tuple
+    if hasattr(vintage, 'dfs'):
+        return vintage.dfs()
+    return tuple(vintage)
+
+
+def _name(vintage):
+    if hasattr(vintage, 'year'):
+        return panel.vintage_name(vintage.year, vintage.month)
+    return None
+
+
+def compare_frames(df_a, df_b):
+    """Return long table of changed cells between wide dataframes
+       *df_a* (older) and *df_b* (newer)."""
+    df_a, df_b = _wide(df_a), _wide(df_b)
+    index = df_a.index.union(df_b.index)
+    columns = df_a.columns.union(df_b.columns)
+    a = df_a.reindex(index=index, columns=columns).values.astype(float)
+    b = df_b.reindex(index=index, columns=columns).values.astype(float)
+    has_a, has_b = ~np.isnan(a), ~np.isnan(b)
+    kinds = [('revised', has_a & has_b & (a != b)),
+             ('added', ~has_a & has_b),
+             ('removed', has_a & ~has_b)]
+    parts = []
+    for kind, mask in kinds:
+        i, j = np.nonzero(mask)
+        parts.append(pd.DataFrame({'label': columns.values[j],
+                                   'period': index.values[i],
+                                   'kind': kind,
+                                   'old': a[i, j],
+                                   'new': b[i, j]}))
+    table = pd.concat(parts, ignore_index=True)
+    table['change'] = table['new'] - table['old']
+    return table
+
+
+class Diff:
+    """Changes between *vintage_a* (older) and *vintage_b* (newer)."""
+
+    def __init__(self, vintage_a, vintage_b):
+        parts = []
+        self.labels_added = []
+        self.labels_removed = []
+        for freq, df_a, df_b in zip("aqm", _dfs(vintage_a), _dfs(vintage_b)):
+            t = compare_frames(df_a, df_b)
+            t['freq'] = freq
+            parts.append(t)
+            cols_a, cols_b = set(_wide(df_a).columns), set(_wide(df_b).columns)
+            self.labels_added.extend(sorted(cols_b - cols_a))
+            self.labels_removed.extend(sorted(cols_a - cols_b))
+        self.labels_added = sorted(set(self.labels_added))
+        self.labels_removed = sorted(set(self.labels_removed))
+        self.table = pd.concat(parts, ignore_index=True)
+        self.table['vintage'] = _name(vintage_b)
+        self.table = self.table[TABLE_COLUMNS]
+
+    def revised(self):
+        return self.table[self.table.kind == 'revised']
+
+    def summary(self):
+        return summary(self.table)
+
+    def __repr__(self):
+        counts = self.table.kind.value_counts()
+        return "Diff({} revised, {} added, {} removed)".format(
+            counts.get('revised', 0), counts.get('added', 0),
+            counts.get('removed', 0))
+
+
+def diff(vintage_a, vintage_b):
+    """Return :class:`kep.revisions.Diff` between two vintages."""
+    return Diff(vintage_a, vintage_b)
+
+
+def _read_history():
+    store = panel.PanelStore()
+    if panel.available() and store.exists():
+        return store.read()
+    return panel.read_processed()
+
+
+def sweep(df=None):
+    """Return table of changes between all consecutive vintages.
+
+       *df* is long-format dataframe as in :mod:`kep.panel`, by default
+       read from panel store or *data/processed* CSV files."""
+    if df is None:
+        df = _read_history()
+    vintages = np.array(sorted(df.vintage.astype(str).unique()))
+    vint = np.searchsorted(vintages, df.vintage.astype(str).values)
+    label = df.label.astype(str).values
+    freq = df.freq.astype(str).values
+    period = df.period.values
+    value = df.value.values.astype(float)
+    order = np.lexsort((vint, period, freq, label))
+    vint, label, freq, period, value = \
+        vint[order], label[order], freq[order], period[order], value[order]
+    n = len(order)
+    same_key = np.zeros(n, dtype=bool)
+    same_key[1:] = ((label[1:] == label[:-1]) & (freq[1:] == freq[:-1]) &
+                    (period[1:] == period[:-1]))
+    # row follows same key in immediately preceding vintage
+    follows = np.zeros(n, dtype=bool)
+    follows[1:] = same_key[1:] & (vint[1:] == vint[:-1] + 1)
+    prev_value = np.full(n, np.nan)
+    prev_value[1:] = value[:-1]
+    # row is followed by same key in next vintage
+    followed = np.zeros(n, dtype=bool)
+    followed[:-1] = follows[1:]
+    kinds = [('revised', follows & (value != prev_value),
+              vint, prev_value, value),
+             ('added', ~follows & (vint > 0),
+              vint, np.nan, value),
+             ('removed', ~followed & (vint < len(vintages) - 1),
+              vint + 1, value, np.nan)]
+    parts = []
+    for kind, mask, v, old, new in kinds:
+        old = np.broadcast_to(old, n)[mask]
+        new = np.broadcast_to(new, n)[mask]
+        parts.append(pd.DataFrame({'vintage': vintages[v[mask]],
+                                   'label': label[mask],
+                                   'freq': freq[mask],
+                                   'period': period[mask],
+                                   'kind': kind,
+                                   'old': old,
+                                   'new': new,
+                                   'change': new - old}))
+    return pd.concat(parts, ignore_index=True)[TABLE_COLUMNS]
+
+
+def label_changes(df=None):
+    """Return labels which appeared or disappeared in each vintage
+       compared to previous vintage."""
+    if df is None:
+        df = _read_history()
+    pairs = df[['vintage', 'label']].astype(str).drop_duplicates() \
+        .reset_index(drop=True)
+    labels = pd.crosstab(pairs.label, pairs.vintage) > 0
+    present = labels.values
+    appeared = np.zeros_like(present)
+    appeared[:, 1:] = present[:, 1:] & ~present[:, :-1]
+    disappeared = np.zeros_like(present)
+    disappeared[:, 1:] = ~present[:, 1:] & present[:, :-1]
+    parts = []
+    for kind, mask in [('appeared', appeared), ('disappeared', disappeared)]:
+        i, j = np.nonzero(mask)
+        parts.append(pd.DataFrame({'vintage': labels.columns.values[j],
+                                   'label': labels.index.values[i],
+                                   'kind': kind}))
+    return pd.concat(parts, ignore_index=True).sort_values(
+        ['vintage', 'label']).reset_index(drop=True)
+
+
+def summary(table):
+    """Return revision statistics by vintage and label for *table*
+       produced by :func:`diff` or :func:`sweep`."""
+    t = table.assign(abs_change=table.change.abs(),
+                     vintage=table.vintage.fillna(''))
+    counts = pd.crosstab([t.vintage, t.label], t.kind)
+    stats = (t[t.kind == 'revised']
+             .groupby(['vintage', 'label'])['abs_change']
+             .agg(['mean', 'max'])
+             .rename(columns={'mean': 'mean_abs_change',
+                              'max': 'max_abs_change'}))
+    return counts.join(stats).fillna(0)
+
+
+if __name__ == "__main__":
+    import time
+    from kep.vintage import Vintage
+    print(diff(Vintage(2017, 4), Vintage(2017, 5)))
+    start = time.time()
+    table = sweep()
+    print("Sweep found", len(table), "changes in",
+          round(time.time() - start, 2), "sec.")
+    print(summary(table).tail())
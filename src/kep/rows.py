@@ -1,8 +1,17 @@
-"""Read CSV file and represent it as a stream/list of Rows() instances."""
+"""Read CSV file and represent it as a stream/list of Rows() instances.
+
+CSV file may be compressed (*.gz*, *.xz* or *.zst*), it is decompressed
+while reading, line by line.
+"""
 
 import csv
+import gzip
+import io
+import lzma
 import re
 
+from kep.atomic import atomic_path
+
 ENC = 'utf-8'
 CSV_FORMAT = dict(delimiter='\t', lineterminator='\n')
 
@@ -11,16 +20,45 @@ CSV_FORMAT = dict(delimiter='\t', lineterminator='\n')
 
 def to_csv(rows, path):
     """Accept iterable of rows *rows* and write in to *csv_path*"""
-    with path.open('w', encoding=ENC) as csvfile:
-        filewriter = csv.writer(csvfile, **CSV_FORMAT)
-        for row in rows:
-            filewriter.writerow(row)
+    with atomic_path(path) as tmp:
+        with tmp.open('w', encoding=ENC) as csvfile:
+            filewriter = csv.writer(csvfile, **CSV_FORMAT)
+            for row in rows:
+                filewriter.writerow(row)
     return path
 
 
+def open_zstd(path):
+    # optional dependency
+    import zstandard
+    reader = zstandard.ZstdDecompressor().stream_reader(path.open('rb'),
+                                                        closefd=True)
+    return io.TextIOWrapper(reader, encoding=ENC)
+
+
+def open_blocks(path):
+    # kep.blocks imports this module
+    from kep.blocks import open_blocks
+    return open_blocks(path)
+
+
+OPENERS = {'.gz': lambda path: gzip.open(str(path), 'rt', encoding=ENC),
+           '.xz': lambda path: lzma.open(str(path), 'rt', encoding=ENC),
+           '.zst': open_zstd,
+           '.blocks': open_blocks}
+
+
+def open_csv(path):
+    """Open plain or compressed *path* for reading as text."""
+    opener = OPENERS.get(path.suffix)
+    if opener:
+        return opener(path)
+    return path.open(encoding=ENC)
+
+
 def from_csv(path):
     """Get iterable of rows from *csv_path*"""
-    with path.open(encoding=ENC) as csvfile:
+    with open_csv(path) as csvfile:
         csvreader = csv.reader(csvfile, **CSV_FORMAT)
         for row in csvreader:
             yield row
@@ -0,0 +1,112 @@
+"""Per-series JSON files for clients that show a few series.
+
+Files are written to *series* subfolder of a published folder, one file
+per label and frequency, gzip-compressed:
+
+    latest/series/GDP_yoy.q.json.gz     {"label": "GDP_yoy", "freq": "q",
+                                         "index": ["1999-03-31", ...],
+                                         "data": [98.1, ...]}
+    latest/series/index.json            metadata for all files
+
+Index entry for a series:
+
+    {"label": "GDP_yoy", "freq": "q", "file": "GDP_yoy.q.json.gz",
+     "varname": "GDP", "unit": "yoy", "unit_name": "% год к году",
+     "desc": "Валовый внутренний продукт (ВВП)",
+     "start": "1999-03-31", "end": "2017-03-31", "last": 100.5}
+
+Missing values are not written, *index* lists dates with values only.
+Files are written by :func:`kep.files.copy_latest` when publishing.
+
+Main call:
+
+    write_series(src_folder, target_folder)
+"""
+
+import gzip
+import json
+
+from kep.atomic import atomic_write_bytes, atomic_write_text
+from kep.tables import split_label
+from kep.vintage import read_dataframe
+
+SERIES_FOLDER = 'series'
+INDEX_NAME = 'index.json'
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def series_filename(label, freq):
+    """
+    >>> series_filename('GDP_yoy', 'q')
+    'GDP_yoy.q.json.gz'
+    """
+    return "{}.{}.json.gz".format(label, freq)
+
+
+def get_descriptions(spec=None):
+    """Return {varname: description} from parsing specification."""
+    if spec is None:
+        # kep.spec is slow to import, load it only when needed
+        from kep.spec import SPEC as spec
+    descriptions = {}
+    for pdef in spec.all_definitions():
+        descriptions.update(pdef.instr.descriptions)
+    return descriptions
+
+
+def get_unit_names():
+    from kep.spec import UNIT_NAMES
+    return UNIT_NAMES
+
+
+def to_bytes(label, freq, ts):
+    dates = ts.index.strftime(DATE_FORMAT).tolist()
+    text = json.dumps(dict(label=label, freq=freq, index=dates,
+                           data=ts.values.tolist()))
+    # no file name and time in header, same series gives same bytes
+    return gzip.compress(text.encode('utf-8'), mtime=0)
+
+
+def describe(label, freq, ts, descriptions, unit_names):
+    varname, unit = split_label(label)
+    entry = dict(label=label, freq=freq, file=series_filename(label, freq),
+                 varname=varname, unit=unit, unit_name=unit_names.get(unit),
+                 desc=descriptions.get(varname),
+                 start=None, end=None, last=None)
+    if len(ts):
+        entry.update(start=ts.index[0].strftime(DATE_FORMAT),
+                     end=ts.index[-1].strftime(DATE_FORMAT),
+                     last=ts.values[-1].item())
+    return entry
+
+
+def write_series(src_folder, target_folder, descriptions=None,
+                 unit_names=None):
+    """Write per-series files and index for dfa, dfq and dfm CSV files
+       in *src_folder* to *target_folder/series*. Returns index entries."""
+    if descriptions is None:
+        descriptions = get_descriptions()
+    if unit_names is None:
+        unit_names = get_unit_names()
+    folder = target_folder / SERIES_FOLDER
+    folder.mkdir(parents=True, exist_ok=True)
+    index = []
+    for freq in "aqm":
+        path = src_folder / "df{}.csv".format(freq)
+        if not path.exists():
+            continue
+        df = read_dataframe(path, dates=False)
+        for label in df.columns:
+            ts = df[label].dropna()
+            atomic_write_bytes(folder / series_filename(label, freq),
+                               to_bytes(label, freq, ts))
+            index.append(describe(label, freq, ts, descriptions, unit_names))
+    atomic_write_text(folder / INDEX_NAME,
+                      json.dumps(index, ensure_ascii=False, indent=0))
+    return index
+
+
+if __name__ == "__main__":
+    from kep.files import Folder
+    entries = write_series(Folder.latest, Folder.latest)
+    print("Wrote", len(entries), "series to", Folder.latest / SERIES_FOLDER)
@@ -0,0 +1,261 @@
+"""Job server with warm worker processes.
+
+Starting Python, importing pandas and building parsing specification
+takes longer than parsing one release. Server keeps a pool of worker
+processes with these already loaded and runs jobs sent by a client
+over a Unix socket (or localhost TCP port).
+
+Protocol is one JSON line per request and per response:
+
+    {"job": "parse", "args": [2017, 5], "kwargs": {}}
+    {"ok": true, "result": {...}, "seconds": 0.02}
+    {"ok": false, "error": "ValueError: ..."}
+
+Jobs are listed in :data:`kep.server.JOBS`.
+
+Main calls:
+
+    serve(workers=2)                       # blocks
+    request('parse', 2017, 5)              # from another process
+
+Command line:
+
+    python -m kep serve --workers 2
+    python -m kep job parse 2017 5
+    python -m kep job save 2017 5 formats='["csv", "parquet"]'
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import time
+
+from kep.files import Folder, get_catalog
+
+SOCKET_NAME = 'kep.sock'
+
+
+def default_address():
+    return str(Folder.cache / SOCKET_NAME)
+
+
+# jobs, executed in worker processes
+
+
+def warm_up():
+    """Import modules and build parsing specification in a worker."""
+    import pandas  # noqa: F401
+    import kep.spec  # noqa: F401
+    import kep.vintage  # noqa: F401
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot  # noqa: F401
+    except ImportError:
+        pass
+
+
+def job_ping():
+    return os.getpid()
+
+
+def job_parse(year=None, month=None):
+    from kep.vintage import Vintage
+    vintage = Vintage(year, month)
+    return dict(year=vintage.year, month=vintage.month,
+                shapes=[list(df.shape) for df in vintage.dfs()])
+
+
+def job_validate(year=None, month=None):
+    from kep.vintage import Vintage
+    Vintage(year, month).validate()
+    return True
+
+
+def job_save(year=None, month=None, formats=('csv',)):
+    from kep.vintage import Vintage
+    vintage = Vintage(year, month)
+    vintage.save(formats)
+    return str(Folder(vintage.year, vintage.month).get_processed_folder())
+
+
+def job_build(force=False):
+    from kep.build import build
+    return build(force=force)
+
+
+def job_frontpage(script='make_frontpage_2.py'):
+    import runpy
+    from pathlib import Path
+    path = Path(__file__).parents[1] / 'frontpage' / Path(script).name
+    runpy.run_path(str(path), run_name='__main__')
+    return str(path)
+
+
+JOBS = dict(ping=job_ping,
+            parse=job_parse,
+            validate=job_validate,
+            save=job_save,
+            build=job_build,
+            frontpage=job_frontpage)
+
+
+def run_job(name, args, kwargs):
+    if name != 'ping':
+        # worker lives longer than one release, rescan data folders
+        get_catalog(refresh=True)
+    return JOBS[name](*args, **kwargs)
+
+
+# server
+
+
+def handle(pool, message):
+    """Run job described by *message* dict, return response dict."""
+    start = time.time()
+    try:
+        name = message['job']
+        if name not in JOBS:
+            raise ValueError("Unknown job: {}".format(name))
+        result = pool.submit(run_job, name, message.get('args', []),
+                             message.get('kwargs', {})).result()
+        return dict(ok=True, result=result, seconds=time.time() - start)
+    except Exception as e:
+        return dict(ok=False, error="{}: {}".format(type(e).__name__, e),
+                    seconds=time.time() - start)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line.decode('utf-8'))
+            except ValueError as e:
+                response = dict(ok=False, error="Bad request: {}".format(e))
+            else:
+                response = handle(self.server.pool, message)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(address=None, port=None, workers=2):
+    """Return server with pool of *workers* warm processes. Listens on
+       localhost *port* if given, else on Unix socket *address*."""
+    # not needed by client
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+    # start all workers now, not on first job
+    for future in [pool.submit(job_ping) for _ in range(workers)]:
+        future.result()
+    if port is not None:
+        server = TCPServer(('127.0.0.1', port), Handler)
+    else:
+        address = address or default_address()
+        if os.path.exists(address):
+            os.unlink(address)
+        os.makedirs(os.path.dirname(address), exist_ok=True)
+        server = UnixServer(address, Handler)
+    server.pool = pool
+    return server
+
+
+def serve(address=None, port=None, workers=2):
+    server = make_server(address, port, workers)
+    print("Serving on", server.server_address, "with", workers, "workers")
+    # clean up on kill as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close(server)
+
+
+def close(server):
+    server.server_close()
+    server.pool.shutdown()
+    if isinstance(server, UnixServer) and os.path.exists(server.server_address):
+        os.unlink(server.server_address)
+
+
+# client
+
+
+def connect(address=None, port=None, timeout=None):
+    if port is not None:
+        return socket.create_connection(('127.0.0.1', port), timeout)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    sock.connect(address or default_address())
+    return sock
+
+
+def request(job, *args, address=None, port=None, timeout=None, **kwargs):
+    """Run *job* on server, return its result. Raises RuntimeError
+       if job failed."""
+    message = dict(job=job, args=list(args), kwargs=kwargs)
+    with connect(address, port, timeout) as sock:
+        sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            response = json.loads(f.readline().decode('utf-8'))
+    if not response['ok']:
+        raise RuntimeError(response['error'])
+    return response['result']
+
+
+def _value(text):
+    # numbers and JSON literals as is, anything else as string
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def main_serve(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m kep serve',
+                                     description='Start job server')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--socket', help='Unix socket path')
+    parser.add_argument('--port', type=int, help='localhost TCP port')
+    args = parser.parse_args(argv)
+    serve(args.socket, args.port, args.workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m kep job',
+        description='Run job on server: ' + ', '.join(JOBS))
+    parser.add_argument('job', choices=sorted(JOBS))
+    parser.add_argument('params', nargs='*',
+                        help='positional values or key=value pairs')
+    parser.add_argument('--socket', help='Unix socket path')
+    parser.add_argument('--port', type=int, help='localhost TCP port')
+    args = parser.parse_args(argv)
+    positional = [_value(p) for p in args.params if '=' not in p]
+    named = dict(p.split('=', 1) for p in args.params if '=' in p)
+    named = {k: _value(v) for k, v in named.items()}
+    try:
+        result = request(args.job, *positional, address=args.socket,
+                         port=args.port, **named)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    print(json.dumps(result, indent=1))
+    return 0
+
+
+if __name__ == "__main__":
+    main_serve()
@@ -0,0 +1,254 @@
+"""Read-only HTTP service for processed series.
+
+Dataframes are read from *data/processed* once and kept in memory,
+they are reloaded when vintage manifest changes (*publish.json* in
+*latest* folder, *build.json* in vintage folders, see :mod:`kep.files`
+and :mod:`kep.build`) or when size or modification time of a dataframe
+file changes, e.g. after :meth:`kep.vintage.Vintage.save`.
+
+A missing dataframe file gives '404 Not Found', a file which cannot
+be read or parsed gives '503 Service Unavailable'.
+
+Endpoints:
+
+    /series/{label}?freq=m&start=2015-01&end=2017&format=csv
+    /series/{label}?freq=q&vintage=2017-04&format=json
+    /labels?freq=a
+
+*start* and *end* are partial dates as in pandas, '2017' includes all
+of 2017. Default *vintage* is 'latest', default *format* is 'json'.
+
+Responses carry an ETag derived from vintage manifest and query, so
+that a repeated request with *If-None-Match* gets '304 Not Modified'.
+Response body is gzip-compressed if client accepts it.
+
+Main calls:
+
+    server = make_server(port=0)        # any free port
+    serve_in_thread(server)
+    server.server_address               # ('127.0.0.1', 50123)
+
+Command line:
+
+    python -m kep http --port 8000
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from kep.files import Folder, PUBLISH_MANIFEST
+from kep.build import MANIFEST_NAME
+from kep.vintage import read_dataframe
+
+# small responses are not worth compressing
+GZIP_MIN_SIZE = 512
+
+
+def vintage_folder(vintage):
+    if vintage == 'latest':
+        return Folder.latest
+    year, month = vintage.split('-')
+    if not (year.isdigit() and month.isdigit()):
+        raise ValueError(vintage)
+    return Folder.processed / str(int(year)) / month.zfill(2)
+
+
+def manifest_text(folder):
+    """Return text which changes whenever files in *folder* change."""
+    text = ''
+    for name in PUBLISH_MANIFEST, MANIFEST_NAME:
+        path = folder / name
+        if path.exists():
+            text = path.read_text()
+            break
+    # files may be saved without updating manifest
+    stats = {}
+    for freq in "aqm":
+        stat = (folder / "df{}.csv".format(freq)).stat()
+        stats[freq] = [stat.st_size, stat.st_mtime_ns]
+    return text + json.dumps(stats, sort_keys=True)
+
+
+class Vintages:
+    """Dataframes by vintage, reloaded when manifest changes."""
+
+    def __init__(self):
+        self.frames = {}
+        self.lock = threading.Lock()
+
+    def get(self, vintage):
+        """Return (manifest text, {freq: dataframe}) for *vintage*."""
+        folder = vintage_folder(vintage)
+        if not folder.exists():
+            raise KeyError(vintage)
+        manifest = manifest_text(folder)
+        with self.lock:
+            cached = self.frames.get(vintage)
+            if cached is None or cached[0] != manifest:
+                dfs = {freq: read_dataframe(
+                           folder / "df{}.csv".format(freq), dates=False)
+                       for freq in "aqm"}
+                cached = self.frames[vintage] = (manifest, dfs)
+        return cached
+
+
+def etag_matches(header, etag):
+    """Return True if *etag* is listed in *If-None-Match* header value.
+       Weak tags match as well.
+
+    >>> etag_matches('"a1", W/"b2"', '"b2"')
+    True
+    >>> etag_matches('"a12"', '"a1"')
+    False
+    >>> etag_matches('*', '"a1"')
+    True
+    """
+    tags = [tag.strip() for tag in header.split(',')]
+    if '*' in tags:
+        return True
+    return etag in [tag[2:] if tag.startswith('W/') else tag for tag in tags]
+
+
+def to_json(label, freq, vintage, ts):
+    data = [[dt.strftime('%Y-%m-%d'), value]
+            for dt, value in zip(ts.index, ts.values.tolist())]
+    return json.dumps(dict(label=label, freq=freq, vintage=vintage,
+                           data=data))
+
+
+def to_csv(label, ts):
+    return ts.to_csv(index_label='time_index', header=[label])
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        # quiet by default, see server.verbose
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        try:
+            self.route()
+        except HTTPError as e:
+            self.send_body(e.status, 'text/plain', str(e), etag=None)
+
+    def route(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        parts = url.path.strip('/').split('/')
+        vintage = query.get('vintage', 'latest')
+        try:
+            manifest, dfs = self.server.vintages.get(vintage)
+        # parser errors are ValueError too, check them first
+        except (pd.errors.ParserError, pd.errors.EmptyDataError):
+            raise HTTPError(503, "Vintage is being updated: {}".format(
+                vintage))
+        except (KeyError, ValueError, FileNotFoundError):
+            raise HTTPError(404, "Vintage not found: {}".format(vintage))
+        except OSError:
+            raise HTTPError(503, "Vintage cannot be read: {}".format(
+                vintage))
+        freq = query.get('freq', 'm')
+        if freq not in dfs:
+            raise HTTPError(400, "Frequency must be a, q or m")
+        if parts == ['labels']:
+            body = json.dumps(list(dfs[freq].columns))
+            ctype = 'application/json'
+        elif len(parts) == 2 and parts[0] == 'series':
+            label = urllib.parse.unquote(parts[1])
+            ctype, body = self.series(dfs[freq], label, freq, vintage,
+                                      query)
+        else:
+            raise HTTPError(404, "Not found: {}".format(url.path))
+        etag = hashlib.sha1((manifest + self.path).encode('utf-8')) \
+            .hexdigest()[:20]
+        self.send_body(200, ctype, body, etag)
+
+    @staticmethod
+    def series(df, label, freq, vintage, query):
+        if label not in df.columns:
+            raise HTTPError(404, "Label not found: {}".format(label))
+        try:
+            ts = df[label].loc[query.get('start'):query.get('end')].dropna()
+        except (KeyError, ValueError, TypeError):
+            raise HTTPError(400, "Invalid start or end date")
+        fmt = query.get('format', 'json')
+        if fmt == 'json':
+            return 'application/json', to_json(label, freq, vintage, ts)
+        elif fmt == 'csv':
+            return 'text/csv', to_csv(label, ts)
+        raise HTTPError(400, "Format must be json or csv")
+
+    def send_body(self, status, ctype, body, etag):
+        data = body.encode('utf-8')
+        accepts_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        gzipped = accepts_gzip and len(data) >= GZIP_MIN_SIZE
+        if etag:
+            # compressed body is a different representation
+            etag = '"{}{}"'.format(etag, '-gz' if gzipped else '')
+            if etag_matches(self.headers.get('If-None-Match', ''), etag):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+        if gzipped:
+            data = gzip.compress(data, compresslevel=5)
+        self.send_response(status)
+        self.send_header('Content-Type', ctype + '; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Vary', 'Accept-Encoding')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(host='127.0.0.1', port=8000, verbose=False):
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.vintages = Vintages()
+    server.verbose = verbose
+    return server
+
+
+def serve_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m kep http',
+        description='Serve processed series over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+    server = make_server(args.host, args.port, verbose=True)
+    print("Serving on http://{}:{}/".format(*server.server_address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -294,6 +294,10 @@ class Scope():
         else:
             raise ValueError("Cannot accept empty line as Scope() boundary")
 
+    def get_markers(self):
+        """Return list of start and end line markers as dicts."""
+        return [dict(m) for m in self.__markers]
+
     def get_bounds(self, rows):
         """Get start and end line markers, which can be found in *rows*"""
         # rows = list(rows) #faster
@@ -12,8 +12,6 @@ import warnings
 
 from kep import splitter
 from kep.rows import RowStack
-from kep.spec import SPEC
-from kep.spec import UNITS
 
 # use'always' or 'ignore'
 warnings.simplefilter('ignore', UserWarning)
@@ -56,6 +54,20 @@ def missed_labels(tables, required):
     return [x for x in labels_required if x not in labels_in_tables]
 
 
+# (SPEC, UNITS), see get_default_spec()
+_default_spec = None
+
+
+def get_default_spec():
+    """Return **SPEC** and **UNITS**, specification is built on first
+       call, later calls do not run import machinery."""
+    global _default_spec
+    if _default_spec is None:
+        from kep.spec import SPEC, UNITS
+        _default_spec = SPEC, UNITS
+    return _default_spec
+
+
 class Tables:
     """Extract tables from *csv_path* using *Rows(csv_path)*.
 
@@ -65,7 +77,11 @@ class Tables:
        - break csv segment into tables, each table containing headers and data rows
        - parse table headers to obtain variable name ("GDP") and unit ("bln_rub")"""
 
-    def __init__(self, _rows, spec=SPEC, units=UNITS):
+    def __init__(self, _rows, spec=None, units=None):
+        if spec is None or units is None:
+            default_spec, default_units = get_default_spec()
+            spec = default_spec if spec is None else spec
+            units = default_units if units is None else units
         self.rowstack = RowStack(_rows)
         self.spec = spec
         self.units = units
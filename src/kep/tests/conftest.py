@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""Fixtures shared by kep tests."""
+import shutil
+
+import pytest
+
+import kep.files as files
+
+# repository data folder, source of real releases for tests
+SOURCE = files.Folder.interim
+
+
+def use_data_folder(mp, root):
+    """Point :class:`kep.files.Folder` to *root* with monkeypatch *mp*.
+       Creates empty *interim* and *processed* subfolders."""
+    for name in ["interim", "processed", "cache"]:
+        mp.setattr(files.Folder, name, root / name)
+    mp.setattr(files.Folder, "latest", root / "processed" / "latest")
+    mp.setattr(files, "_catalog", None)
+    (root / "interim").mkdir(parents=True, exist_ok=True)
+    (root / "processed").mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def copy_release(root, year, month):
+    """Copy interim folder of a release in repository to *root* data
+       folder."""
+    path = "{}/{}".format(year, str(month).zfill(2))
+    shutil.copytree(str(SOURCE / path), str(root / "interim" / path))
+
+
+@pytest.fixture
+def data_folder(tmp_path, monkeypatch):
+    """Empty data folder in *tmp_path*, used by kep.files.Folder."""
+    return use_data_folder(monkeypatch, tmp_path)
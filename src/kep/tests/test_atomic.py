@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import os
+import stat
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import kep
+from kep.atomic import atomic_path, atomic_write_text, file_lock, UMASK
+
+
+class Test_atomic_path():
+    def test_replaces_file(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("old")
+        atomic_write_text(path, "new")
+        assert path.read_text() == "new"
+        assert os.listdir(str(tmp_path)) == ["a.txt"]
+
+    def test_on_exception_old_file_kept_and_no_temp_file_left(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("old")
+        with pytest.raises(RuntimeError):
+            with atomic_path(path) as tmp:
+                tmp.write_text("half")
+                raise RuntimeError
+        assert path.read_text() == "old"
+        assert os.listdir(str(tmp_path)) == ["a.txt"]
+
+    @pytest.mark.skipif(os.name != 'posix', reason='POSIX permissions')
+    def test_new_file_has_default_permissions(self, tmp_path):
+        path = tmp_path / "a.txt"
+        atomic_write_text(path, "new")
+        assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~UMASK
+
+    @pytest.mark.skipif(os.name != 'posix', reason='POSIX permissions')
+    def test_existing_file_permissions_kept(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("old")
+        os.chmod(str(path), 0o640)
+        atomic_write_text(path, "new")
+        assert stat.S_IMODE(path.stat().st_mode) == 0o640
+
+    def test_hard_link_keeps_old_content(self, tmp_path):
+        path, link = tmp_path / "a.txt", tmp_path / "b.txt"
+        path.write_text("old")
+        os.link(str(path), str(link))
+        atomic_write_text(path, "new")
+        assert link.read_text() == "old"
+
+
+class Test_file_lock():
+    def test_lock_file_removed_on_exit(self, tmp_path):
+        lock = tmp_path / ".lock"
+        with file_lock(lock):
+            assert lock.read_text() == str(os.getpid())
+        assert not lock.exists()
+
+    def test_reentrant(self, tmp_path):
+        lock = tmp_path / ".lock"
+        with file_lock(lock):
+            with file_lock(lock):
+                pass
+            assert lock.exists()
+        assert not lock.exists()
+
+    def test_timeout_if_held_by_live_process(self, tmp_path):
+        lock = tmp_path / ".lock"
+        src = os.path.dirname(os.path.dirname(kep.__file__))
+        code = ("import sys, time; from kep.atomic import file_lock\n"
+                "with file_lock(sys.argv[1]):\n"
+                "    print('locked', flush=True); time.sleep(10)\n")
+        proc = subprocess.Popen([sys.executable, "-c", code, str(lock)],
+                                cwd=src, stdout=subprocess.PIPE)
+        try:
+            assert proc.stdout.readline().strip() == b"locked"
+            with pytest.raises(TimeoutError):
+                with file_lock(lock, timeout=0.2, poll=0.05):
+                    pass
+        finally:
+            proc.kill()
+            proc.wait()
+            proc.stdout.close()
+
+    def test_other_thread_waits(self, tmp_path):
+        lock = tmp_path / ".lock"
+        events = []
+
+        def worker():
+            with file_lock(lock, poll=0.01):
+                events.append("worker")
+
+        with file_lock(lock):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            time.sleep(0.1)
+            events.append("main")
+        thread.join()
+        assert events == ["main", "worker"]
+
+    def test_stale_lock_is_broken(self, tmp_path):
+        lock = tmp_path / ".lock"
+        proc = subprocess.Popen([sys.executable, "-c", "pass"])
+        proc.wait()
+        lock.write_text(str(proc.pid))
+        with file_lock(lock, timeout=1):
+            assert lock.read_text() == str(os.getpid())
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import kep.blocks as blocks
+import kep.files as files
+import kep.rows as rows
+from kep.blocks import BlockStore, split_blocks
+
+TEXT = ("Объем ВВП, млрд.рублей\n"
+        "1999\t4823\n2000\t7306\n2001\t8944\n2002\t10831\n"
+        "Индекс физического объема\n"
+        "1999\t106,4\n2000\t110,0\n")
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+class Test_split_blocks():
+
+    def test_blocks_add_up_to_text(self):
+        lines = TEXT.splitlines(keepends=True)
+        assert "".join(split_blocks(lines)) == TEXT
+
+    def test_block_starts_with_header(self, monkeypatch):
+        # no cut points inside tables
+        monkeypatch.setattr(blocks, "CHUNK_MODULUS", 2 ** 40)
+        lines = TEXT.splitlines(keepends=True)
+        assert [b.split("\n")[0] for b in split_blocks(lines)] == \
+            ["Объем ВВП, млрд.рублей", "Индекс физического объема"]
+
+
+class Test_BlockStore():
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return BlockStore(tmp_path / "blocks")
+
+    def test_read_restores_text(self, store, tmp_path):
+        recipe = store.add(write(tmp_path, "a.csv", TEXT))
+        assert store.read(recipe) == TEXT
+
+    def test_new_instance_reads_index(self, store, tmp_path):
+        recipe = store.add(write(tmp_path, "a.csv", TEXT))
+        assert BlockStore(store.root).read(recipe) == TEXT
+
+
+@pytest.fixture
+def interim(data_folder):
+    root = data_folder / "interim"
+    write_release(root, 4, TEXT)
+    write_release(root, 5, TEXT + "2001\t105,1\n")
+    return root
+
+
+def write_release(root, month, text):
+    folder = root / "2017" / str(month).zfill(2)
+    folder.mkdir(parents=True)
+    return write(folder, "tab.csv", text)
+
+
+class Test_store_interim():
+
+    def test_recipe_replaces_csv_file(self, interim):
+        expected = list(rows.read_csv(files.locate_csv(2017, 5)))
+        blocks.store_interim()
+        path = files.locate_csv(2017, 5)
+        assert path.name == "tab.csv.blocks"
+        assert not (interim / "2017" / "05" / "tab.csv").exists()
+        result = list(rows.read_csv(path))
+        assert [(r.name, r.data) for r in result] == \
+            [(r.name, r.data) for r in expected]
+        assert files.filled_dates() == [(2017, 4), (2017, 5)]
+
+    def test_blocks_are_stored_once(self, interim):
+        blocks.store_interim()
+        stats = blocks.stats()
+        assert stats["unique_blocks"] < stats["blocks"]
+        assert stats["raw_bytes"] == len((TEXT * 2).encode("utf-8")) + \
+            len("2001\t105,1\n")
+
+    def test_keep_source(self, interim):
+        blocks.store_interim(remove=False)
+        assert (interim / "2017" / "05" / "tab.csv.blocks").exists()
+        assert files.locate_csv(2017, 5).name == "tab.csv"
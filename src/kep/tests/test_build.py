@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import kep.build as build
+import kep.files as files
+from kep.tests.conftest import copy_release
+
+
+@pytest.fixture
+def data_folder(data_folder):
+    """Data folder with interim CSV file for 2017-05."""
+    copy_release(data_folder, 2017, 5)
+    return data_folder
+
+
+def test_first_build_creates_outputs_and_manifest(data_folder):
+    report = build.build()
+    assert report == [(2017, 5, ['no build manifest'])]
+    folder = data_folder / "processed" / "2017" / "05"
+    assert (folder / "dfm.csv").exists()
+    assert build.read_manifest(2017, 5)["outputs"]["dfm.csv"]
+
+
+def test_second_build_is_noop(data_folder):
+    build.build()
+    assert build.build() == []
+
+
+def test_changed_output_triggers_rebuild(data_folder):
+    build.build()
+    (data_folder / "processed" / "2017" / "05" / "dfq.csv").unlink()
+    assert build.build() == [(2017, 5, ['dfq.csv missing'])]
+
+
+def test_changed_inputs_trigger_rebuild(data_folder, monkeypatch):
+    build.build()
+    monkeypatch.setattr(build.kep, "__version__", "999")
+    assert build.build() == [(2017, 5, ['package version changed'])]
+
+
+def test_compressed_interim_file_is_same_input(data_folder):
+    from kep.compress import compress_file
+    build.build()
+    compress_file(files.locate_csv(2017, 5))
+    assert build.build() == []
+
+
+def test_only_managed_outputs_removed(data_folder):
+    pytest.importorskip("pyarrow")
+    build.build(formats=("csv", "parquet"))
+    folder = data_folder / "processed" / "2017" / "05"
+    (folder / "notes.parquet").write_text("not made by build")
+    build.build(formats=("csv",))
+    assert not (folder / "dfq.parquet").exists()
+    assert (folder / "notes.parquet").exists()
+    assert (folder / "dfq.csv").exists()
+
+
+def test_force(data_folder):
+    build.build()
+    assert build.build(force=True) == [(2017, 5, ['forced'])]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict as odict
+import pandas as pd
+import pytest
+
+import kep.cache as cache
+from kep.spec import SPEC, UNITS
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "tab.csv"
+    path.write_text("1999\t4823\t901\t1102\t1373\t1447\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def dfs():
+    ix = pd.to_datetime(["1999-12-31", "2000-12-31"])
+    df = pd.DataFrame({"GDP_bln_rub": [4823.0, 7306.0]}, index=ix)
+    return df, df, df
+
+
+class Test_file_hash():
+    def test_same_content_same_hash(self, csv_file, tmp_path):
+        other = tmp_path / "copy.csv"
+        other.write_bytes(csv_file.read_bytes())
+        assert cache.file_hash(csv_file) == cache.file_hash(other)
+
+    def test_changed_content_changes_hash(self, csv_file):
+        h1 = cache.file_hash(csv_file)
+        csv_file.write_text("2000\t7306\n", encoding="utf-8")
+        assert cache.file_hash(csv_file) != h1
+
+
+class Test_spec_fingerprint():
+    def test_is_stable(self):
+        assert cache.spec_fingerprint() == cache.spec_fingerprint()
+
+    def test_changes_with_units(self):
+        units = odict(UNITS)
+        units['новая единица'] = 'pct'
+        assert cache.spec_fingerprint(SPEC, units) != cache.spec_fingerprint()
+
+
+class Test_make_key():
+    def test_changes_with_version(self, csv_file):
+        k1 = cache.make_key(csv_file, version="0.1.0")
+        k2 = cache.make_key(csv_file, version="0.1.1")
+        assert k1 != k2
+
+
+class Test_FrameCache():
+    def test_load_missing_returns_None(self, tmp_path):
+        assert cache.FrameCache(tmp_path).load(2017, 5, "abc") is None
+
+    def test_save_and_load(self, tmp_path, dfs):
+        fc = cache.FrameCache(tmp_path)
+        fc.save(2017, 5, "abc", dfs)
+        dfa, dfq, dfm = fc.load(2017, 5, "abc")
+        assert dfa.equals(dfs[0])
+
+    def test_new_key_replaces_stale_entry(self, tmp_path, dfs):
+        fc = cache.FrameCache(tmp_path)
+        fc.save(2017, 5, "abc", dfs)
+        fc.save(2017, 5, "def", dfs)
+        assert fc.load(2017, 5, "abc") is None
+        assert fc.load(2017, 5, "def") is not None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import kep.catalog as catalog
+from kep.catalog import Catalog
+
+
+def make_file(root, year, month, name, text="1999\t4823\n"):
+    folder = root / str(year) / str(month).zfill(2)
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / name
+    path.write_text(text)
+    return path
+
+
+@pytest.fixture
+def roots(tmp_path):
+    interim, processed = tmp_path / "interim", tmp_path / "processed"
+    make_file(interim, 2016, 12, "tab.csv")
+    make_file(interim, 2017, 1, "tab.csv")
+    # empty file does not make date available
+    make_file(interim, 2017, 2, "tab.csv", text="")
+    make_file(processed, 2017, 1, "dfa.csv")
+    return interim, processed, tmp_path / "manifest.json"
+
+
+class Test_Catalog():
+    def test_dates(self, roots):
+        cat = Catalog(*roots).refresh()
+        assert cat.dates() == [(2016, 12), (2017, 1)]
+        assert cat.latest_date() == (2017, 1)
+        assert cat.has_date(2016, 12) is True
+        assert cat.has_date(2017, 2) is False
+
+    def test_records(self, roots):
+        cat = Catalog(*roots).refresh()
+        rec = cat.get("processed", 2017, 1)["dfa.csv"]
+        assert rec["size"] == len("1999\t4823\n")
+        assert rec["sha1"] == catalog.file_hash(
+            roots[1] / "2017" / "01" / "dfa.csv")
+        assert cat.get("processed", 2016, 12) == {}
+
+    def test_manifest_is_saved_and_loaded(self, roots):
+        Catalog(*roots).refresh()
+        cat = Catalog(*roots).load()
+        assert cat.dates() == [(2016, 12), (2017, 1)]
+
+    def test_refresh_hashes_only_changed_files(self, roots, monkeypatch):
+        Catalog(*roots).refresh()
+        hashed = []
+
+        def counting_hash(path):
+            hashed.append(path)
+            return "x"
+        monkeypatch.setattr(catalog, "file_hash", counting_hash)
+        make_file(roots[0], 2017, 3, "tab.csv")
+        cat = Catalog(*roots).refresh()
+        assert len(hashed) == 1
+        assert cat.latest_date() == (2017, 3)
+
+    def test_file_rewritten_in_place_is_hashed_again(self, roots):
+        path = make_file(roots[1], 2017, 1, "dfa.csv", text="old")
+        cat = Catalog(*roots).refresh()
+        sha1 = cat.get('processed', 2017, 1)['dfa.csv']['sha1']
+        # same size, folder modification time does not change
+        path.write_text("new")
+        mtime_ns = path.stat().st_mtime_ns + 10**9
+        os.utime(str(path), ns=(mtime_ns, mtime_ns))
+        assert cat.get('processed', 2017, 1)['dfa.csv']['sha1'] == sha1
+        cat.refresh()
+        assert cat.get('processed', 2017, 1)['dfa.csv']['sha1'] != sha1
+
+    def test_empty_folder_has_no_latest_date(self, tmp_path):
+        cat = Catalog(tmp_path / "a", tmp_path / "b").refresh()
+        with pytest.raises(FileNotFoundError):
+            cat.latest_date()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import kep.rows as rows
+from kep.compress import compress_file
+
+CONTENT = "Объем ВВП\t\t\n1999\t4823\t901\n"
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "tab.csv"
+    path.write_text(CONTENT, encoding=rows.ENC)
+    return path
+
+
+class Test_compress_file():
+
+    @pytest.mark.parametrize("fmt", ["gz", "xz"])
+    def test_rows_are_same_as_in_plain_file(self, csv_path, fmt):
+        expected = list(rows.from_csv(csv_path))
+        path = compress_file(csv_path, fmt)
+        assert path.name == "tab.csv." + fmt
+        assert not csv_path.exists()
+        assert list(rows.from_csv(path)) == expected
+
+    def test_gzip_output_is_reproducible(self, csv_path):
+        first = compress_file(csv_path, remove=False).read_bytes()
+        second = compress_file(csv_path, remove=False).read_bytes()
+        assert first == second
+
+    def test_unknown_format_raises_error(self, csv_path):
+        with pytest.raises(ValueError):
+            compress_file(csv_path, "rar")
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 import pytest
 import kep.files as files
 
@@ -12,6 +13,20 @@ class Test_get_latest_date():
         assert month <= 12
 
 
+class Test_filled_dates():
+    def test_ends_with_latest_date(self):
+        assert files.filled_dates()[-1] == (year, month)
+
+    def test_skips_missing_month(self, data_folder):
+        # no interim file for 2017-04
+        folder = data_folder / "interim" / "2017" / "03"
+        folder.mkdir()
+        (folder / "tab.csv").write_text("1999\t4823\n")
+        (data_folder / "interim" / "2017" / "04").mkdir()
+        files.get_catalog(refresh=True)
+        assert files.filled_dates() == [(2017, 3), (2017, 5)]
+
+
 class Test_locate_csv():
     def test_file_found(self):
         assert files.locate_csv(year, month).exists() is True
@@ -44,5 +59,109 @@ class Test_Folder():
             files.Folder(2030, 1)
 
 
+@pytest.fixture
+def data_folder(data_folder):
+    """Data folder with interim and processed files for 2017-05."""
+    interim = data_folder / "interim" / "2017" / "05"
+    interim.mkdir(parents=True)
+    (interim / "tab.csv").write_text("1999\t4823\n")
+    processed = data_folder / "processed" / "2017" / "05"
+    processed.mkdir(parents=True)
+    for freq in "aqm":
+        (processed / "df{}.csv".format(freq)).write_text(freq)
+    return data_folder
+
+
+class Test_get_catalog():
+
+    def test_new_month_found_on_refresh(self, data_folder):
+        assert files.filled_dates() == [(2017, 5)]
+        folder = data_folder / "interim" / "2017" / "06"
+        folder.mkdir()
+        (folder / "tab.csv").write_text("1999\t4823\n")
+        # folders are scanned once per process
+        assert files.filled_dates() == [(2017, 5)]
+        files.get_catalog(refresh=True)
+        assert files.filled_dates() == [(2017, 5), (2017, 6)]
+
+
+class Test_locate_csv_compressed():
+
+    def test_compressed_file_found(self, data_folder):
+        from kep.compress import compress_file
+        compress_file(files.locate_csv(2017, 5))
+        assert files.locate_csv(2017, 5).name == "tab.csv.gz"
+        assert files.get_catalog(refresh=True).dates() == [(2017, 5)]
+
+
+class Test_copy_latest():
+
+    def test_publishes_files(self, data_folder):
+        published = files.copy_latest()
+        assert sorted(p.name for p in published) == \
+            ["dfa.csv", "dfm.csv", "dfq.csv"]
+        assert (files.Folder.latest / "dfq.csv").read_text() == "q"
+
+    def test_unchanged_source_is_skipped(self, data_folder):
+        files.copy_latest()
+        assert files.copy_latest() == []
+
+    def test_changed_source_is_published(self, data_folder):
+        files.copy_latest()
+        src = data_folder / "processed" / "2017" / "05" / "dfm.csv"
+        src.unlink()
+        src.write_text("new m")
+        assert files.copy_latest()
+        assert (files.Folder.latest / "dfm.csv").read_text() == "new m"
+        # only current snapshot is left
+        assert [f.name for f in files.Folder.processed.iterdir()
+                if f.name.startswith(".latest-")] == \
+            [files.Folder.latest.resolve().name]
+
+    def test_rewritten_source_is_published(self, data_folder):
+        files.copy_latest()
+        snapshot = files.Folder.latest.resolve()
+        # rewrite in place with same size, inode stays the same
+        src = data_folder / "processed" / "2017" / "05" / "dfq.csv"
+        inode = src.stat().st_ino
+        src.write_text("Q")
+        mtime_ns = src.stat().st_mtime_ns + 10**9
+        os.utime(str(src), ns=(mtime_ns, mtime_ns))
+        assert src.stat().st_ino == inode
+        assert files.copy_latest()
+        assert files.Folder.latest.resolve() != snapshot
+        assert (files.Folder.latest / "dfq.csv").read_text() == "Q"
+
+    def test_latest_is_symlink_swapped_in_one_step(self, data_folder,
+                                                   monkeypatch):
+        files.copy_latest()
+        assert files.Folder.latest.is_symlink()
+        renames = []
+        replace = os.replace
+
+        def counting(src, dst):
+            renames.append(dst)
+            replace(src, dst)
+        monkeypatch.setattr(os, "replace", counting)
+        (data_folder / "processed" / "2017" / "05" / "dfa.csv").unlink()
+        (data_folder / "processed" / "2017" / "05" / "dfa.csv").write_text("A")
+        files.copy_latest()
+        # folders in processed/ are renamed only to swap symlink
+        assert [d for d in renames
+                if os.path.dirname(d) == str(files.Folder.processed)] == \
+            [str(files.Folder.latest)]
+        assert (files.Folder.latest / "dfa.csv").read_text() == "A"
+
+    def test_rename_mode(self, data_folder):
+        files.copy_latest(mode="rename")
+        assert files.Folder.latest.is_dir()
+        assert not files.Folder.latest.is_symlink()
+        (data_folder / "processed" / "2017" / "05" / "dfa.csv").unlink()
+        (data_folder / "processed" / "2017" / "05" / "dfa.csv").write_text("A")
+        files.copy_latest(mode="rename")
+        assert (files.Folder.latest / "dfa.csv").read_text() == "A"
+        assert [f.name for f in files.Folder.processed.iterdir()
+                if f.name.startswith(".latest-")] == []
+
 if __name__ == "__main__":
     pytest.main([__file__])
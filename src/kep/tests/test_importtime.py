@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""Startup time budget: modules used by command line tools must not
+   import pandas, numpy or matplotlib, nor build parsing specification."""
+import subprocess
+import sys
+
+import pytest
+
+LIGHT_MODULES = ['kep.files', 'kep.rows', 'kep.tables', 'kep.vintage',
+                 'kep.build', 'kep.watch', 'kep.server', 'kep.__main__']
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'kep.spec']
+# import of kep.vintage takes about 40 ms, pandas alone - over 500 ms,
+# budget is generous to allow for slow machines
+BUDGET_MS = 300
+
+
+def imported_modules(module):
+    """Return names of modules loaded by import of *module*."""
+    code = ('import sys; import {}; '
+            'print("\\n".join(sorted(sys.modules)))').format(module)
+    result = subprocess.run([sys.executable, '-c', code],
+                            stdout=subprocess.PIPE, check=True)
+    return result.stdout.decode().split()
+
+
+def import_time(module):
+    """Return cumulative import time of *module* in ms."""
+    result = subprocess.run([sys.executable, '-X', 'importtime',
+                             '-c', 'import ' + module],
+                            stderr=subprocess.PIPE, check=True)
+    for line in result.stderr.decode().splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if name.strip() == module:
+                return int(cumulative) / 1000
+    raise ValueError(module)
+
+
+@pytest.mark.parametrize("module", LIGHT_MODULES)
+def test_no_heavy_imports(module):
+    imported = imported_modules(module)
+    assert [m for m in HEAVY_MODULES if m in imported] == []
+
+
+def test_vintage_import_within_budget():
+    assert import_time('kep.vintage') < BUDGET_MS
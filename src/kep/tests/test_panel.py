@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import pytest
+
+import kep.panel as panel
+
+pytest.importorskip("pyarrow")
+
+
+def make_dfs(gdp):
+    dfa = pd.DataFrame({"year": [1999], "GDP_bln_rub": [gdp]},
+                       index=pd.to_datetime(["1999-12-31"]))
+    dfq = pd.DataFrame({"year": [1999], "qtr": [1], "GDP_bln_rub": [901.0]},
+                       index=pd.to_datetime(["1999-03-31"]))
+    dfm = pd.DataFrame({"year": [1999, 1999], "month": [1, 2],
+                        "CPI_rog": [108.4, None]},
+                       index=pd.to_datetime(["1999-01-31", "1999-02-28"]))
+    return dfa, dfq, dfm
+
+
+@pytest.fixture
+def store(tmp_path):
+    return panel.PanelStore(tmp_path / "panel")
+
+
+class Test_to_long():
+    def test_has_rows_for_values_only(self):
+        df = panel.to_long(make_dfs(4823.0), "2017-05")
+        assert list(df.columns) == panel.COLUMNS
+        assert len(df) == 3
+        assert set(df.label) == {"GDP_bln_rub", "CPI_rog"}
+
+    def test_values(self):
+        df = panel.to_long(make_dfs(4823.0), "2017-05")
+        row = df[df.freq == "a"].iloc[0]
+        assert row.vintage == "2017-05"
+        assert row.period == pd.Timestamp("1999-12-31")
+        assert row.value == 4823.0
+
+
+class Test_PanelStore():
+    def test_read_empty_store(self, store):
+        assert store.read().empty
+
+    def test_update_adds_vintages(self, store):
+        store.update(2017, 4, make_dfs(4800.0))
+        store.update(2017, 5, make_dfs(4823.0))
+        assert store.vintages() == ["2017-04", "2017-05"]
+        df = store.read(label="GDP_bln_rub", freq="a")
+        assert df.value.tolist() == [4800.0, 4823.0]
+
+    def test_update_replaces_same_vintage(self, store):
+        store.update(2017, 5, make_dfs(4800.0))
+        store.update(2017, 5, make_dfs(4823.0))
+        df = store.read(label="GDP_bln_rub", freq="a")
+        assert df.value.tolist() == [4823.0]
+
+    def test_read_filters_by_vintage(self, store):
+        store.update(2017, 4, make_dfs(4800.0))
+        store.update(2017, 5, make_dfs(4823.0))
+        df = store.read(vintage=["2017-04"])
+        assert set(df.vintage) == {"2017-04"}
+
+    def test_update_writes_one_partition(self, store):
+        store.update(2017, 4, make_dfs(4800.0))
+        before = store.part_path("2017-04").stat()
+        store.update(2017, 5, make_dfs(4823.0))
+        store.update(2017, 5, make_dfs(4824.0))
+        after = store.part_path("2017-04").stat()
+        assert (before.st_ino, before.st_mtime_ns) == \
+            (after.st_ino, after.st_mtime_ns)
+        assert sorted(p.name for p in store.root.iterdir()) == \
+            ["vintage=2017-04", "vintage=2017-05"]
+
+    def test_rebuild_from_long_dataframe(self, store):
+        df = pd.concat([panel.to_long(make_dfs(4800.0), "2017-04"),
+                        panel.to_long(make_dfs(4823.0), "2017-05")])
+        store.write(df)
+        assert store.vintages() == ["2017-04", "2017-05"]
+        assert len(store.read()) == len(df)
+
+    def test_labels_are_dictionary_encoded(self, store):
+        store.update(2017, 5, make_dfs(4823.0))
+        assert store.read().label.dtype == "category"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
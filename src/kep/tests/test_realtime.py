@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from kep.realtime import AsOfIndex, vintage_code, period_end
+
+
+def long_df():
+    rows = [
+        # vintage, label, freq, period, value
+        ("2016-04", "CPI_rog", "m", "2016-03-31", 100.5),
+        ("2016-05", "CPI_rog", "m", "2016-03-31", 100.4),
+        ("2016-05", "CPI_rog", "m", "2016-04-30", 100.3),
+        ("2016-06", "CPI_rog", "m", "2016-03-31", 100.6),
+        ("2016-06", "CPI_rog", "m", "2016-04-30", 100.3),
+        ("2016-06", "CPI_rog", "m", "2016-05-31", 100.2),
+        ("2016-06", "GDP_yoy", "q", "2016-03-31", 98.8),
+    ]
+    df = pd.DataFrame(rows, columns=["vintage", "label", "freq", "period",
+                                     "value"])
+    df["period"] = pd.to_datetime(df["period"])
+    # shuffled input must be handled
+    return df.sample(frac=1, random_state=0)
+
+
+@pytest.fixture
+def ix():
+    return AsOfIndex.from_long(long_df())
+
+
+def test_vintage_code_orders_months():
+    assert vintage_code("2016-12") + 1 == vintage_code((2017, 1))
+
+
+def test_period_end_infers_frequency():
+    assert period_end("2016")[0] == "a"
+    assert period_end("2016Q2")[0] == "q"
+    assert str(period_end("2016-02")[1]) == "2016-02-29"
+
+
+class Test_AsOfIndex_as_of():
+    def test_returns_value_known_in_vintage(self, ix):
+        assert ix.as_of("CPI_rog", "2016-03", "2016-04") == 100.5
+        assert ix.as_of("CPI_rog", "2016-03", "2016-05") == 100.4
+        assert ix.as_of("CPI_rog", "2016-03", (2016, 6)) == 100.6
+
+    def test_later_vintage_returns_last_known_value(self, ix):
+        assert ix.as_of("CPI_rog", "2016-05", "2017-01") == 100.2
+
+    def test_not_yet_released_is_nan(self, ix):
+        assert np.isnan(ix.as_of("CPI_rog", "2016-05", "2016-05"))
+        assert np.isnan(ix.as_of("CPI_rog", "2010-01", "2016-05"))
+        assert np.isnan(ix.as_of("NO_SUCH_LABEL", "2016-03", "2016-05"))
+
+    def test_quarterly_period(self, ix):
+        assert ix.as_of("GDP_yoy", "2016Q1", "2016-06") == 98.8
+
+
+class Test_AsOfIndex_triangle():
+    def test_matrix(self, ix):
+        df = ix.triangle("CPI_rog", "m")
+        assert list(df.columns) == ["2016-04", "2016-05", "2016-06"]
+        assert df.loc["2016-03-31"].tolist() == [100.5, 100.4, 100.6]
+        assert np.isnan(df.loc["2016-05-31", "2016-05"])
+
+    def test_selected_vintages(self, ix):
+        df = ix.triangle("CPI_rog", "m", vintages=["2016-05", "2016-07"])
+        assert df.loc["2016-03-31"].tolist() == [100.4, 100.6]
+
+    def test_unknown_label_and_freq_raises_KeyError(self, ix):
+        with pytest.raises(KeyError):
+            ix.triangle("CPI_rog", "a")
+
+
+def test_save_and_load(ix, tmp_path):
+    path = ix.save(tmp_path / "index.npz")
+    ix2 = AsOfIndex.load(path)
+    assert ix2.as_of("CPI_rog", "2016-03", "2016-05") == 100.4
+    assert ix2.triangle("CPI_rog").equals(ix.triangle("CPI_rog"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
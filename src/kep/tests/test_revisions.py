@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+import kep.panel as panel
+import kep.revisions as revisions
+
+
+def make_dfs(values, labels=("GDP_bln_rub",)):
+    index = pd.to_datetime(["1999-12-31", "2000-12-31"])
+    dfa = pd.DataFrame({lab: values for lab in labels}, index=index)
+    dfa.insert(0, "year", dfa.index.year)
+    empty = pd.DataFrame()
+    return dfa, empty, empty
+
+
+class Test_diff():
+    def test_finds_revised_added_and_removed(self):
+        d = revisions.diff(make_dfs([1.0, np.nan]), make_dfs([1.5, 2.0]))
+        t = d.table.set_index("kind")
+        assert t.loc["revised", "change"] == 0.5
+        assert t.loc["added", "new"] == 2.0
+        d = revisions.diff(make_dfs([1.0, 2.0]), make_dfs([1.0, np.nan]))
+        assert d.table.kind.tolist() == ["removed"]
+
+    def test_unchanged_vintages_have_empty_table(self):
+        d = revisions.diff(make_dfs([1.0, 2.0]), make_dfs([1.0, 2.0]))
+        assert d.table.empty
+
+    def test_labels_added_and_removed(self):
+        a = make_dfs([1.0, 2.0], labels=["GDP_bln_rub"])
+        b = make_dfs([1.0, 2.0], labels=["GDP_bln_rub", "GDP_yoy"])
+        assert revisions.diff(a, b).labels_added == ["GDP_yoy"]
+        assert revisions.diff(b, a).labels_removed == ["GDP_yoy"]
+
+
+@pytest.fixture
+def history():
+    parts = [panel.to_long(make_dfs([1.0, np.nan]), "2017-03"),
+             panel.to_long(make_dfs([1.5, 2.0]), "2017-04"),
+             panel.to_long(make_dfs([1.5, np.nan]), "2017-05")]
+    return pd.concat(parts, ignore_index=True)
+
+
+class Test_sweep():
+    def test_same_result_as_diff(self, history):
+        t = revisions.sweep(history)
+        t = t[t.vintage == "2017-04"].reset_index(drop=True)
+        d = revisions.diff(make_dfs([1.0, np.nan]), make_dfs([1.5, 2.0]))
+        assert t.kind.tolist() == d.table.kind.tolist()
+        assert t.new.tolist() == d.table.new.tolist()
+
+    def test_removed_datapoint(self, history):
+        t = revisions.sweep(history)
+        removed = t[t.kind == "removed"]
+        assert removed.vintage.tolist() == ["2017-05"]
+        assert removed.old.tolist() == [2.0]
+
+    def test_summary(self, history):
+        s = revisions.summary(revisions.sweep(history))
+        assert s.loc[("2017-04", "GDP_bln_rub"), "revised"] == 1
+        assert s.loc[("2017-04", "GDP_bln_rub"), "max_abs_change"] == 0.5
+
+
+def test_label_changes():
+    df = pd.concat([panel.to_long(make_dfs([1.0, 2.0]), "2017-04"),
+                    panel.to_long(make_dfs([1.0, 2.0], ["GDP_yoy"]), "2017-05")])
+    t = revisions.label_changes(df)
+    assert t.values.tolist() == [["2017-05", "GDP_bln_rub", "disappeared"],
+                                 ["2017-05", "GDP_yoy", "appeared"]]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
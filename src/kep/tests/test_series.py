@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+
+import pytest
+
+import kep.files as files
+from kep import series
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    target = tmp_path_factory.mktemp("latest")
+    series.write_series(files.Folder.latest, target)
+    return target / series.SERIES_FOLDER
+
+
+def read_index(folder):
+    return json.loads((folder / series.INDEX_NAME).read_text())
+
+
+class Test_write_series():
+
+    def test_one_file_per_label_and_freq(self, index):
+        entries = read_index(index)
+        assert len(entries) == len(list(index.glob("*.json.gz")))
+        assert all((index / e["file"]).exists() for e in entries)
+
+    def test_series_content(self, index):
+        doc = json.loads(gzip.decompress(
+            (index / "GDP_yoy.a.json.gz").read_bytes()))
+        assert doc["label"] == "GDP_yoy"
+        assert doc["index"][0] == "1999-12-31"
+        assert doc["data"][0] == 106.4
+        assert len(doc["index"]) == len(doc["data"])
+
+    def test_index_metadata(self, index):
+        entry = [e for e in read_index(index)
+                 if e["label"] == "GDP_yoy" and e["freq"] == "a"][0]
+        assert entry["varname"] == "GDP"
+        assert entry["unit"] == "yoy"
+        assert entry["unit_name"] == "% год к году"
+        assert entry["desc"]
+        assert entry["start"] == "1999-12-31"
+        assert entry["last"] is not None
+
+
+def test_descriptions_from_spec():
+    assert "GDP" in series.get_descriptions()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import threading
+
+import pytest
+
+import kep.server as server
+from kep.tests.conftest import copy_release, use_data_folder
+
+# data folder of tests is set in parent process and inherited by workers
+if multiprocessing.get_start_method() != "fork":
+    pytest.skip("workers are not forked", allow_module_level=True)
+
+
+@pytest.fixture(scope="module")
+def data_folder(tmp_path_factory):
+    # one data folder for server and its workers in this module
+    with pytest.MonkeyPatch.context() as mp:
+        root = use_data_folder(mp, tmp_path_factory.mktemp("data"))
+        copy_release(root, 2017, 4)
+        yield root
+
+
+@pytest.fixture(scope="module")
+def address(data_folder):
+    path = str(data_folder / "kep.sock")
+    srv = server.make_server(address=path, workers=1)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    srv.shutdown()
+    server.close(srv)
+
+
+class Test_request():
+
+    def test_ping_returns_worker_pid(self, address):
+        assert isinstance(server.request("ping", address=address), int)
+
+    def test_parse(self, address):
+        result = server.request("parse", 2017, 4, address=address)
+        assert result["year"] == 2017
+        assert len(result["shapes"]) == 3
+
+    def test_new_release_is_seen_by_worker(self, address, data_folder):
+        assert server.request("parse", address=address)["month"] == 4
+        copy_release(data_folder, 2017, 5)
+        assert server.request("parse", address=address)["month"] == 5
+
+    def test_writes_to_test_data_folder(self, address, data_folder):
+        path = server.request("save", 2017, 4, address=address)
+        assert path.startswith(str(data_folder))
+
+    def test_job_error_is_raised(self, address):
+        with pytest.raises(RuntimeError):
+            server.request("parse", 2030, 1, address=address)
+
+    def test_unknown_job(self, address):
+        with pytest.raises(RuntimeError):
+            server.request("no_such_job", address=address)
+
+
+class Test_main():
+
+    def test_prints_result(self, address, capsys):
+        assert server.main(["ping", "--socket", address]) == 0
+        assert capsys.readouterr().out.strip().isdigit()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import kep.files as files
+import kep.service as service
+
+
+def write_frames(folder, scale=1.0):
+    folder.mkdir(parents=True, exist_ok=True)
+    ix = pd.date_range("2015-01-31", periods=36, freq="ME")
+    dfm = pd.DataFrame({"year": ix.year, "month": ix.month,
+                        "CPI_rog": [100.0 + i * scale for i in range(36)]},
+                       index=ix)
+    dfm.to_csv(str(folder / "dfm.csv"), index_label="time_index")
+    for freq in "aq":
+        dfm.iloc[:3].to_csv(str(folder / "df{}.csv".format(freq)),
+                            index_label="time_index")
+
+
+@pytest.fixture
+def url(tmp_path, monkeypatch):
+    monkeypatch.setattr(files.Folder, "processed", tmp_path)
+    monkeypatch.setattr(files.Folder, "latest", tmp_path / "latest")
+    write_frames(tmp_path / "latest")
+    write_frames(tmp_path / "2017" / "04", scale=2.0)
+    server = service.make_server(port=0)
+    service.serve_in_thread(server)
+    yield "http://127.0.0.1:{}".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def get(url, headers=None):
+    req = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req) as r:
+            return r.status, dict(r.headers), r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+class Test_series():
+
+    def test_json_with_date_range(self, url):
+        status, _, body = get(url + "/series/CPI_rog?freq=m&start=2016&end=2016-03")
+        assert status == 200
+        data = json.loads(body)["data"]
+        assert data[0] == ["2016-01-31", 112.0]
+        assert len(data) == 3
+
+    def test_csv(self, url):
+        _, headers, body = get(url + "/series/CPI_rog?format=csv&end=2015-02")
+        assert headers["Content-Type"].startswith("text/csv")
+        assert body.decode() == ("time_index,CPI_rog\n"
+                                 "2015-01-31,100.0\n2015-02-28,101.0\n")
+
+    def test_vintage(self, url):
+        _, _, body = get(url + "/series/CPI_rog?vintage=2017-04&start=2015-02")
+        assert json.loads(body)["data"][0] == ["2015-02-28", 102.0]
+
+    def test_unknown_label_and_vintage(self, url):
+        assert get(url + "/series/NO_SUCH")[0] == 404
+        assert get(url + "/series/CPI_rog?vintage=2030-01")[0] == 404
+        assert get(url + "/series/CPI_rog?freq=d")[0] == 400
+
+    def test_labels(self, url):
+        assert json.loads(get(url + "/labels")[2]) == ["CPI_rog"]
+
+
+class Test_errors():
+
+    def test_missing_file(self, url, tmp_path):
+        (tmp_path / "2017" / "04" / "dfq.csv").unlink()
+        assert get(url + "/series/CPI_rog?vintage=2017-04")[0] == 404
+
+    def test_unreadable_file(self, url, tmp_path):
+        (tmp_path / "latest" / "dfm.csv").write_text("")
+        assert get(url + "/series/CPI_rog")[0] == 503
+        (tmp_path / "latest" / "dfm.csv").write_text('a,"b\n1,2,3\n')
+        assert get(url + "/series/CPI_rog")[0] == 503
+        write_frames(tmp_path / "latest")
+        assert get(url + "/series/CPI_rog")[0] == 200
+
+
+class Test_caching():
+
+    def test_etag_gives_not_modified(self, url):
+        _, headers, _ = get(url + "/series/CPI_rog")
+        status, _, _ = get(url + "/series/CPI_rog",
+                           {"If-None-Match": headers["ETag"]})
+        assert status == 304
+
+    def test_etag_list_and_wildcard(self, url):
+        _, headers, _ = get(url + "/series/CPI_rog")
+        etag = headers["ETag"]
+        for value in ['"other", ' + etag, "W/" + etag, "*"]:
+            assert get(url + "/series/CPI_rog",
+                       {"If-None-Match": value})[0] == 304
+        # tag which only contains the ETag is a different tag
+        assert get(url + "/series/CPI_rog",
+                   {"If-None-Match": '"' + etag + '"'})[0] == 200
+
+    def test_etag_changes_with_manifest(self, url, tmp_path):
+        _, headers, _ = get(url + "/series/CPI_rog")
+        (tmp_path / "latest" / files.PUBLISH_MANIFEST).write_text("{}")
+        status, _, _ = get(url + "/series/CPI_rog",
+                           {"If-None-Match": headers["ETag"]})
+        assert status == 200
+
+    def test_reloaded_after_save_without_manifest(self, url, tmp_path):
+        (tmp_path / "latest" / files.PUBLISH_MANIFEST).write_text("{}")
+        _, _, body = get(url + "/series/CPI_rog?start=2015-02")
+        assert json.loads(body)["data"][0] == ["2015-02-28", 101.0]
+        write_frames(tmp_path / "latest", scale=3.0)
+        _, _, body = get(url + "/series/CPI_rog?start=2015-02")
+        assert json.loads(body)["data"][0] == ["2015-02-28", 103.0]
+
+    def test_gzip(self, url):
+        _, headers, body = get(url + "/series/CPI_rog",
+                               {"Accept-Encoding": "gzip"})
+        assert headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(body))["label"] == "CPI_rog"
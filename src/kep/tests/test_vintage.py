@@ -70,5 +70,112 @@ class Test_Functions_Dates():
             pd.Timestamp('2015') + pd.offsets.YearEnd()
 
 
+class Test_Frames_includes():
+    dfa = pd.DataFrame({"GDP_bln_rub": [4823.0]},
+                       index=[pd.Timestamp("1999-12-31")])
+    dfq = pd.DataFrame({"GDP_bln_rub": [901.0]},
+                       index=[pd.Timestamp("1999-03-31")])
+    dfm = pd.DataFrame({"CPI_rog": [108.4]},
+                       index=[pd.Timestamp("1999-01-31")])
+    frames = vintage.Frames.from_dataframes(dfa, dfq, dfm)
+
+    def test_finds_datapoints(self):
+        assert self.frames.includes(
+            {'freq': 'a', 'label': 'GDP_bln_rub', 'value': 4823.0, 'year': 1999})
+        assert self.frames.includes(
+            {'freq': 'q', 'label': 'GDP_bln_rub', 'value': 901.0, 'year': 1999, 'qtr': 1})
+        assert self.frames.includes(
+            {'freq': 'm', 'label': 'CPI_rog', 'value': 108.4, 'year': 1999, 'month': 1})
+
+    def test_on_wrong_value_label_or_date_returns_False(self):
+        assert not self.frames.includes(
+            {'freq': 'a', 'label': 'GDP_bln_rub', 'value': 0, 'year': 1999})
+        assert not self.frames.includes(
+            {'freq': 'a', 'label': 'GDP_yoy', 'value': 4823.0, 'year': 1999})
+        assert not self.frames.includes(
+            {'freq': 'a', 'label': 'GDP_bln_rub', 'value': 4823.0, 'year': 2000})
+
+
+class Test_Frames_from_dataframes():
+    df = pd.DataFrame({"GDP_bln_rub": [4823.0]},
+                      index=[pd.Timestamp("1999-12-31")])
+
+    def test_datapoints_collected_on_first_use(self):
+        calls = []
+
+        def get_tables():
+            calls.append(1)
+            return []
+        frames = vintage.Frames.from_dataframes(self.df, self.df, self.df,
+                                                get_tables)
+        assert calls == []
+        assert frames.datapoints == []
+        assert frames.emitter is not None
+        assert calls == [1]
+
+    def test_without_tables_datapoints_not_available(self):
+        frames = vintage.Frames.from_dataframes(self.df, self.df, self.df)
+        with pytest.raises(AttributeError):
+            frames.datapoints
+
+
+class Test_Frames_save():
+    df = pd.DataFrame({"GDP_bln_rub": [4823.0]},
+                      index=[pd.Timestamp("1999-12-31")])
+    frames = vintage.Frames.from_dataframes(df, df, df)
+
+    def test_other_formats_left_as_is(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        self.frames.save(tmp_path, ("csv", "parquet"))
+        self.frames.save(tmp_path)
+        assert (tmp_path / "dfq.parquet").exists()
+
+
+class Test_write_dataframe():
+    df = pd.DataFrame({"GDP_bln_rub": [4823.0, 7306.0]},
+                      index=pd.to_datetime(["1999-12-31", "2000-12-31"]))
+
+    def test_csv_has_time_index_header(self, tmp_path):
+        path = vintage.write_dataframe(self.df, tmp_path / "dfa.csv")
+        assert path.read_text().startswith("time_index,GDP_bln_rub")
+
+    def test_columnar_formats_keep_types(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        path = vintage.write_dataframe(self.df, tmp_path / "dfa.parquet",
+                                       "parquet")
+        df = pd.read_parquet(path)
+        assert df.GDP_bln_rub.dtype == "float64"
+        assert df.index[0] == pd.Timestamp("1999-12-31")
+        path = vintage.write_dataframe(self.df, tmp_path / "dfa.feather",
+                                       "feather")
+        assert pd.read_feather(path).time_index[1] == pd.Timestamp("2000-12-31")
+
+    def test_unknown_format_raises_error(self, tmp_path):
+        with pytest.raises(ValueError):
+            vintage.write_dataframe(self.df, tmp_path / "dfa.xls", "xls")
+
+    def test_read_dataframe(self, tmp_path):
+        df = self.df.copy()
+        df.insert(0, "year", df.index.year)
+        path = vintage.write_dataframe(df, tmp_path / "dfa.csv")
+        result = vintage.read_dataframe(path)
+        assert result.equals(vintage.typed(df))
+        assert result.year.dtype == "int64"
+        assert list(vintage.read_dataframe(path, dates=False).columns) == \
+            ["GDP_bln_rub"]
+
+    def test_columnar_types_same_as_in_csv(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        # Frames make int32 year and second resolution dates
+        df = self.df.copy()
+        df.insert(0, "year", df.index.year)
+        path = vintage.write_dataframe(df, tmp_path / "dfa.parquet",
+                                       "parquet")
+        result = pd.read_parquet(path)
+        assert result.year.dtype == "int64"
+        assert result.index.dtype == "datetime64[ns]"
+        assert df.year.dtype != "int64"
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+import kep.build as build
+import kep.files as files
+import kep.series as series
+import kep.watch as watch
+from kep.watch import Watcher
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def write(root, year, month, text, mtime_ns=None):
+    folder = root / str(year) / str(month).zfill(2)
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / "tab.csv"
+    path.write_text(text)
+    if mtime_ns:
+        os.utime(str(path), ns=(mtime_ns, mtime_ns))
+    return path
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    write(tmp_path, 2017, 4, "old")
+    calls = []
+    w = Watcher(tmp_path, handler=lambda y, m: calls.append((y, m)),
+                settle=0.5, clock=Clock())
+    w.calls = calls
+    return w
+
+
+class Test_Watcher():
+
+    def test_existing_files_are_not_processed(self, watcher):
+        assert watcher.step() == []
+
+    def test_new_file_processed_after_settle_time(self, watcher):
+        write(watcher.root, 2017, 5, "new")
+        assert watcher.step() == []
+        watcher.clock.now += 0.6
+        assert watcher.step() == [(2017, 5)]
+        assert watcher.calls == [(2017, 5)]
+        # processed only once
+        watcher.clock.now += 0.6
+        assert watcher.step() == []
+
+    def test_file_still_written_is_not_processed(self, watcher):
+        write(watcher.root, 2017, 5, "part", mtime_ns=10**18)
+        watcher.step()
+        watcher.clock.now += 0.3
+        write(watcher.root, 2017, 5, "part and more", mtime_ns=2 * 10**18)
+        watcher.step()
+        watcher.clock.now += 0.3
+        assert watcher.step() == []
+        watcher.clock.now += 0.3
+        assert watcher.step() == [(2017, 5)]
+
+    def test_changed_file_is_processed(self, watcher):
+        write(watcher.root, 2017, 4, "revised", mtime_ns=10**18)
+        watcher.step()
+        watcher.clock.now += 0.6
+        assert watcher.step() == [(2017, 4)]
+
+    def test_handler_error_does_not_stop_watcher(self, watcher):
+        def fail(year, month):
+            raise ValueError("bad file")
+        watcher.handler = fail
+        write(watcher.root, 2017, 5, "new")
+        watcher.step()
+        watcher.clock.now += 0.6
+        assert watcher.step() == [(2017, 5)]
+
+
+class FakeVintage:
+    """Vintage which copies interim file text to dataframe files."""
+
+    def __init__(self, year, month, use_cache=False):
+        self.year, self.month = year, month
+
+    def validate(self):
+        pass
+
+    def save(self, formats=('csv',), update_panel=False):
+        text = files.locate_csv(self.year, self.month).read_text()
+        folder = files.get_processed_folder(self.year, self.month)
+        for freq in "aqm":
+            (folder / "df{}.csv".format(freq)).write_text(text)
+
+
+@pytest.fixture
+def data_folder(data_folder, monkeypatch):
+    monkeypatch.setattr(watch, "Vintage", FakeVintage)
+    monkeypatch.setattr(build, "Vintage", FakeVintage)
+    monkeypatch.setattr(series, "write_series", lambda src, dst: [])
+    return data_folder
+
+
+class Test_process():
+
+    def test_revised_release_is_published(self, data_folder):
+        w = Watcher(data_folder / "interim", settle=0.5, clock=Clock())
+        latest = data_folder / "processed" / "latest" / "dfa.csv"
+        write(w.root, 2017, 5, "first", mtime_ns=10**18)
+        w.step()
+        w.clock.now += 0.6
+        assert w.step() == [(2017, 5)]
+        assert latest.read_text() == "first"
+        # revised file of same size for the same month
+        write(w.root, 2017, 5, "secnd", mtime_ns=2 * 10**18)
+        w.step()
+        w.clock.now += 0.6
+        assert w.step() == [(2017, 5)]
+        assert latest.read_text() == "secnd"
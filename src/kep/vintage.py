@@ -11,6 +11,7 @@ Main call:
 
    Vintage(year, month).save()
 
+pandas is imported on first use, so that importing this module is fast.
 
 """
 
@@ -20,11 +21,11 @@ import warnings
 from datetime import date
 import calendar
 
-import pandas as pd
-
 import kep.rows as rows
 import kep.tables as tables
 import kep.files as files
+import kep.cache as cache
+from kep.atomic import atomic_path
 
 
 # use'always' or 'ignore'
@@ -134,6 +135,7 @@ def month_end_day(year, month):
 
 
 def get_date_month_end(year, month):
+    import pandas as pd
     day = month_end_day(year, month)
     return pd.Timestamp(date(year, month, day))
 
@@ -146,6 +148,7 @@ def get_date_quarter_end(year, qtr):
 
 
 def get_date_year_end(year):
+    import pandas as pd
     return pd.Timestamp(date(year, 12, 31))
 
 
@@ -153,9 +156,8 @@ class Frames:
     """Create pandas DataFrames."""
 
     def __init__(self, tables):
-        self.emitter = Emitter(t for t in tables if t.is_defined())
-        self.datapoints = [x for freq in "aqm"
-                           for x in self.emitter.collect_data(freq)]
+        import pandas as pd
+        self.collect(tables)
 
         dfa = pd.DataFrame(self.emitter.collect_data("a"))
         dfq = pd.DataFrame(self.emitter.collect_data("q"))
@@ -166,8 +168,48 @@ class Frames:
         self.dfq = self.reshape_q(dfq)
         self.dfm = self.reshape_m(dfm)
 
+    def collect(self, tables):
+        self.emitter = Emitter(t for t in tables if t.is_defined())
+        self.datapoints = [x for freq in "aqm"
+                           for x in self.emitter.collect_data(freq)]
+
+    @classmethod
+    def from_dataframes(cls, dfa, dfq, dfm, get_tables=None):
+        """Restore Frames from previously created dataframes.
+
+           *emitter* and *datapoints* are made on first use from tables
+           returned by *get_tables()*."""
+        frames = cls.__new__(cls)
+        frames.dfa, frames.dfq, frames.dfm = dfa, dfq, dfm
+        frames._get_tables = get_tables
+        return frames
+
+    def __getattr__(self, name):
+        # called only for attributes not set, e.g. on restored Frames
+        get_tables = self.__dict__.get('_get_tables')
+        if name in ('emitter', 'datapoints') and get_tables:
+            self.collect(get_tables())
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def dfs(self):
+        return self.dfa, self.dfq, self.dfm
+
     def includes(self, x):
-        return x in self.datapoints
+        """Return True if datapoint *x* is found in dataframes."""
+        freq = x['freq']
+        if freq == 'a':
+            dt = get_date_year_end(x['year'])
+        elif freq == 'q':
+            dt = get_date_quarter_end(x['year'], x['qtr'])
+        elif freq == 'm':
+            dt = get_date_month_end(x['year'], x['month'])
+        else:
+            raise ValueError(freq)
+        df = getattr(self, 'df' + freq)
+        if x['label'] not in df.columns or dt not in df.index:
+            return False
+        return bool(df.loc[dt, x['label']] == x['value'])
 
     @staticmethod
     def validate(df):
@@ -215,13 +257,79 @@ class Frames:
         dfm.index.name = None
         return dfm
 
-    def save(self, folder_path):
-        self.dfa.to_csv(folder_path / 'dfa.csv')
-        self.dfq.to_csv(folder_path / 'dfq.csv')
-        self.dfm.to_csv(folder_path / 'dfm.csv')
+    def save(self, folder_path, formats=('csv',)):
+        """Write dfa, dfq and dfm to *folder_path* in each of *formats*.
+
+           Formats are 'csv', 'parquet' and 'feather', last two
+           require pyarrow package. Files in other formats are left
+           as is: readers skip Parquet and Feather files older than CSV
+           file and :func:`kep.build.build` removes outputs it no longer
+           makes.
+        """
+        for freq, df in zip("aqm", self.dfs()):
+            for fmt in formats:
+                path = folder_path / "df{}.{}".format(freq, fmt)
+                write_dataframe(df, path, fmt)
         print("Saved dataframes to", folder_path)
 
 
+# reading and writing dataframes
+
+INDEX_LABEL = 'time_index'
+DATE_FORMAT = '%Y-%m-%d'
+# columns in dataframes which are not variables
+DATE_COLUMNS = ['year', 'qtr', 'month']
+FORMATS = ('csv', 'parquet', 'feather')
+COLUMNAR_FORMATS = ('parquet', 'feather')
+
+
+def typed(df):
+    """Return *df* with int64 date columns and datetime64[ns] index,
+       same types as after reading CSV file."""
+    df = df.astype({c: 'int64' for c in DATE_COLUMNS if c in df.columns})
+    df.index = df.index.astype('datetime64[ns]')
+    return df
+
+
+def read_dataframe(path, dates=True):
+    """Read dataframe from CSV file made by :func:`write_dataframe`.
+
+       Index is parsed with fixed date format, date columns are int64
+       and other columns are float64. With *dates* False date columns
+       are dropped, leaving variables only."""
+    import pandas as pd
+    df = pd.read_csv(str(path), index_col=0)
+    df.index = pd.to_datetime(df.index, format=DATE_FORMAT)
+    if dates:
+        df = df.astype({c: 'float64' for c in df.columns
+                        if c not in DATE_COLUMNS})
+    else:
+        df = df.drop([c for c in DATE_COLUMNS if c in df.columns], axis=1)
+        df = df.astype('float64')
+    return typed(df)
+
+
+def write_dataframe(df, path, fmt='csv'):
+    """Write *df* to *path* in *fmt* format.
+
+       Columnar formats keep float columns and datetime index typed,
+       so that readers need not parse text and dates. Types are made
+       same as in CSV file, see :func:`typed`."""
+    if fmt not in FORMATS:
+        raise ValueError(fmt)
+    if fmt in COLUMNAR_FORMATS:
+        df = typed(df)
+    with atomic_path(path) as tmp:
+        if fmt == 'csv':
+            df.to_csv(tmp, index_label=INDEX_LABEL)
+        elif fmt == 'parquet':
+            df.rename_axis(INDEX_LABEL).to_parquet(tmp)
+        elif fmt == 'feather':
+            # feather does not store index, keep it as a column
+            df.rename_axis(INDEX_LABEL).reset_index().to_feather(tmp)
+    return path
+
+
 VALID_DATAPOINTS = [
     {'freq': 'a', 'label': 'GDP_bln_rub', 'value': 4823.0, 'year': 1999},
     {'freq': 'a', 'label': 'GDP_yoy', 'value': 106.4, 'year': 1999},
@@ -236,28 +344,68 @@ VALID_DATAPOINTS = [
 
 
 class Vintage:
-    """Represents dataset release for a given year and month."""
+    """Represents dataset release for a given year and month.
 
-    def __init__(self, year, month):
+       With *use_cache=True* parsed dataframes are restored from
+       :class:`kep.cache.FrameCache` when interim CSV file and parsing
+       specification did not change, new dataframes are written to
+       the cache. *rows* and *tables* of restored vintage are read on
+       first use.
+    """
+
+    def __init__(self, year, month, use_cache=False):
         # save for reference and navigation
-        self.year, self.month = year, month
+        self.year, self.month = files.Folder.filter_date(year, month)
         # find csv
-        self.csv_path = files.locate_csv(year, month)
+        self.csv_path = files.locate_csv(self.year, self.month)
+        self.frames = None
+        if use_cache:
+            _cache = cache.FrameCache()
+            key = cache.make_key(self.csv_path)
+            dfs = _cache.load(self.year, self.month, key)
+            if dfs:
+                self.frames = Frames.from_dataframes(
+                    *dfs, get_tables=lambda: self.tables)
+        if self.frames is None:
+            self.frames = self.parse()
+            if use_cache:
+                _cache.save(self.year, self.month, key, self.frames.dfs())
+
+    def read_tables(self):
         # rowstack
         self.rows = rows.read_csv(self.csv_path)
         # break csv to tables with variable names
         self.tables = tables.Tables(self.rows).get_required()
+
+    def __getattr__(self, name):
+        # rows and tables are not read when dataframes come from cache
+        if name in ('rows', 'tables') and 'csv_path' in self.__dict__:
+            self.read_tables()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def parse(self):
+        self.read_tables()
         # convert stream values to pandas dataframes
-        self.frames = Frames(tables=self.tables)
+        return Frames(tables=self.tables)
 
-    def save(self):
-        """Save dataframes to CSVs."""
+    def save(self, formats=('csv',), update_panel=False):
+        """Save dataframes in *formats* to processed folder, see
+           :meth:`Frames.save`. With *update_panel=True* also
+           add this vintage to :class:`kep.panel.PanelStore` if pyarrow
+           is installed."""
         processed_folder = files.get_processed_folder(self.year, self.month)
-        self.frames.save(processed_folder)
+        processed_folder.mkdir(parents=True, exist_ok=True)
+        with files.lock_folder(processed_folder):
+            self.frames.save(processed_folder, formats)
+        import kep.panel as panel
+        if update_panel and panel.available():
+            path = panel.PanelStore().update(self.year, self.month, self.dfs())
+            print("Updated", path)
 
     def dfs(self):
         """Shorthand for obtaining dataframes."""
-        return self.frames.dfa, self.frames.dfq, self.frames.dfm
+        return self.frames.dfs()
 
     def __str__(self):
         return repr(self)
@@ -279,6 +427,9 @@ class Collection:
 
     @staticmethod
     def save_all_dataframes_to_csv():
+        """Parse and save all vintages. To save only vintages with
+           changed interim CSV file or specification use :mod:`kep.build`.
+        """
         for (year, month) in files.filled_dates():
             Vintage(year, month).save()
 
@@ -295,11 +446,12 @@ class Collection:
 
     @staticmethod
     def approve_all():
-        """Checks all dates, runs slow (about 20 sec.)
+        """Checks all dates, runs slow (about 20 sec.) on first call,
+           later calls use cached dataframes if CSV files did not change.
            May fail if dataset not complete.
         """
         for (year, month) in files.filled_dates():
-            vintage = Vintage(year, month)
+            vintage = Vintage(year, month, use_cache=True)
             vintage.validate()
 
 
@@ -0,0 +1,193 @@
+"""Watch *data/interim* and parse new releases as they land.
+
+A new or changed interim CSV file (see :data:`kep.catalog.INTERIM_NAMES`)
+is parsed, validated, saved to *data/processed* and, for latest release,
+published to *data/processed/latest*. Process stays alive between
+releases, so imports and parsing specification are loaded only once.
+
+Changes are found by comparing size and modification time of files.
+If `inotify_simple` package is installed, watcher sleeps until
+something changes in interim folder, otherwise it polls every
+*interval* seconds. A file is processed after its size and modification
+time did not change for *settle* seconds, so that a partially written
+file is not parsed.
+
+Main call:
+
+    Watcher().run()
+
+Command line:
+
+    python -m kep watch --interval 0.5 --settle 0.5
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+import kep.build as build
+import kep.files as files
+from kep.catalog import INTERIM_NAMES
+from kep.vintage import Vintage
+
+
+def snapshot(root):
+    """Return {path: (size, mtime_ns)} for interim CSV files
+       in *root/YYYY/MM* folders."""
+    result = {}
+    root = str(root)
+    if not os.path.isdir(root):
+        return result
+    with os.scandir(root) as years:
+        year_dirs = [e.path for e in years if e.is_dir() and e.name.isdigit()]
+    for year_dir in year_dirs:
+        with os.scandir(year_dir) as months:
+            month_dirs = [e.path for e in months
+                          if e.is_dir() and e.name.isdigit()]
+        for month_dir in month_dirs:
+            with os.scandir(month_dir) as entries:
+                for e in entries:
+                    if e.name in INTERIM_NAMES and e.is_file():
+                        stat = e.stat()
+                        result[e.path] = (stat.st_size, stat.st_mtime_ns)
+    return result
+
+
+def date_from_path(path):
+    """
+    >>> date_from_path('data/interim/2017/05/tab.csv')
+    (2017, 5)
+    """
+    path = Path(path)
+    return int(path.parent.parent.name), int(path.parent.name)
+
+
+def process(year, month):
+    """Parse, validate, save and publish release for *year* and *month*."""
+    files.get_catalog(refresh=True)
+    Vintage(year, month).validate()
+    build.build([(year, month)])
+    # new files in processed folder must be seen before publishing
+    files.get_catalog(refresh=True)
+    if (year, month) == files.get_latest_date():
+        files.copy_latest()
+
+
+class InotifyWaiter:
+    """Sleep until anything changes in interim folder tree."""
+
+    def __init__(self, root):
+        # optional dependency
+        import inotify_simple
+        self.flags = inotify_simple.flags
+        self.inotify = inotify_simple.INotify()
+        self.root = Path(root)
+        self.watched = set()
+
+    def _add_watches(self):
+        mask = (self.flags.CREATE | self.flags.CLOSE_WRITE |
+                self.flags.MOVED_TO | self.flags.DELETE)
+        folders = [self.root] + [p for p in self.root.glob('*') if p.is_dir()] \
+            + [p for p in self.root.glob('*/*') if p.is_dir()]
+        for folder in folders:
+            if folder not in self.watched:
+                self.inotify.add_watch(str(folder), mask)
+                self.watched.add(folder)
+
+    def wait(self, timeout):
+        self._add_watches()
+        self.inotify.read(timeout=int(timeout * 1000))
+
+
+class SleepWaiter:
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+
+def make_waiter(root):
+    try:
+        return InotifyWaiter(root)
+    except (ImportError, OSError):
+        return SleepWaiter()
+
+
+class Watcher:
+    """Call *handler(year, month)* for new or changed interim files.
+
+       Files present at start are not processed, use *build.build()*
+       to process them."""
+
+    def __init__(self, root=None, handler=process, interval=0.5,
+                 settle=0.5, clock=time.monotonic):
+        self.root = root or files.Folder.interim
+        self.handler = handler
+        self.interval = interval
+        self.settle = settle
+        self.clock = clock
+        self.known = snapshot(self.root)
+        # path: (signature, time when signature was first seen)
+        self.pending = {}
+
+    def check(self):
+        """Return paths of changed files which stopped changing."""
+        now = self.clock()
+        current = snapshot(self.root)
+        for path in set(self.known) - set(current):
+            del self.known[path]
+        for path, sig in current.items():
+            if self.known.get(path) == sig:
+                self.pending.pop(path, None)
+            elif path not in self.pending or self.pending[path][0] != sig:
+                self.pending[path] = (sig, now)
+        ready = sorted(path for path, (sig, seen) in self.pending.items()
+                       if now - seen >= self.settle)
+        for path in ready:
+            self.known[path] = self.pending.pop(path)[0]
+        return ready
+
+    def step(self):
+        """Process files which are ready, return their dates."""
+        dates = sorted(set(date_from_path(p) for p in self.check()))
+        for year, month in dates:
+            start = time.time()
+            try:
+                self.handler(year, month)
+            except Exception as e:
+                # keep watching after a bad file
+                print("Failed {}-{}: {!r}".format(year, month, e))
+            else:
+                print("Processed {}-{} in {:.2f} sec.".format(
+                    year, str(month).zfill(2), time.time() - start))
+        return dates
+
+    def run(self, waiter=None):
+        waiter = waiter or make_waiter(self.root)
+        print("Watching", self.root, "with", type(waiter).__name__)
+        while True:
+            self.step()
+            # poll more often while a file is settling
+            waiter.wait(self.settle / 2 if self.pending else self.interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m kep watch',
+        description='Parse new interim releases as they land')
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help='seconds between checks')
+    parser.add_argument('--settle', type=float, default=0.5,
+                        help='seconds a file must stay unchanged')
+    parser.add_argument('--build', action='store_true',
+                        help='rebuild outdated releases on start')
+    args = parser.parse_args(argv)
+    if args.build:
+        build.build()
+    try:
+        Watcher(interval=args.interval, settle=args.settle).run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Pure-Python stand-in for MS Word object model used in word.py.
+
+Every property read or method call that would be a COM round trip
+increments a counter in *calls*, so that tests can compare the number of
+round trips of different table readers on any platform.
+
+    app = MockWord({'tab.doc': [[['1999', '2.5'], ['2000', '3.0']]]})
+    rows = list(word.yield_continious_rows('tab.doc', word=app))
+    app.calls
+"""
+
+import os
+import time
+from collections import Counter
+
+CELL_END = '\r\x07'
+
+
+class Count:
+    def __init__(self, n, calls, name):
+        self._n = n
+        self._calls = calls
+        self._name = name
+
+    @property
+    def count(self):
+        self._calls[self._name] += 1
+        return self._n
+
+    # COM is case-insensitive
+    Count = count
+
+
+class Range:
+    def __init__(self, text, calls):
+        self._text = text
+        self._calls = calls
+
+    @property
+    def Text(self):
+        self._calls['Range.Text'] += 1
+        return self._text
+
+
+class Cell:
+    def __init__(self, text, calls):
+        self._range = Range(text + CELL_END, calls)
+
+    @property
+    def Range(self):
+        return self._range
+
+
+class Table:
+    """Table with *rows*, list of lists of cell values. Rows of different
+       length stand for a table with merged cells."""
+
+    def __init__(self, rows, calls):
+        self._rows = rows
+        self._calls = calls
+        self._ncols = max(len(row) for row in rows)
+
+    @property
+    def rows(self):
+        return Count(len(self._rows), self._calls, 'rows.count')
+
+    @property
+    def columns(self):
+        return Count(self._ncols, self._calls, 'columns.count')
+
+    Rows = rows
+    Columns = columns
+
+    @property
+    def Uniform(self):
+        self._calls['Uniform'] += 1
+        return all(len(row) == self._ncols for row in self._rows)
+
+    @property
+    def Range(self):
+        # each cell ends with cell mark, each row with end-of-row mark
+        text = ''.join(''.join(value + CELL_END for value in row) + CELL_END
+                       for row in self._rows)
+        return Range(text, self._calls)
+
+    def Cell(self, Row, Column):
+        self._calls['Cell'] += 1
+        try:
+            return Cell(self._rows[Row - 1][Column - 1], self._calls)
+        except IndexError:
+            # Word raises COM error for cells lost in merge
+            raise Exception("The requested member of the collection "
+                            "does not exist.")
+
+
+class Tables(list):
+    def __init__(self, tables, calls):
+        super().__init__(tables)
+        self._calls = calls
+
+    @property
+    def count(self):
+        self._calls['Tables.count'] += 1
+        return len(self)
+
+    Count = count
+
+
+class Document:
+    def __init__(self, tables, app):
+        self._app = app
+        self.Tables = Tables([Table(rows, app.calls) for rows in tables],
+                             app.calls)
+
+    def Close(self, SaveChanges=0):
+        self._app.open_documents -= 1
+
+
+class Documents:
+    def __init__(self, app):
+        self._app = app
+
+    def Open(self, path):
+        app = self._app
+        app.calls['Documents.Open'] += 1
+        start = time.time()
+        time.sleep(app.delay)
+        if app.log:
+            # workers are other processes, parent reads times from file
+            with open(app.log, 'a') as f:
+                f.write("{} {!r} {!r}\n".format(os.getpid(), start,
+                                                time.time()))
+        app.open_documents += 1
+        app.ActiveDocument = Document(app.files[str(path)], app)
+        return app.ActiveDocument
+
+
+class MockWord:
+    """Application with documents in *files*, a dict of path: list of
+       tables, each table a list of rows. Opening a document takes *delay*
+       seconds. If *log* is a file path, process id and start and end
+       time of each opening are appended to it."""
+
+    def __init__(self, files, delay=0, log=None):
+        self.files = {str(k): v for k, v in files.items()}
+        self.delay = delay
+        self.log = log
+        self.open_documents = 0
+        self.calls = Counter()
+        self.Visible = 0
+        self.ActiveDocument = None
+        self.Documents = Documents(self)
+        self.quit = False
+
+    def Quit(self):
+        self.quit = True
+
+    @property
+    def round_trips(self):
+        return sum(self.calls.values())
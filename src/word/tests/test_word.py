@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+from functools import partial
+
+import pytest
+from pathlib import Path
+
+from word import word
+from word.mock_word import MockWord
+
+TABLE = [["Валовой внутренний продукт\r", ""],
+         ["1999", "4823\x0b,0"],
+         ["2000", " 7305,6 "]]
+EXPECTED = [["Валовой внутренний продукт", ""],
+            ["1999", "4823 ,0"],
+            ["2000", "7305,6"]]
+
+
+def make_app(tables, path="tab.doc"):
+    return MockWord({path: tables})
+
+
+def read_tables(app, path="tab.doc"):
+    return list(word.yield_continious_rows(path, word=app))
+
+
+class Test_table_rows():
+
+    def test_same_values_as_cell_by_cell(self):
+        app = make_app([TABLE])
+        table = app.Documents.Open("tab.doc").Tables[0]
+        assert word.table_rows(table) == EXPECTED
+        assert list(word.row_iter_by_cell(table)) == EXPECTED
+
+    def test_merged_cells_are_read_cell_by_cell(self):
+        app = make_app([[["GDP"], ["1999", "4823,0"]]])
+        assert read_tables(app) == [["GDP", ""], ["1999", "4823,0"]]
+        assert app.calls["Cell"] == 4
+
+    def test_cell_iter(self):
+        table = make_app([TABLE]).Documents.Open("tab.doc").Tables[0]
+        assert list(word.cell_iter(table))[-1] == (3, 2, "7305,6")
+
+
+class Test_round_trips():
+
+    tables = [[[str(i), str(j), "1,0", "2,0"] for j in range(50)]
+              for i in range(10)]
+
+    def test_one_text_read_per_table(self):
+        app = make_app(self.tables)
+        rows = read_tables(app)
+        assert len(rows) == 500
+        assert app.calls["Cell"] == 0
+        assert app.calls["Range.Text"] == 10
+        # O(tables), not O(cells)
+        assert app.round_trips <= 2 + 4 * len(self.tables)
+
+    def test_cell_by_cell_is_o_cells(self):
+        app = make_app(self.tables)
+        for table in app.Documents.Open("tab.doc").Tables:
+            list(word.row_iter_by_cell(table))
+        assert app.calls["Cell"] == 2000
+
+    def test_application_given_is_not_closed(self):
+        app = make_app([TABLE])
+        read_tables(app)
+        assert app.quit is False
+        assert app.open_documents == 0
+
+    def test_document_closed_when_reading_stops(self):
+        app = make_app([TABLE, TABLE])
+        rows = word.yield_continious_rows("tab.doc", word=app)
+        next(rows)
+        rows.close()
+        assert app.open_documents == 0
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+DOCX_ROWS = [["Валовой внутренний продукт, млрд.рублей", "", ""],
+             ["1999", "4823", "901 1)"],
+             ["2000", "7305,6", '"1527"'],
+             ["2001 р", "", "2191"],
+             ["Индекс потребительских цен", "вложенная 106,5"]]
+
+
+class Test_docx_backend():
+
+    def test_xml_rows(self):
+        assert list(word.yield_docx_rows(FIXTURES / "tab1.xml")) == DOCX_ROWS
+
+    def test_docx_rows(self):
+        rows = list(word.yield_docx_rows(FIXTURES / "tab.docx"))
+        assert rows[0] == ["Валовой внутренний продукт, млрд.рублей", "", ""]
+        assert rows[1] == ["2015", "4823", "901 1)"]
+
+    def test_raw_text_as_in_word(self):
+        table = next(word.iter_docx_tables(FIXTURES / "tab1.xml"))
+        # paragraphs end with \r, line break is \x0b as in Range.Text
+        assert table[0][0] == "Валовой внутренний продукт, \x0bмлрд.рублей"
+        assert table[1][2] == "901\r1)"
+
+    def test_same_rows_as_word_backend(self):
+        tables = list(word.iter_docx_tables(FIXTURES / "tab1.xml"))
+        app = make_app(tables)
+        assert read_tables(app) == DOCX_ROWS
+
+    def test_folder_to_csv(self, tmp_path):
+        shutil.copy(str(FIXTURES / "tab.docx"), str(tmp_path / "tab.docx"))
+        shutil.copy(str(FIXTURES / "tab1.xml"), str(tmp_path / "tab1.xml"))
+        word.folder_to_csv(tmp_path, backend="docx", cache_folder=None)
+        lines = (tmp_path / "tab.csv").read_text(encoding="utf8").splitlines()
+        assert len(lines) == 10
+        # files in order: tab.docx, then tab1.xml
+        assert lines[1] == "2015\t4823\t901 1)"
+        assert lines[6] == "1999\t4823\t901 1)"
+
+
+def make_folders(root, n):
+    folders = []
+    for i in range(n):
+        folder = root / str(i)
+        folder.mkdir()
+        shutil.copy(str(FIXTURES / "tab1.xml"), str(folder / "tab.xml"))
+        if i % 2:
+            shutil.copy(str(FIXTURES / "tab.docx"), str(folder / "tab2.docx"))
+        folders.append(folder)
+    return folders
+
+
+def logged_app(created, files, log):
+    """Make MockWord application, append process id to *created* file."""
+    with open(created, "a") as f:
+        f.write("{}\n".format(os.getpid()))
+    return MockWord(files, log=log)
+
+
+class Test_folders_to_csv():
+
+    def test_same_as_sequential(self, tmp_path):
+        folders = make_folders(tmp_path, 3)
+        expected = []
+        for folder in folders:
+            word.folder_to_csv(folder, backend="docx", cache_folder=None)
+            expected.append((folder / "tab.csv").read_bytes())
+            (folder / "tab.csv").unlink()
+        word.folders_to_csv(folders, backend="docx", workers=2,
+                            cache_folder=tmp_path / "cache")
+        assert [(f / "tab.csv").read_bytes() for f in folders] == expected
+        # no part files left
+        assert list(tmp_path.glob("*/.tab.csv.part*")) == []
+
+    def test_identical_folders(self, tmp_path):
+        folders = []
+        for i in range(8):
+            folder = tmp_path / str(i)
+            folder.mkdir()
+            shutil.copy(str(FIXTURES / "tab1.xml"), str(folder / "tab.xml"))
+            folders.append(folder)
+        cache = tmp_path / "cache"
+        word.folders_to_csv(folders, backend="docx", workers=4,
+                            cache_folder=cache)
+        assert len(set((f / "tab.csv").read_bytes() for f in folders)) == 1
+        assert all(word.is_current(f, "docx") for f in folders)
+        # only results left, no part or temporary files
+        names = [p.name for p in tmp_path.glob("*/*")]
+        cached = os.path.basename(word.cache_path(
+            cache, word.file_hash(str(folders[0] / "tab.xml"))))
+        assert set(names) == {".tab.csv.sources.json", "tab.csv", "tab.xml",
+                              cached}
+        assert len(names) == 8 * 3 + 1
+
+    def test_word_instance_per_worker(self, tmp_path):
+        folders = make_folders(tmp_path, 4)
+        tables = list(word.iter_docx_tables(FIXTURES / "tab1.xml"))
+        files = {p: tables for f in folders
+                 for p in word.make_file_list(f)}
+        for i, folder in enumerate(folders):
+            # different content, identical documents are converted once
+            (folder / "tab.doc").write_text(str(i))
+        created, log = tmp_path / "created.log", tmp_path / "open.log"
+        word.folders_to_csv(folders, workers=4,
+                            app_factory=partial(logged_app, str(created),
+                                                files, log=str(log)),
+                            cache_folder=None)
+        created_pids = created.read_text().split()
+        opened_pids = [line.split()[0]
+                       for line in log.read_text().splitlines()]
+        assert len(opened_pids) == 4
+        # one application per worker process, none in parent process
+        assert len(created_pids) == len(set(created_pids))
+        assert 1 <= len(created_pids) <= 4
+        assert str(os.getpid()) not in created_pids
+        # documents are opened by application of their worker
+        assert set(opened_pids) <= set(created_pids)
+        lines = (folders[0] / "tab.csv").read_text(encoding="utf8")
+        assert lines.splitlines()[1] == "1999\t4823\t901 1)"
+
+
+class Test_extraction_cache():
+
+    @pytest.fixture
+    def folder(self, tmp_path, monkeypatch):
+        folder = tmp_path / "2017_05"
+        folder.mkdir()
+        text = (FIXTURES / "tab1.xml").read_text(encoding="utf8")
+        for k, name in enumerate(["tab.xml", "tab1.xml", "tab2.xml",
+                                  "tab3.xml"]):
+            (folder / name).write_text(text.replace("4823", str(k)),
+                                       encoding="utf8")
+        shutil.copy(str(FIXTURES / "tab.docx"), str(folder / "tab4.docx"))
+        self.converted = []
+        extensions, rows_func = word.BACKENDS["docx"]
+
+        def counting(path):
+            self.converted.append(os.path.basename(path))
+            return rows_func(path)
+        monkeypatch.setitem(word.BACKENDS, "docx", (extensions, counting))
+        return folder
+
+    def convert(self, folder):
+        self.converted = []
+        word.folder_to_csv(folder, backend="docx",
+                           cache_folder=folder.parent / "cache")
+        return self.converted
+
+    def test_only_changed_document_is_converted(self, folder):
+        assert len(self.convert(folder)) == 5
+        before = (folder / "tab.csv").read_text(encoding="utf8")
+        assert self.convert(folder) == []
+        assert (folder / "tab.csv").read_text(encoding="utf8") == before
+        text = (folder / "tab2.xml").read_text(encoding="utf8")
+        (folder / "tab2.xml").write_text(text.replace("2191", "2192"),
+                                         encoding="utf8")
+        assert self.convert(folder) == ["tab2.xml"]
+        assert "2192" in (folder / "tab.csv").read_text(encoding="utf8")
+
+    def test_filter_version_invalidates_cache(self, folder, monkeypatch):
+        self.convert(folder)
+        monkeypatch.setattr(word, "FILTER_VERSION", word.FILTER_VERSION + 1)
+        assert len(self.convert(folder)) == 5
+
+    def test_is_current(self, folder):
+        assert not word.is_current(folder, "docx")
+        self.convert(folder)
+        assert word.is_current(folder, "docx")
+        (folder / "tab.csv").write_text("edited")
+        assert not word.is_current(folder, "docx")
+        self.convert(folder)
+        (folder / "tab.xml").write_text("")
+        assert not word.is_current(folder, "docx")
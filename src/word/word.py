@@ -1,5 +1,15 @@
 """make_csv(data_folder) dumps data from tables in Word document to csv file.
    Windows-only, requires MS Word installed.
+
+   Text of a table is read in one call (see table_rows()), cell by cell
+   reading is used only for tables with merged cells. mock_word.py has
+   a stand-in for Word object model to test this without MS Word.
+
+   folder_to_csv(folder, backend='docx') reads .docx or Word XML files
+   with a streaming XML parser instead, it runs on any platform.
+
+   folders_to_csv(folders, workers=4) converts documents of many folders
+   in parallel processes, each with own MS Word instance.
 """
 
 # More info on...
@@ -9,11 +19,21 @@
 #         http://stackoverflow.com/questions/10366596/reading-table-contetnts-in-ms-word-file-using-python
 
 import csv
+import hashlib
+import json
 import os
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+from contextlib import contextmanager
 
 
 CSV_FILENAME = 'tab.csv'
 ENCODING = 'utf8'
+# converted documents by content hash, see convert_document()
+CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            os.pardir, os.pardir, 'data', 'cache', 'word')
 
 
 # -------------------------------------------------------------------------------
@@ -104,17 +124,61 @@ def get_cell_value(table, i, j):
 
 
 def cell_iter(table):
+    for i, row in enumerate(row_iter(table), 1):
+        for j, value in enumerate(row, 1):
+            yield i, j, value
+
+
+def row_iter_by_cell(table):
+    """Read table cell by cell, one COM call per cell."""
+    ncols = table.columns.count
     for i in range(1, table.rows.count + 1):
-        for j in range(1, table.columns.count + 1):
-            yield i, j, get_filtered_cell_value(table, i, j)
+        yield [get_filtered_cell_value(table, i, j)
+               for j in range(1, ncols + 1)]
+
+
+# end of cell and end of row mark in Range.Text
+CELL_END = '\r\x07'
+
+
+def split_table_text(text, nrows, ncols):
+    """Return list of rows of raw cell values from *text* of whole table,
+       None if *text* does not make *nrows* rows of *ncols* cells.
+
+    >>> split_table_text('a\\r\\x07b\\r\\x07\\r\\x07c\\r\\x07\\r\\x07\\r\\x07', 2, 2)
+    [['a', 'b'], ['c', '']]
+    """
+    pieces = text.split(CELL_END)
+    # text ends with end of row mark
+    if pieces.pop() != VOID:
+        return None
+    width = ncols + 1
+    if len(pieces) != nrows * width:
+        return None
+    rows = [pieces[k:k + width] for k in range(0, len(pieces), width)]
+    # last piece in a row is end of row mark
+    if any(row.pop() != VOID for row in rows):
+        return None
+    return rows
+
+
+def table_rows(table):
+    """Return list of rows of filtered cell values for *table*.
+
+       Text of whole table is read in one call and split locally.
+       Tables with merged cells are read cell by cell."""
+    nrows, ncols = table.rows.count, table.columns.count
+    raw_rows = None
+    if table.Uniform:
+        raw_rows = split_table_text(table.Range.Text, nrows, ncols)
+    if raw_rows is None:
+        return list(row_iter_by_cell(table))
+    return [[filter_cell_contents(value) for value in row]
+            for row in raw_rows]
 
 
 def row_iter(table):
-    for i in range(1, table.rows.count + 1):
-        row = []
-        for j in range(1, table.columns.count + 1):
-            row = row + [get_filtered_cell_value(table, i, j)]
-        yield row
+    return iter(table_rows(table))
 
 
 # -------------------------------------------------------------------------------
@@ -123,22 +187,130 @@ def row_iter(table):
 #
 # -------------------------------------------------------------------------------
 
-def query_all_tables(p, func):
-    word = open_ms_word()
-    doc = open_doc(p, word)
-    #import pdb; pdb.set_trace()
-    total_tables = get_table_count(doc)
-    for i, table in enumerate(doc.Tables):
-        print("Reading table {} of {}...".format(i + 1, total_tables))
-        yield func(table)
-    close_ms_word(word)
-
-
-def yield_continious_rows(p):
-    for y in query_all_tables(p, func=row_iter):
+def query_all_tables(p, func, word=None):
+    """Yield func(table) for tables in document *p*. Uses *word*
+       application if given, otherwise starts and closes MS Word."""
+    app = word or open_ms_word()
+    try:
+        doc = open_doc(p, app)
+        try:
+            total_tables = get_table_count(doc)
+            for i, table in enumerate(doc.Tables):
+                print("Reading table {} of {}...".format(i + 1,
+                                                         total_tables))
+                yield func(table)
+        finally:
+            if word is not None:
+                # application is reused for next document
+                doc.Close(SaveChanges=0)
+    finally:
+        if word is None:
+            close_ms_word(app)
+
+
+def yield_continious_rows(p, word=None):
+    for y in query_all_tables(p, func=row_iter, word=word):
         for row in y:
             yield row
 
+
+# -------------------------------------------------------------------------------
+#
+#     Document-level iterators for .docx and .xml files
+#
+# -------------------------------------------------------------------------------
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DOCX_DOCUMENT = 'word/document.xml'
+
+
+def _run_text(elem):
+    # text of elements inside w:r, as in Range.Text
+    if elem.tag == W + 't':
+        return elem.text or VOID
+    if elem.tag == W + 'tab':
+        return '\t'
+    if elem.tag == W + 'br':
+        return '\x0c' if elem.get(W + 'type') == 'page' else '\x0b'
+    if elem.tag == W + 'cr':
+        return '\r'
+    return None
+
+
+def iter_xml_tables(f):
+    """Yield top-level tables in WordprocessingML stream *f* as lists of
+       rows of raw cell text, in document order.
+
+       Paragraphs in a cell are joined with '\\r' and text of nested
+       tables is part of cell text, as in Cell.Range.Text. Rows shortened
+       by merged cells are padded with empty values at the end, same
+       as cell by cell reading of such table in MS Word. Cells continuing
+       vertical merge are empty."""
+    depth = 0
+    in_run = False
+    rows = row = paragraphs = text = None
+    ncols = 0
+    continued = False
+    for event, elem in ET.iterparse(f, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            if tag == W + 'tbl':
+                depth += 1
+                if depth == 1:
+                    rows, ncols = [], 0
+            elif tag == W + 'tr' and depth == 1:
+                row = []
+            elif tag == W + 'tc' and depth == 1:
+                paragraphs, continued = [], False
+            elif tag == W + 'p' and paragraphs is not None:
+                text = []
+            elif tag == W + 'r':
+                in_run = True
+            continue
+        if tag == W + 'r':
+            in_run = False
+        elif in_run and text is not None:
+            value = _run_text(elem)
+            if value is not None:
+                text.append(value)
+        elif tag == W + 'p' and text is not None:
+            paragraphs.append(VOID.join(text))
+            text = None
+        elif depth == 1 and tag == W + 'gridCol':
+            ncols += 1
+        elif depth == 1 and tag == W + 'vMerge':
+            continued = elem.get(W + 'val') != 'restart'
+        elif depth == 1 and tag == W + 'tc':
+            row.append(VOID if continued else '\r'.join(paragraphs))
+            paragraphs = None
+        elif depth == 1 and tag == W + 'tr':
+            rows.append(row)
+        elif tag == W + 'tbl':
+            depth -= 1
+            if depth == 0:
+                width = max([ncols] + [len(r) for r in rows])
+                yield [r + [VOID] * (width - len(r)) for r in rows]
+        if depth == 0:
+            # keep memory flat on long documents
+            elem.clear()
+
+
+def iter_docx_tables(path):
+    """Yield tables from .docx or Word XML file *path*."""
+    path = str(path)
+    if path.lower().endswith('.docx'):
+        with zipfile.ZipFile(path) as z, z.open(DOCX_DOCUMENT) as f:
+            yield from iter_xml_tables(f)
+    else:
+        with open(path, 'rb') as f:
+            yield from iter_xml_tables(f)
+
+
+def yield_docx_rows(p):
+    for table in iter_docx_tables(p):
+        for row in table:
+            yield [filter_cell_contents(value) for value in row]
+
 # -------------------------------------------------------------------------------
 #
 #    Write CSV
@@ -160,13 +332,18 @@ def to_csv(gen, csv_path):
 # -------------------------------------------------------------------------------
 
 
-def yield_rows_from_many_files(file_list):
+# file extensions and row iterator for each backend
+BACKENDS = {'word': (['doc'], yield_continious_rows),
+            'docx': (['docx', 'xml'], yield_docx_rows)}
+
+
+def yield_rows_from_many_files(file_list, rows_func=yield_continious_rows):
     """Iterate by row over .doc files in *file_list* """
     print("Starting reading .doc files...")
     for p in file_list:
         if os.path.exists(p):
             print("File:", p)
-            for row in yield_continious_rows(p):
+            for row in rows_func(p):
                 yield row
 
 
@@ -174,24 +351,255 @@ def get_csv_filename(folder):
     return os.path.join(folder, CSV_FILENAME)
 
 
-def dump_doc_files_to_csv(file_list, csv_path):
+def dump_doc_files_to_csv(file_list, csv_path,
+                          rows_func=yield_continious_rows):
     """Write tables from .doc in *file_list* into one *csv_path* file. """
-    folder_iter = yield_rows_from_many_files(file_list)
+    folder_iter = yield_rows_from_many_files(file_list, rows_func)
     to_csv(folder_iter, csv_path)
 
 
-def make_file_list(folder):
-    files = ["tab.doc"] + ["tab{0:d}.doc".format(x) for x in range(1, 5)]
-    return [os.path.abspath(os.path.join(folder, fn)) for fn in files]
+def make_file_list(folder, extensions=('doc',)):
+    """Return paths of tab, tab1..tab4 documents in *folder*, with first
+       of *extensions* found for each document."""
+    paths = []
+    for base in ["tab"] + ["tab{0:d}".format(x) for x in range(1, 5)]:
+        candidates = [os.path.abspath(os.path.join(folder, base + '.' + ext))
+                      for ext in extensions]
+        found = [p for p in candidates if os.path.exists(p)]
+        paths.append(found[0] if found else candidates[0])
+    return paths
 
 
-def folder_to_csv(folder):
-    """Make single csv based on 5 .doc files in *folder*. """
+def folder_to_csv(folder, backend='word', cache_folder=CACHE_FOLDER):
+    """Make single csv based on 5 .doc files in *folder*.
+
+       *backend* is 'word' (.doc files, MS Word) or 'docx' (.docx or
+       Word XML files, any platform). Documents already converted are
+       taken from *cache_folder*, None disables cache."""
     print("\nFolder:\n    ", folder)
-    file_list = make_file_list(folder)
-    csv_filename = get_csv_filename(folder)
-    dump_doc_files_to_csv(file_list, csv_filename)
-    print("Finished creating raw CSV file:", csv_filename)
+    documents = folder_documents(folder, backend)
+    parts = part_paths(folder, documents)
+    try:
+        for (path, digest), part in zip(documents, parts):
+            convert_document(path, part, backend, cache_folder, digest)
+        return finish_folder(folder, documents, parts)
+    finally:
+        remove_files(parts)
+
+
+# -------------------------------------------------------------------------------
+#
+#    Extraction cache
+#
+# -------------------------------------------------------------------------------
+
+# change when rows made from same document change, e.g. in
+# filter_cell_contents(), to invalidate cached conversions
+FILTER_VERSION = 1
+SOURCES_FILENAME = '.tab.csv.sources.json'
+
+
+# word.py runs on Windows machines without kep package installed,
+# so helpers below are local copies rather than imports from kep.atomic
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_path(cache_folder, digest):
+    return os.path.join(str(cache_folder),
+                        "{}-v{}.csv".format(digest, FILTER_VERSION))
+
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+UMASK = _umask()
+
+
+@contextmanager
+def replacing(path):
+    """Yield unique temporary path next to *path*, move it to *path* on
+       exit. Temporary file is removed if writing fails."""
+    folder, name = os.path.split(os.path.abspath(str(path)))
+    fd, tmp = tempfile.mkstemp(prefix='.' + name + '.', suffix='.tmp',
+                               dir=folder)
+    os.close(fd)
+    try:
+        yield tmp
+        # mkstemp creates file readable by owner only
+        os.chmod(tmp, 0o666 & ~UMASK)
+        os.replace(tmp, str(path))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def remove_files(paths):
+    for path in set(paths):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _copy_atomic(src, dst):
+    with replacing(dst) as tmp:
+        shutil.copyfile(src, tmp)
+
+
+def folder_documents(folder, backend='word'):
+    """Return list of (path, sha1) for documents in *folder*."""
+    extensions = BACKENDS[backend][0]
+    return [(p, file_hash(p)) for p in make_file_list(folder, extensions)
+            if os.path.exists(p)]
+
+
+def part_paths(folder, documents):
+    return [os.path.join(str(folder), ".{}.part{}".format(CSV_FILENAME, k))
+            for k in range(len(documents))]
+
+
+def write_sources(folder, documents, csv_path):
+    """Record hashes of documents and of *csv_path* made from them."""
+    sources = dict(filter_version=FILTER_VERSION,
+                   documents={os.path.basename(p): h for p, h in documents},
+                   csv=file_hash(csv_path))
+    path = os.path.join(str(folder), SOURCES_FILENAME)
+    with replacing(path) as tmp:
+        with open(tmp, 'w') as f:
+            json.dump(sources, f, indent=1, sort_keys=True)
+
+
+def is_current(folder, backend='word'):
+    """Return True if tab.csv in *folder* was made from documents now in
+       *folder* with current FILTER_VERSION and was not changed since."""
+    try:
+        with open(os.path.join(str(folder), SOURCES_FILENAME)) as f:
+            sources = json.load(f)
+    except (OSError, ValueError):
+        return False
+    csv_path = get_csv_filename(folder)
+    documents = {os.path.basename(p): h
+                 for p, h in folder_documents(folder, backend)}
+    return (sources.get('filter_version') == FILTER_VERSION and
+            sources.get('documents') == documents and
+            os.path.exists(csv_path) and
+            file_hash(csv_path) == sources.get('csv'))
+
+
+# -------------------------------------------------------------------------------
+#
+#    Conversion by document, sequential or parallel
+#
+# -------------------------------------------------------------------------------
+
+# MS Word instance of a worker process, see init_worker()
+_worker_app = None
+
+
+def init_worker(app_factory=None):
+    """Start application in worker process, close it when process exits."""
+    global _worker_app
+    if app_factory is not None:
+        # multiprocessing runs this finalizer at worker exit
+        from multiprocessing.util import Finalize
+        _worker_app = app_factory()
+        Finalize(None, close_ms_word, args=(_worker_app,), exitpriority=10)
+
+
+def convert_document(path, part_path, backend='word', cache_folder=None,
+                     digest=None):
+    """Write rows of document *path* to CSV file *part_path*. Rows are
+       copied from *cache_folder* if document with same hash *digest*
+       was converted before."""
+    cached = None
+    if cache_folder is not None:
+        cached = cache_path(cache_folder, digest or file_hash(path))
+        if os.path.exists(cached):
+            print("File (cached):", path)
+            shutil.copyfile(cached, part_path)
+            return part_path
+    print("File:", path)
+    if backend == 'word':
+        rows = yield_continious_rows(path, word=_worker_app)
+    else:
+        rows = BACKENDS[backend][1](path)
+    to_csv(rows, part_path)
+    if cached:
+        os.makedirs(str(cache_folder), exist_ok=True)
+        _copy_atomic(part_path, cached)
+    return part_path
+
+
+def merge_parts(part_paths, csv_path):
+    """Concatenate *part_paths* into *csv_path*."""
+    # readers never see partially written file
+    with replacing(csv_path) as tmp:
+        with open(tmp, 'wb') as out:
+            for part in part_paths:
+                with open(part, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+
+
+def finish_folder(folder, documents, parts):
+    csv_path = get_csv_filename(folder)
+    merge_parts(parts, csv_path)
+    write_sources(folder, documents, csv_path)
+    print("Finished creating raw CSV file:", csv_path)
+    return csv_path
+
+
+def folders_to_csv(folders, backend='word', workers=None,
+                   app_factory=open_ms_word, cache_folder=CACHE_FOLDER):
+    """Make tab.csv in each of *folders*.
+
+       Documents are converted in a pool of *workers* processes, with one
+       application made by *app_factory* per process for 'word' backend.
+       Each document is written to a part file, parts are joined in order
+       of make_file_list(), so tab.csv is same as made by folder_to_csv().
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    factory = app_factory if backend == 'word' else None
+    jobs = []
+    csv_paths = []
+    # digest: future of first document with this content, identical
+    # documents are converted once and share the part file
+    submitted = {}
+    parts_made = []
+    try:
+        with ProcessPoolExecutor(workers, initializer=init_worker,
+                                 initargs=(factory,)) as pool:
+            for folder in folders:
+                documents = folder_documents(folder, backend)
+                futures = []
+                for (path, digest), part in zip(documents,
+                                                part_paths(folder, documents)):
+                    if digest not in submitted:
+                        submitted[digest] = pool.submit(
+                            convert_document, path, part, backend,
+                            cache_folder, digest)
+                        parts_made.append(part)
+                    futures.append(submitted[digest])
+                jobs.append((folder, documents, futures))
+            # merge folders in order while pool works on next ones
+            try:
+                for folder, documents, futures in jobs:
+                    parts = [future.result() for future in futures]
+                    csv_paths.append(finish_folder(folder, documents, parts))
+            except BaseException:
+                for future in submitted.values():
+                    future.cancel()
+                raise
+    finally:
+        remove_files(parts_made)
+    return csv_paths
 
 
 if __name__ == "__main__":